@@ -1 +1,10 @@
-from pylox.lox import PyLox
+__version__ = "0.1.0"
+
+
+def __getattr__(name):
+    # Imported on first use, so that the thin client of `lox serve` starts
+    # without loading the interpreter
+    if name == "PyLox":
+        from pylox.lox import PyLox
+        return PyLox
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,167 @@
+import os
 import sys
+import argparse
 from functools import partial
 
-from pylox import PyLox
+from pylox.lox import PyLox, BACKENDS
+from pylox.client import default_socket_path
+from pylox.server import serve
+from pylox.snapshot import SnapshotError
+from pylox.transpiler import UnsupportedProgram
 
+# Backends whose state can be saved to a snapshot
+SNAPSHOT_BACKENDS = ("tree", "adaptive")
 
-def _main(args):
-    if len(args) > 2:
-        print("Usage: ./lox [script]")
-        sys.exit(65)
-    elif len(args) == 2:
-        PyLox().run_file(args[1])
+
+def _parse_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="lox")
+    parser.add_argument("script", nargs="?",
+                        help="script to run; start a REPL when omitted")
+    parser.add_argument("--backend", choices=BACKENDS, default="tree",
+                        help="execution engine (default: %(default)s)")
+    parser.add_argument("-O", dest="optimize", action="store_true",
+                        help="fold constants and drop dead branches "
+                             "before running")
+    parser.add_argument("--disassemble", action="store_true",
+                        help="print the bytecode of the script before running "
+                             "it (vm backend only)")
+    parser.add_argument("--max-frames", type=int, metavar="N",
+                        help="call depth reported as a stack overflow "
+                             "(vm backend only)")
+    parser.add_argument("--stats", action="store_true",
+                        help="report specialization statistics on exit "
+                             "(adaptive backend only)")
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="start from the globals saved by `lox snapshot` "
+                             "(tree and adaptive backends only)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the .loxc cache of "
+                             "parsed programs")
+    parser.add_argument("--cache-stats", action="store_true",
+                        help="report .loxc cache hits and misses on exit")
+    options = parser.parse_args(args)
+    if options.disassemble and options.backend != "vm":
+        parser.error("--disassemble requires --backend=vm")
+    if options.max_frames is not None and options.backend != "vm":
+        parser.error("--max-frames requires --backend=vm")
+    if options.stats and options.backend != "adaptive":
+        parser.error("--stats requires --backend=adaptive")
+    if options.snapshot and options.backend not in SNAPSHOT_BACKENDS:
+        parser.error("--snapshot requires --backend=tree or adaptive")
+    return options
+
+
+def _parse_compile_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="lox compile",
+        description="Transpile a script to Python, then run it. "
+                    "Compiled programs are cached by source hash.")
+    parser.add_argument("script")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the compiled cache")
+    parser.add_argument("--emit", action="store_true",
+                        help="print the generated Python instead of running it")
+    return parser.parse_args(args)
+
+
+def _compile(args: list[str]):
+    options = _parse_compile_args(args)
+    lox = PyLox()
+    if options.emit:
+        try:
+            program = lox.transpile(open(options.script).read())
+        except UnsupportedProgram as e:
+            sys.exit(f"lox: cannot emit {options.script}: {e}")
+        if program:
+            print(program.source, end="")
+        lox._exit_on_error()
     else:
-        PyLox().run_prompt()
+        lox.compile_file(options.script, use_cache=not options.no_cache)
+
+
+def _parse_snapshot_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="lox snapshot",
+        description="Run a prelude, then save the globals it defined for "
+                    "`lox --snapshot` to start from.")
+    parser.add_argument("prelude")
+    parser.add_argument("-o", dest="output", required=True, metavar="PATH",
+                        help="snapshot to write")
+    parser.add_argument("--backend", choices=SNAPSHOT_BACKENDS, default="tree",
+                        help="execution engine (default: %(default)s)")
+    parser.add_argument("-O", dest="optimize", action="store_true",
+                        help="fold constants and drop dead branches "
+                             "before running")
+    return parser.parse_args(args)
+
+
+def _snapshot(args: list[str]):
+    options = _parse_snapshot_args(args)
+    lox = PyLox(backend=options.backend, optimize=options.optimize)
+    try:
+        lox.snapshot_file(options.prelude, options.output)
+    except SnapshotError as e:
+        sys.exit(f"lox: {e}")
+
+
+def _parse_serve_args(args: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="lox serve",
+        description="Run the scripts of `./lox` clients whose PYLOX_SERVER "
+                    "names this server's socket, in a warm process.")
+    parser.add_argument("--socket", default=default_socket_path(),
+                        help="Unix domain socket to listen on "
+                             "(default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="scripts run concurrently (default: %(default)s)")
+    options = parser.parse_args(args)
+    if options.workers < 1:
+        parser.error("--workers must be positive")
+    return options
+
+
+def _serve(args: list[str]):
+    options = _parse_serve_args(args)
+    serve(options.socket, options.workers, _main)
+
+
+def _main(args, source=None):
+    """Run the command line `args`; `source`, if given, stands for the
+    script."""
+    if args[1:2] == ["compile"]:
+        _compile(args[2:])
+        return
+    if args[1:2] == ["serve"]:
+        _serve(args[2:])
+        return
+    if args[1:2] == ["snapshot"]:
+        _snapshot(args[2:])
+        return
+
+    options = _parse_args(args[1:])
+    lox = PyLox(backend=options.backend, optimize=options.optimize)
+    if options.disassemble:
+        lox.interpreter.print_code = True
+    if options.max_frames is not None:
+        lox.interpreter.max_frames = options.max_frames
+    if options.snapshot:
+        try:
+            lox.restore(options.snapshot)
+        except SnapshotError as e:
+            sys.exit(f"lox: {e}")
+    try:
+        if source is not None:
+            lox.run(source, use_cache=not options.no_cache)
+            lox._exit_on_error()
+        elif options.script:
+            lox.run_file(options.script, use_cache=not options.no_cache)
+        else:
+            lox.run_prompt()
+    finally:
+        if options.stats:
+            lox.interpreter.stats.report()
+        if options.cache_stats:
+            lox.cache_stats.report()
 
 
 main = partial(_main, sys.argv)
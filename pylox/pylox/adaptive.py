@@ -0,0 +1,299 @@
+"""Tree-walk interpreter that specializes hot operator sites, in the spirit of
+CPython 3.11's adaptive interpreter.
+
+Every unary and binary expression gets a `_Site`. Its first evaluations go
+through the generic `unary`/`binary` path, counting down. When the counter
+hits zero, the site looks at the operands it just saw: if their type has a
+specialized variant (float-add, str-concat, float-lt, ...), the site is
+quickened to it. A quickened site only checks a cheap type guard, then applies
+the operator directly. When the guard fails, the site deoptimizes back to the
+generic path and waits twice as long before specializing again.
+
+Property accesses, method calls, `super` lookups and calls get inline caches
+instead. Keyed on the receiver's class (the callee's type, for calls), a cache
+remembers what the site resolved to last time: whether the name was a field
+or a method, and which method. Up to `POLYMORPHIC_LIMIT` classes are remembered
+per site; a class the cache has not seen takes the slow path and is added.
+
+Sites and caches are attached to their nodes: they are freed along with the
+code, and forks of an interpreter start from the sites it warmed up.
+"""
+import operator as op
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, TextIO
+
+from pylox.token import TokenType
+from pylox.expr import Expr, BinaryExpr, UnaryExpr, GetExpr, SuperExpr, CallExpr
+from pylox.environment import LocalEnvironment
+from pylox.function import LoxFunction, check_call
+from pylox.class_ import LoxInstance
+from pylox.native import get_property
+from pylox.error_handling import LoxRuntimeError
+from pylox.interpreter import Interpreter, binary, unary, divide
+
+
+WARMUP = 8          # generic evaluations before a site first specializes
+MAX_BACKOFF = 1024  # cap on the wait after repeated deoptimizations
+POLYMORPHIC_LIMIT = 4   # classes remembered by an inline cache
+
+
+# (operator, operand type) -> (variant name, implementation)
+_BINARY_VARIANTS: dict[tuple[TokenType, type], tuple[str, Callable]] = {
+    (TokenType.PLUS, float): ("float-add", op.add),
+    (TokenType.PLUS, str): ("str-concat", op.add),
+    (TokenType.MINUS, float): ("float-sub", op.sub),
+    (TokenType.STAR, float): ("float-mul", op.mul),
+    (TokenType.SLASH, float): ("float-div", divide),
+    (TokenType.GREATER, float): ("float-gt", op.gt),
+    (TokenType.GREATER_EQUAL, float): ("float-ge", op.ge),
+    (TokenType.LESS, float): ("float-lt", op.lt),
+    (TokenType.LESS_EQUAL, float): ("float-le", op.le),
+    (TokenType.EQUAL_EQUAL, float): ("float-eq", op.eq),
+    (TokenType.EQUAL_EQUAL, str): ("str-eq", op.eq),
+    (TokenType.BANG_EQUAL, float): ("float-ne", op.ne),
+    (TokenType.BANG_EQUAL, str): ("str-ne", op.ne),
+}
+
+_UNARY_VARIANTS: dict[tuple[TokenType, type], tuple[str, Callable]] = {
+    (TokenType.MINUS, float): ("float-neg", op.neg),
+    (TokenType.BANG, bool): ("bool-not", op.not_),
+}
+
+
+@dataclass
+class SpecializationStats:
+    specialized: int = 0
+    deoptimized: int = 0
+    variants: Counter = field(default_factory=Counter)
+    # per kind of inline cache: "get", "invoke", "super" and "call"
+    cache_hits: Counter = field(default_factory=Counter)
+    cache_misses: Counter = field(default_factory=Counter)
+
+    def report(self, file: TextIO = sys.stderr):
+        print(f"adaptive: {self.specialized} sites specialized, "
+              f"{self.deoptimized} deoptimized", file=file)
+        for variant, count in self.variants.most_common():
+            print(f"  {variant:<12} {count}", file=file)
+
+        print("inline caches: hits, misses", file=file)
+        for kind in ("get", "invoke", "super", "call"):
+            print(f"  {kind:<12} {self.cache_hits[kind]}, "
+                  f"{self.cache_misses[kind]}", file=file)
+
+
+class _Site:
+    """Specialization state of one operator expression."""
+
+    __slots__ = ("type_", "impl", "counter", "backoff")
+
+    def __init__(self) -> None:
+        self.type_: Optional[type] = None     # operand type guarded for
+        self.impl: Any = None                 # set along with `type_`
+        self.counter = WARMUP
+        self.backoff = WARMUP
+
+
+class _InlineCache:
+    """What one property access, `super` lookup or call site resolved to,
+    for each class seen at the site."""
+
+    __slots__ = ("key", "value", "entries")
+
+    def __init__(self) -> None:
+        # last class seen and what it resolved to, checked first
+        self.key: Any = None
+        self.value: Any = None
+        # every class seen: id(class) -> (class, what it resolved to)
+        self.entries: dict[int, tuple[Any, Any]] = {}
+
+    def lookup(self, key) -> tuple[bool, Any]:
+        if key is self.key:
+            return True, self.value
+        if (entry := self.entries.get(id(key))) is not None:
+            self.key, self.value = entry
+            return True, self.value
+        return False, None
+
+    def add(self, key, value):
+        self.key, self.value = key, value
+        if len(self.entries) < POLYMORPHIC_LIMIT:
+            self.entries[id(key)] = (key, value)
+
+
+class AdaptiveInterpreter(Interpreter):
+
+    def __init__(self, error_handler):
+        super().__init__(error_handler)
+        self.stats = SpecializationStats()
+
+    def fork(self, error_handler):
+        # The child starts from the sites specialized here, which it shares
+        child = super().fork(error_handler)
+        child.stats = SpecializationStats()
+        return child
+
+    def visit_BinaryExpr(self, expr: BinaryExpr):
+        left = self.evaluate(expr.left)
+        right = self.evaluate(expr.right)
+
+        site = self._site(expr)
+        type_ = site.type_
+        if type_ is not None:
+            if type(left) is type_ and type(right) is type_:
+                return site.impl(left, right)
+            self._deoptimize(site)
+        else:
+            site.counter -= 1
+            if site.counter <= 0:
+                key = (expr.operator.type_, type(left)) \
+                    if type(left) is type(right) else None
+                self._specialize(site, _BINARY_VARIANTS, key)
+
+        return binary(expr.operator, left, right)
+
+    def visit_UnaryExpr(self, expr: UnaryExpr):
+        right = self.evaluate(expr.right)
+
+        site = self._site(expr)
+        type_ = site.type_
+        if type_ is not None:
+            if type(right) is type_:
+                return site.impl(right)
+            self._deoptimize(site)
+        else:
+            site.counter -= 1
+            if site.counter <= 0:
+                self._specialize(site, _UNARY_VARIANTS,
+                                 (expr.operator.type_, type(right)))
+
+        return unary(expr.operator, right)
+
+    def visit_GetExpr(self, expr: GetExpr):
+        obj = self.evaluate(expr.obj)
+        if type(obj) is not LoxInstance:
+            return get_property(obj, expr.name.lexeme, expr.name)
+
+        cache = self._cache(expr)
+        name = expr.name.lexeme
+        fields = obj._fields
+        hit, method = cache.lookup(obj._class)
+        if hit:
+            # `None` when the name was a field: it must still be one
+            if method is None:
+                if name in fields:
+                    self.stats.cache_hits["get"] += 1
+                    return fields[name]
+            elif name not in fields:
+                self.stats.cache_hits["get"] += 1
+                return method.bind(obj)
+
+        self.stats.cache_misses["get"] += 1
+        value = obj.get(expr.name)
+        cache.add(obj._class,
+                  None if name in fields else obj._class.find_method(name))
+        return value
+
+    def visit_SuperExpr(self, expr: SuperExpr):
+        cache = self._cache(expr)
+        assert expr.location is not None    # `super` is always a local
+        distance, _ = expr.location
+        assert type(self._env) is LocalEnvironment
+        superclass = self._env.get_at(distance, 0)
+        obj = self._env.get_at(distance - 1, 0)
+
+        hit, method = cache.lookup(superclass)
+        if hit:
+            self.stats.cache_hits["super"] += 1
+        else:
+            self.stats.cache_misses["super"] += 1
+            if not (method := superclass.find_method(expr.method.lexeme)):
+                raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
+            cache.add(superclass, method)
+        return method.bind(obj)
+
+    def visit_CallExpr(self, expr: CallExpr):
+        if type(expr.callee) is GetExpr:
+            return self._invoke(expr, expr.callee)
+
+        callee = self.evaluate(expr.callee)
+
+        # Important: order of evaluating arguments is kept
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+
+        # A callee type already seen here is known to be callable: only its
+        # arity is left to check, skipping the slow protocol check
+        cache = self._cache(expr)
+        hit, _ = cache.lookup(type(callee))
+        if hit:
+            self.stats.cache_hits["call"] += 1
+            n_arguments = len(arguments)
+            f_arity = callee.arity()
+            if n_arguments != f_arity:
+                raise LoxRuntimeError(expr.paren, f"Expected {f_arity} arguments but got {n_arguments}.")
+        else:
+            self.stats.cache_misses["call"] += 1
+            check_call(callee, len(arguments), expr.paren)
+            cache.add(type(callee), True)
+
+        try:
+            return callee.call(self, *arguments)
+        except LoxRuntimeError as e:
+            if e.token is None:
+                e.token = expr.paren
+            raise
+
+    def _find_method(self, obj: LoxInstance, get: GetExpr) -> LoxFunction:
+        # The callee of `obj.name(...)` is never evaluated on its own: its
+        # cache holds the methods `name` resolved to at this call site
+        cache = self._cache(get)
+        hit, method = cache.lookup(obj._class)
+        if hit:
+            self.stats.cache_hits["invoke"] += 1
+            return method
+
+        self.stats.cache_misses["invoke"] += 1
+        method = super()._find_method(obj, get)
+        cache.add(obj._class, method)
+        return method
+
+    def _cache(self, expr: Expr) -> _InlineCache:
+        try:
+            return expr.site
+        except AttributeError:
+            return _add_site(expr, _InlineCache())
+
+    def _site(self, expr: Expr) -> _Site:
+        try:
+            return expr.site
+        except AttributeError:
+            return _add_site(expr, _Site())
+
+    def _specialize(self, site: _Site, variants,
+                    key: Optional[tuple[TokenType, type]]):
+        if key is None or key not in variants:
+            # Nothing to specialize for these operands, check again later
+            site.backoff = min(site.backoff * 2, MAX_BACKOFF)
+            site.counter = site.backoff
+            return
+
+        name, site.impl = variants[key]
+        site.type_ = key[1]
+        self.stats.specialized += 1
+        self.stats.variants[name] += 1
+
+    def _deoptimize(self, site: _Site):
+        # `impl` is left for whoever already passed the guard on `type_`, in
+        # another interpreter sharing the site
+        site.type_ = None
+        site.backoff = min(site.backoff * 2, MAX_BACKOFF)
+        site.counter = site.backoff
+        self.stats.deoptimized += 1
+
+
+def _add_site(expr: Expr, site):
+    """Attach `site` to `expr`, so that it lives as long as code that can run
+    the node, and is shared by the interpreters running it."""
+    object.__setattr__(expr, "site", site)
+    return site
@@ -0,0 +1,117 @@
+"""The built-in `Array` type.
+
+    var a = Array(3);           // [0, 0, 0]
+    a.set(0, 4);
+    a.append(2);
+    print a.get(0) + a.length();    // 8
+    a.sort();
+    print a.slice(0, 2);        // [0, 0]
+
+Indexes start at zero. An array holding only numbers keeps them unboxed in
+an `array('d')`; storing anything else in it switches it to a list.
+"""
+from array import array
+
+from pylox.native import NativeObject, NativeError, lox_method, stringify
+
+
+class Array(NativeObject):
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: array | list) -> None:
+        self._items = items
+
+    @staticmethod
+    def new(size) -> "Array":
+        """The `Array(size)` native: `size` zeros."""
+        return Array(array("d", bytes(8 * _size(size))))
+
+    @staticmethod
+    def of(values: list) -> "Array":
+        if all(type(value) is float for value in values):
+            return Array(array("d", values))
+        return Array(values)
+
+    def _index(self, index, upper: int) -> int:
+        if type(index) is not float or not index.is_integer():
+            raise NativeError("Array index must be an integer.")
+        if not 0 <= index <= upper:
+            raise NativeError("Array index out of range.")
+        return int(index)
+
+    def _accept(self, value):
+        if type(value) is not float and type(self._items) is array:
+            self._items = list(self._items)
+
+    @lox_method()
+    def get(self, index):
+        return self._items[self._index(index, len(self._items) - 1)]
+
+    @lox_method()
+    def set(self, index, value):
+        index = self._index(index, len(self._items) - 1)
+        self._accept(value)
+        self._items[index] = value
+        return value
+
+    @lox_method()
+    def append(self, value):
+        self._accept(value)
+        self._items.append(value)
+
+    @lox_method()
+    def length(self):
+        return float(len(self._items))
+
+    @lox_method()
+    def slice(self, start, end):
+        """Elements from `start` up to, but not including, `end`."""
+        end = self._index(end, len(self._items))
+        start = self._index(start, end)
+        return Array(self._items[start:end])
+
+    @lox_method()
+    def fill(self, value):
+        if type(value) is float:
+            self._items = array("d", [value]) * len(self._items)
+        else:
+            self._items = [value] * len(self._items)
+
+    @lox_method()
+    def copy(self):
+        return Array(self._items[:])
+
+    @lox_method()
+    def sort(self):
+        """Sort numbers, or strings, in place."""
+        items = self._items
+        if type(items) is array:
+            self._items = array("d", sorted(items))
+        elif all(type(item) is float for item in items) \
+                or all(type(item) is str for item in items):
+            items.sort()
+        else:
+            raise NativeError("Can only sort numbers or strings.")
+
+    @lox_method()
+    def sum(self):
+        return float(sum(self.numbers("Can only sum numbers.")))
+
+    def numbers(self, message: str) -> array | list:
+        """The elements, which must all be numbers, or raise `message`."""
+        items = self._items
+        if type(items) is not array \
+                and not all(type(item) is float for item in items):
+            raise NativeError(message)
+        return items
+
+    def __repr__(self) -> str:
+        return "[" + ", ".join(stringify(item) for item in self._items) + "]"
+
+
+def _size(size) -> int:
+    if type(size) is not float or not size.is_integer() or size < 0:
+        raise NativeError("Array size must be a non-negative integer.")
+    return int(size)
+
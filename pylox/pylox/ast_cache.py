@@ -0,0 +1,97 @@
+"""On-disk cache of parsed and resolved programs, as `.loxc` files.
+
+A `.loxc` file holds the statements of a program, optimized or not, once
+resolved: the nodes carry the locations the `Resolver` found for them, so the
+program runs without being scanned, parsed or resolved again. Files are keyed
+by a hash of the source, pylox's own source and whether the program was
+optimized, so any change to the parser, resolver or optimizer invalidates
+them. They live next to compiled Python programs, in
+`$XDG_CACHE_HOME/pylox`, where they are evicted least recently used first once
+they exceed `CACHE_MAX_BYTES`.
+"""
+import os
+import sys
+import pickle
+import hashlib
+from collections import Counter
+from typing import Optional
+
+from pylox.stmt import Stmt
+from pylox.cache import cache_dir, code_digest
+
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+SUFFIX = ".loxc"
+_MAGIC = b"LOXC"
+
+
+class CacheStats(Counter):
+    """Hits and misses of the `.loxc` cache."""
+
+    def report(self, file=sys.stderr):
+        print(f"loxc cache: {self['hits']} hits, {self['misses']} misses",
+              file=file)
+
+
+def _cache_path(src: str, optimized: bool) -> str:
+    key = f"{code_digest()}\0{optimized:d}\0{src}"
+    return os.path.join(cache_dir(),
+                        hashlib.sha256(key.encode()).hexdigest() + SUFFIX)
+
+
+def load_program(src: str, optimized: bool) -> Optional[list[Stmt]]:
+    path = _cache_path(src, optimized)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        os.utime(path)      # most recently used, last to be evicted
+    except OSError:
+        return None
+
+    if not data.startswith(_MAGIC):
+        return None
+    try:
+        return pickle.loads(data[len(_MAGIC):])
+    except (pickle.UnpicklingError, ValueError, EOFError, TypeError,
+            AttributeError, ImportError, RecursionError):
+        return None
+
+
+def store_program(src: str, optimized: bool, statements: list[Stmt],
+                  max_bytes: int = CACHE_MAX_BYTES):
+    path = _cache_path(src, optimized)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        data = pickle.dumps(statements, protocol=pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        return      # too deeply nested to pickle: parsed every time instead
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC + data)
+        os.replace(tmp_path, path)      # readers never see a partial file
+        _evict(os.path.dirname(path), max_bytes)
+    except OSError as e:
+        print(f"WARNING: cannot cache program: {e}", file=sys.stderr)
+
+
+def _evict(directory: str, max_bytes: int):
+    """Remove the least recently used `.loxc` files beyond `max_bytes`."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(SUFFIX):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue    # evicted by another process meanwhile
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,21 @@
+"""Where pylox caches what it compiles, and what tells its versions apart."""
+import os
+import hashlib
+from functools import cache
+from pathlib import Path
+
+
+def cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "pylox")
+
+
+@cache
+def code_digest() -> str:
+    """Hash of pylox's own source, which changes with any edit of the
+    interpreter, unlike its version number."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(path.name.encode() + b"\0")
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
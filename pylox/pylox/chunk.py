@@ -0,0 +1,73 @@
+from array import array
+from bisect import bisect_right
+from enum import IntEnum
+from typing import Any
+
+
+class OpCode(IntEnum):
+    """Same instruction set, in the same order, as clox's `chunk.h`."""
+    OP_CONSTANT = 0
+    OP_NIL = 1
+    OP_TRUE = 2
+    OP_FALSE = 3
+    OP_POP = 4
+    OP_GET_LOCAL = 5
+    OP_SET_LOCAL = 6
+    OP_GET_GLOBAL = 7
+    OP_DEFINE_GLOBAL = 8
+    OP_SET_GLOBAL = 9
+    OP_GET_UPVALUE = 10
+    OP_SET_UPVALUE = 11
+    OP_CLOSE_UPVALUE = 12
+    OP_GET_PROPERTY = 13
+    OP_SET_PROPERTY = 14
+    OP_GET_SUPER = 15
+    OP_EQUAL = 16
+    OP_GREATER = 17
+    OP_LESS = 18
+    OP_ADD = 19
+    OP_SUBTRACT = 20
+    OP_MULTIPLY = 21
+    OP_DIVIDE = 22
+    OP_NOT = 23
+    OP_NEGATE = 24
+    OP_PRINT = 25
+    OP_JUMP = 26
+    OP_JUMP_IF_FALSE = 27
+    OP_LOOP = 28
+    OP_CALL = 29
+    OP_INVOKE = 30
+    OP_SUPER_INVOKE = 31
+    OP_CLOSURE = 32
+    OP_RETURN = 33
+    OP_CLASS = 34
+    OP_INHERIT = 35
+    OP_METHOD = 36
+
+
+class Chunk:
+    """A flat sequence of bytecode, with its constant pool and line table.
+
+    Like clox, lines are run-length encoded: `lines` holds one
+    (offset, line) pair per run of instructions coming from the same line.
+    """
+
+    __slots__ = ("code", "constants", "lines")
+
+    def __init__(self) -> None:
+        self.code = array("B")
+        self.constants: list[Any] = []
+        self.lines: list[tuple[int, int]] = []
+
+    def write(self, byte: int, line: int) -> None:
+        self.code.append(byte)
+        if not self.lines or self.lines[-1][1] != line:
+            self.lines.append((len(self.code) - 1, line))
+
+    def add_constant(self, value: Any) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def get_line(self, offset: int) -> int:
+        index = bisect_right(self.lines, offset, key=lambda start: start[0])
+        return self.lines[index - 1][1]
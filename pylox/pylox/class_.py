@@ -19,29 +19,40 @@ class LoxClass(LoxCallable):
     name: str
     superclass: Optional["LoxClass"] = field(default=None)
     methods: dict[str, LoxFunction] = field(default_factory=dict)
+    # Computed once the class is defined: inherited methods copied down and
+    # overridden, so that any lookup is a single probe, however deep the
+    # hierarchy. Classes are immutable once defined, so it never goes stale
+    method_table: dict[str, LoxFunction] = field(init=False, repr=False,
+                                                 compare=False)
+    initializer: Optional[LoxFunction] = field(init=False, repr=False,
+                                               compare=False)
+    _arity: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        inherited = self.superclass.method_table if self.superclass else {}
+        self.method_table = inherited | self.methods
+        self.initializer = self.method_table.get("init")
+        self._arity = self.initializer.arity() if self.initializer else 0
 
     def __repr__(self):
         return self.name
 
+    def __deepcopy__(self, memo):
+        # Classes never change once defined: copied instances share theirs
+        return self
+
     def call(self, interpreter, *arguments) -> "LoxInstance":
         instance = LoxInstance(_class=self)
-        initializer = self.find_method("init")
-        if initializer:
-            initializer.bind(instance).call(interpreter, *arguments)
+        if self.initializer:
+            self.initializer.call_bound(interpreter, instance, list(arguments))
 
         return instance
 
     def arity(self) -> int:
-        initializer = self.find_method("init")
-        return initializer.arity() if initializer else 0
+        return self._arity
 
     def find_method(self, name: str) -> Optional[LoxFunction]:
-        if name in self.methods:
-            return self.methods[name]
-        elif self.superclass:
-            return self.superclass.find_method(name)
-        else:
-            return None
+        return self.method_table.get(name)
 
 
 @dataclass
@@ -55,7 +66,7 @@ class LoxInstance:
     def get(self, name: Token) -> Any:
         if name.lexeme in self._fields:
             return self._fields[name.lexeme]
-        elif method := self._class.find_method(name.lexeme):
+        elif method := self._class.method_table.get(name.lexeme):
             return method.bind(self)
         else:
             raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
@@ -0,0 +1,81 @@
+"""Thin client of `lox serve`.
+
+When `PYLOX_SERVER` names the socket of a running server, `./lox` hands its
+arguments, working directory and standard streams over to it instead of
+running the script itself: the script writes straight to the client's
+terminal, and the client exits with the script's status. Without a server
+listening there, `./lox` runs the script locally as usual.
+
+This module only depends on the standard library, so that forwarding a script
+costs no more than starting Python.
+"""
+import os
+import sys
+import json
+import socket
+import struct
+import tempfile
+from typing import Any, Optional, Sequence
+
+SERVER_ENV = "PYLOX_SERVER"
+
+_HEADER = struct.Struct("!I")
+
+
+def default_socket_path() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"pylox-{os.getuid()}.sock")
+
+
+def send_message(sock: socket.socket, message: dict[str, Any],
+                 fds: Sequence[int] = ()):
+    data = json.dumps(message).encode()
+    socket.send_fds(sock, [_HEADER.pack(len(data)) + data], list(fds))
+
+
+def recv_message(sock: socket.socket, max_fds: int = 0) \
+        -> tuple[dict[str, Any], list[int]]:
+    """Next message on `sock`, and the file descriptors sent along with it."""
+    data, fds, _, _ = socket.recv_fds(sock, 1 << 16, max_fds)
+    if len(data) < _HEADER.size:
+        raise ConnectionError("connection closed")
+    size, = _HEADER.unpack_from(data)
+    data = data[_HEADER.size:]
+    while len(data) < size:
+        if not (chunk := sock.recv(size - len(data))):
+            raise ConnectionError("connection closed")
+        data += chunk
+    return json.loads(data), fds
+
+
+def submit(sock: socket.socket, args: list[str],
+           source: Optional[str] = None) -> int:
+    """Run `lox args` on the server connected to `sock`, with our standard
+    streams, and return its exit status. `source`, if given, is run instead
+    of a script file."""
+    request = {"args": args, "cwd": os.getcwd(), "source": source}
+    send_message(sock, request, fds=[0, 1, 2])
+    reply, _ = recv_message(sock)
+    return reply["status"]
+
+
+def forward(argv: list[str]) -> Optional[int]:
+    """Exit status of `argv` run by the server `PYLOX_SERVER` names, `None`
+    if it should be run locally."""
+    path = os.environ.get(SERVER_ENV)
+    if not path or argv[1:2] == ["serve"]:
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with sock:
+        try:
+            sock.connect(path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+        try:
+            return submit(sock, argv[1:])
+        except KeyboardInterrupt:
+            return 130      # closing the connection stops the script
+        except ConnectionError as e:
+            print(f"lox: lost connection to server: {e}", file=sys.stderr)
+            return 70
@@ -0,0 +1,686 @@
+from typing import Any, Callable, Optional
+
+from pylox.token import Token, TokenType
+from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
+                  VarExpr, AssignExpr, LogicalExpr, CallExpr, GetExpr, SetExpr,
+                  ThisExpr, SuperExpr)
+from pylox.stmt import (Stmt, ExpressionStmt, PrintStmt, VarStmt, BlockStmt, IfStmt,
+                  WhileStmt, FunctionStmt, ReturnStmt, ClassStmt)
+from pylox.callable import LoxCallable
+from pylox.function import LoxFunction, TailCall, check_call
+from pylox.class_ import LoxClass, LoxInstance
+from pylox.environment import Environment, LocalEnvironment
+from pylox.error_handling import LoxRuntimeError, ErrorHandler
+from pylox.interpreter import is_equal, stringify, divide, _NativeClock
+from pylox.memo import NativeMemoize
+from pylox.native import (NativeFunction, get_property, native_method,
+                          invoke_native)
+from pylox.stdlib import standard_natives
+
+
+# A compiled expression evaluates to a Lox value. A compiled statement returns
+# `None` when it completes normally, or a 1-tuple holding the returned value
+# when a `return` statement was executed, so no exception is needed to unwind.
+# `return f(...)` returns a `TailCall` instead, made by the caller once the
+# returning function is done (`_complete`).
+CompiledExpr = Callable[[Environment | LocalEnvironment], Any]
+CompiledStmt = Callable[[Environment | LocalEnvironment], Optional[tuple]]
+
+
+def _param_names(function: FunctionStmt) -> tuple[str, ...]:
+    return tuple(param.lexeme for param in function.params)
+
+
+def _complete(interpreter, completion) -> Any:
+    """Value returned by a function whose body ended with `completion`.
+    Tail calls are run in this loop when they are to compiled functions, so
+    tail recursion needs no Python stack."""
+    while True:
+        if completion is None:
+            return None
+        if type(completion) is tuple:
+            return completion[0]
+
+        callee, arguments = completion.callee, completion.arguments
+        paren = completion.paren
+        if type(callee) is not ClosureFunction or callee._is_initializer:
+            check_call(callee, len(arguments), paren)
+            try:
+                return callee.call(interpreter, *arguments)
+            except LoxRuntimeError as e:
+                if e.token is None:
+                    e.token = paren
+                raise
+        if len(arguments) != len(callee._params):
+            raise LoxRuntimeError(
+                paren,
+                f"Expected {len(callee._params)} arguments but got {len(arguments)}.")
+        completion = callee._body(LocalEnvironment(callee._closure, arguments))
+
+
+class ClosureFunction(LoxFunction):
+    """LoxFunction whose body was compiled once into a Python closure."""
+
+    def __init__(self, declaration: FunctionStmt,
+                 closure: Environment | LocalEnvironment, body: CompiledStmt, params: tuple[str, ...],
+                 is_initializer: bool = False):
+        super().__init__(declaration, closure, is_initializer)
+        self._body = body
+        self._params = params
+
+    def arity(self) -> int:
+        return len(self._params)
+
+    def call(self, intepreter, *arguments):
+        completion = self._body(LocalEnvironment(self._closure, list(arguments)))
+
+        if self._is_initializer:
+            # `init` method always return `this`
+            return self._closure.values[0]
+        if type(completion) is tuple:
+            return completion[0]
+        return _complete(intepreter, completion)
+
+    def call_bound(self, intepreter, instance, arguments: list):
+        env = LocalEnvironment(self._closure, [instance])
+        completion = self._body(LocalEnvironment(env, arguments))
+
+        if self._is_initializer:
+            return instance
+        if type(completion) is tuple:
+            return completion[0]
+        return _complete(intepreter, completion)
+
+    def bind(self, instance):
+        env = LocalEnvironment(self._closure, [instance])
+        return ClosureFunction(self._declaration,
+                               closure=env,
+                               body=self._body,
+                               params=self._params,
+                               is_initializer=self._is_initializer)
+
+
+class ClosureCompiler:
+    """Turn a resolved AST into a tree of pre-bound Python closures.
+
+    Each node is visited exactly once. Everything known statically (operator,
+    resolved depth, variable name, child closures) is captured by the returned
+    closure, so running the program does no dispatch on node types.
+    """
+
+    def __init__(self, interpreter: "ClosureInterpreter"):
+        self._interpreter = interpreter
+        self._globals = interpreter.global_env._values
+        self._scope_depth = 0       # 0 means declarations go to globals
+
+    def compile(self, node: Expr | Stmt):
+        return getattr(self, f"compile_{type(node).__name__}")(node)
+
+    def compile_block(self, statements: list[Stmt],
+                      new_scope: bool = False) -> CompiledStmt:
+        if new_scope:
+            self._scope_depth += 1
+        try:
+            compiled = tuple(self.compile(s) for s in statements)
+        finally:
+            if new_scope:
+                self._scope_depth -= 1
+
+        if not compiled:
+            def block(env):
+                return None
+        elif len(compiled) == 1:
+            block = compiled[0]
+        elif len(compiled) == 2:
+            first, second = compiled
+
+            def block(env):
+                completion = first(env)
+                if completion is not None:
+                    return completion
+                return second(env)
+        else:
+            def block(env):
+                for stmt in compiled:
+                    completion = stmt(env)
+                    if completion is not None:
+                        return completion
+                return None
+
+        return block
+
+    ### Statements
+    def compile_ExpressionStmt(self, stmt: ExpressionStmt) -> CompiledStmt:
+        expr = self.compile(stmt.expr)
+
+        def expression_stmt(env):
+            expr(env)
+
+        return expression_stmt
+
+    def compile_PrintStmt(self, stmt: PrintStmt) -> CompiledStmt:
+        expr = self.compile(stmt.expr)
+
+        def print_stmt(env):
+            print(stringify(expr(env)))
+
+        return print_stmt
+
+    def compile_VarStmt(self, stmt: VarStmt) -> CompiledStmt:
+        name = stmt.name.lexeme
+        initializer = self.compile(stmt.initializer) if stmt.initializer \
+                else None
+
+        if self._scope_depth == 0:
+            globals_ = self._globals
+
+            def var_stmt(env):
+                globals_[name] = initializer(env) if initializer else None
+        elif initializer:
+            def var_stmt(env):
+                env.values.append(initializer(env))
+        else:
+            def var_stmt(env):
+                env.values.append(None)
+
+        return var_stmt
+
+    def compile_BlockStmt(self, stmt: BlockStmt) -> CompiledStmt:
+        body = self.compile_block(stmt.statements, new_scope=True)
+
+        if stmt.inline:
+            def block_stmt(env):
+                values = env.values
+                mark = len(values)
+                try:
+                    return body(env)
+                finally:
+                    del values[mark:]     # the block's variables
+        else:
+            def block_stmt(env):
+                return body(LocalEnvironment(env))
+
+        return block_stmt
+
+    def compile_IfStmt(self, stmt: IfStmt) -> CompiledStmt:
+        condition = self.compile(stmt.condition)
+        then_branch = self.compile(stmt.then_branch)
+
+        if stmt.else_branch:
+            else_branch = self.compile(stmt.else_branch)
+
+            def if_stmt(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+                return else_branch(env)
+        else:
+            def if_stmt(env):
+                value = condition(env)
+                if value is not None and value is not False:
+                    return then_branch(env)
+                return None
+
+        return if_stmt
+
+    def compile_WhileStmt(self, stmt: WhileStmt) -> CompiledStmt:
+        condition = self.compile(stmt.condition)
+        body = self.compile(stmt.body)
+
+        def while_stmt(env):
+            while True:
+                value = condition(env)
+                if value is None or value is False:
+                    return None
+                completion = body(env)
+                if completion is not None:
+                    return completion
+
+        return while_stmt
+
+    def compile_FunctionStmt(self, stmt: FunctionStmt) -> CompiledStmt:
+        name = stmt.name.lexeme
+        body = self.compile_block(stmt.body, new_scope=True)
+        params = _param_names(stmt)
+        define = self._definer(name)
+
+        def function_stmt(env):
+            define(env, ClosureFunction(stmt, env, body, params))
+
+        return function_stmt
+
+    def compile_ReturnStmt(self, stmt: ReturnStmt) -> CompiledStmt:
+        if not stmt.value:
+            def return_stmt(env):
+                return (None,)
+        elif type(stmt.value) is CallExpr:
+            # A call in tail position is made by the returning function's
+            # caller, once this function's frame is gone
+            callee_expr = self.compile(stmt.value.callee)
+            argument_exprs = tuple(self.compile(arg)
+                                   for arg in stmt.value.arguments)
+            paren = stmt.value.paren
+
+            def return_stmt(env):
+                callee = callee_expr(env)
+                return TailCall(callee, [arg(env) for arg in argument_exprs],
+                                paren)
+        else:
+            value = self.compile(stmt.value)
+
+            def return_stmt(env):
+                return (value(env),)
+
+        return return_stmt
+
+    def compile_ClassStmt(self, stmt: ClassStmt) -> CompiledStmt:
+        name = stmt.name
+        superclass_expr = self.compile(stmt.superclass) if stmt.superclass \
+                else None
+        methods = [
+            (method, self.compile_block(method.body, new_scope=True),
+             _param_names(method),
+             method.name.lexeme == "init")
+            for method in stmt.methods
+        ]
+
+        define = self._definer(name.lexeme)
+
+        def class_stmt(env):
+            if superclass_expr:
+                superclass = superclass_expr(env)
+                if not isinstance(superclass, LoxClass):
+                    raise LoxRuntimeError(stmt.superclass.name,
+                                          "Superclass must be a class.")
+            else:
+                superclass = None
+
+            if superclass_expr:
+                method_env = LocalEnvironment(env, [superclass])
+            else:
+                method_env = env
+
+            _class = LoxClass(name.lexeme, superclass, {
+                method.name.lexeme: ClosureFunction(method, method_env, body,
+                                                    params, is_initializer)
+                for method, body, params, is_initializer in methods
+            })
+            define(env, _class)
+
+        return class_stmt
+
+    ### Expressions
+    def compile_LiteralExpr(self, expr: LiteralExpr) -> CompiledExpr:
+        value = expr.value
+
+        def literal(env):
+            return value
+
+        return literal
+
+    def compile_GroupingExpr(self, expr: GroupingExpr) -> CompiledExpr:
+        # Grouping only matters to the parser
+        return self.compile(expr.inner)
+
+    def compile_VarExpr(self, expr: VarExpr) -> CompiledExpr:
+        return self._lookup_variable(expr.name, expr)
+
+    def compile_ThisExpr(self, expr: ThisExpr) -> CompiledExpr:
+        return self._lookup_variable(expr.keyword, expr)
+
+    def compile_AssignExpr(self, expr: AssignExpr) -> CompiledExpr:
+        value = self.compile(expr.value)
+        name = expr.name
+        lexeme = name.lexeme
+        location = expr.location
+
+        if location is None:
+            globals_ = self._globals
+
+            def assign(env):
+                result = value(env)
+                if lexeme not in globals_:
+                    raise LoxRuntimeError(name, f"Undefined variable '{lexeme}'.")
+                globals_[lexeme] = result
+                return result
+        elif location[0] == 0:
+            slot = location[1]
+
+            def assign(env):
+                result = env.values[slot] = value(env)
+                return result
+        elif location[0] == 1:
+            slot = location[1]
+
+            def assign(env):
+                result = env.enclosing.values[slot] = value(env)
+                return result
+        else:
+            def assign(env):
+                result = value(env)
+                env.assign_at(*location, result)
+                return result
+
+        return assign
+
+    def compile_UnaryExpr(self, expr: UnaryExpr) -> CompiledExpr:
+        operator = expr.operator
+        right = self.compile(expr.right)
+
+        match operator.type_:
+            case TokenType.MINUS:
+                def unary(env):
+                    value = right(env)
+                    if type(value) is not float:
+                        raise LoxRuntimeError(operator, "Operand must be a number.")
+                    return -value
+            case TokenType.BANG:
+                def unary(env):
+                    value = right(env)
+                    return value is None or value is False
+            case _:
+                def unary(env):
+                    right(env)
+                    return None
+
+        return unary
+
+    def compile_BinaryExpr(self, expr: BinaryExpr) -> CompiledExpr:
+        operator = expr.operator
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        def numeric(op):
+            def binary(env):
+                a = left(env)
+                b = right(env)
+                if type(a) is float and type(b) is float:
+                    return op(a, b)
+                raise LoxRuntimeError(operator, "Operands must be numbers.")
+            return binary
+
+        match operator.type_:
+            case TokenType.MINUS:
+                def binary(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a - b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+            case TokenType.STAR:
+                def binary(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a * b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+            case TokenType.SLASH:
+                binary = numeric(divide)
+            case TokenType.PLUS:
+                def binary(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is type(b) and (type(a) is float or type(a) is str):
+                        return a + b
+                    raise LoxRuntimeError(
+                        operator, "Operands must be two numbers or two strings.")
+            case TokenType.LESS:
+                def binary(env):
+                    a = left(env)
+                    b = right(env)
+                    if type(a) is float and type(b) is float:
+                        return a < b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+            case TokenType.LESS_EQUAL:
+                binary = numeric(float.__le__)
+            case TokenType.GREATER:
+                binary = numeric(float.__gt__)
+            case TokenType.GREATER_EQUAL:
+                binary = numeric(float.__ge__)
+            case TokenType.EQUAL_EQUAL:
+                def binary(env):
+                    return is_equal(left(env), right(env))
+            case TokenType.BANG_EQUAL:
+                def binary(env):
+                    return not is_equal(left(env), right(env))
+            case _:
+                def binary(env):
+                    left(env)
+                    right(env)
+                    return None
+
+        return binary
+
+    def compile_LogicalExpr(self, expr: LogicalExpr) -> CompiledExpr:
+        left = self.compile(expr.left)
+        right = self.compile(expr.right)
+
+        # Short-circuit: return the operand itself, not a boolean
+        if expr.operator.type_ == TokenType.OR:
+            def logical(env):
+                value = left(env)
+                if value is not None and value is not False:
+                    return value
+                return right(env)
+        else:
+            def logical(env):
+                value = left(env)
+                if value is None or value is False:
+                    return value
+                return right(env)
+
+        return logical
+
+    def compile_CallExpr(self, expr: CallExpr) -> CompiledExpr:
+        if type(expr.callee) is GetExpr:
+            return self._compile_invoke(expr, expr.callee)
+
+        callee_expr = self.compile(expr.callee)
+        argument_exprs = tuple(self.compile(arg) for arg in expr.arguments)
+        paren = expr.paren
+        n_arguments = len(argument_exprs)
+        interpreter = self._interpreter
+
+        def call(env):
+            callee = callee_expr(env)
+
+            # Important: order of evaluating arguments is kept
+            arguments = [arg(env) for arg in argument_exprs]
+
+            if type(callee) is ClosureFunction:
+                if n_arguments != len(callee._params):
+                    raise LoxRuntimeError(
+                        paren,
+                        f"Expected {len(callee._params)} arguments but got {n_arguments}.")
+                if callee._is_initializer:
+                    return callee.call(interpreter, *arguments)
+
+                # Inlined ClosureFunction.call, the hottest path of all
+                completion = callee._body(
+                    LocalEnvironment(callee._closure, arguments))
+                if type(completion) is tuple:
+                    return completion[0]
+                return _complete(interpreter, completion)
+
+            # Checking against the runtime protocol is slow, classes and
+            # natives skip it
+            if type(callee) is not LoxClass \
+                    and type(callee) is not NativeFunction \
+                    and not isinstance(callee, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+
+            f_arity = callee.arity()
+            if n_arguments != f_arity:
+                raise LoxRuntimeError(paren, f"Expected {f_arity} arguments but got {n_arguments}.")
+
+            try:
+                return callee.call(interpreter, *arguments)
+            except LoxRuntimeError as e:
+                if e.token is None:
+                    e.token = paren
+                raise
+
+        return call
+
+    def _compile_invoke(self, expr: CallExpr, get: GetExpr) -> CompiledExpr:
+        """`obj.name(...)`: call the method of `obj` directly, rather than
+        binding it to `obj` first, only to call and discard the result"""
+        obj_expr = self.compile(get.obj)
+        argument_exprs = tuple(self.compile(arg) for arg in expr.arguments)
+        name = get.name
+        lexeme = name.lexeme
+        paren = expr.paren
+        n_arguments = len(argument_exprs)
+        interpreter = self._interpreter
+
+        def invoke(env):
+            obj = obj_expr(env)
+            if not isinstance(obj, LoxInstance):
+                native = native_method(obj, lexeme, name)
+                arguments = [arg(env) for arg in argument_exprs]
+                return invoke_native(obj, native, arguments, paren)
+
+            if lexeme in obj._fields:
+                callee = obj._fields[lexeme]
+                arguments = [arg(env) for arg in argument_exprs]
+                check_call(callee, n_arguments, paren)
+                try:
+                    return callee.call(interpreter, *arguments)
+                except LoxRuntimeError as e:
+                    if e.token is None:
+                        e.token = paren
+                    raise
+
+            if (method := obj._class.find_method(lexeme)) is None:
+                raise LoxRuntimeError(name, f"Undefined property '{lexeme}'.")
+            arguments = [arg(env) for arg in argument_exprs]
+            if n_arguments != method.arity():
+                raise LoxRuntimeError(
+                    paren,
+                    f"Expected {method.arity()} arguments but got {n_arguments}.")
+            return method.call_bound(interpreter, obj, arguments)
+
+        return invoke
+
+    def compile_GetExpr(self, expr: GetExpr) -> CompiledExpr:
+        obj_expr = self.compile(expr.obj)
+        name = expr.name
+
+        def get(env):
+            obj = obj_expr(env)
+            if isinstance(obj, LoxInstance):
+                return obj.get(name)
+            return get_property(obj, name.lexeme, name)
+
+        return get
+
+    def compile_SetExpr(self, expr: SetExpr) -> CompiledExpr:
+        obj_expr = self.compile(expr.obj)
+        value_expr = self.compile(expr.value)
+        name = expr.name
+
+        def set_(env):
+            obj = obj_expr(env)
+            if not isinstance(obj, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+            value = value_expr(env)
+            obj.set(name, value)
+            return value
+
+        return set_
+
+    def compile_SuperExpr(self, expr: SuperExpr) -> CompiledExpr:
+        assert expr.location is not None    # `super` is always a local
+        distance, _ = expr.location
+        assert distance
+        method_name = expr.method
+
+        def super_(env):
+            superclass = env.get_at(distance, 0)
+            # the env where `this` is bound is always right inside the env
+            # where `super` is stored
+            obj = env.get_at(distance - 1, 0)
+            if not (method := superclass.find_method(method_name.lexeme)):
+                raise LoxRuntimeError(
+                    method_name, f"Undefined property '{method_name.lexeme}'.")
+            return method.bind(obj)
+
+        return super_
+
+    def _lookup_variable(self, name: Token, expr: VarExpr | ThisExpr) \
+            -> CompiledExpr:
+        lexeme = name.lexeme
+        location = expr.location
+
+        if location is None:
+            globals_ = self._globals
+
+            def lookup(env):
+                try:
+                    return globals_[lexeme]
+                except KeyError:
+                    raise LoxRuntimeError(
+                        name, f"Undefined variable '{lexeme}'.") from None
+        elif location[0] == 0:
+            slot = location[1]
+
+            def lookup(env):
+                return env.values[slot]
+        elif location[0] == 1:
+            slot = location[1]
+
+            def lookup(env):
+                return env.enclosing.values[slot]
+        elif location[0] == 2:
+            slot = location[1]
+
+            def lookup(env):
+                return env.enclosing.enclosing.values[slot]
+        else:
+            def lookup(env):
+                return env.get_at(*location)
+
+        return lookup
+
+    def _definer(self, name: str) -> Callable[[Any, Any], None]:
+        if self._scope_depth == 0:
+            globals_ = self._globals
+
+            def define(env, value):
+                globals_[name] = value
+        else:
+            def define(env, value):
+                env.values.append(value)
+
+        return define
+
+
+class ClosureInterpreter:
+    """Execution backend running programs compiled by `ClosureCompiler`.
+
+    Exposes the same interface as `Interpreter` towards `PyLox`.
+    """
+
+    def __init__(self, error_handler: ErrorHandler):
+        self._handler = error_handler
+        self._GLOBAL_ENV: Environment = Environment()
+        self._GLOBAL_ENV.define("clock", _NativeClock())
+        self._GLOBAL_ENV.define("memoize", NativeMemoize())
+        for name, native in standard_natives().items():
+            self._GLOBAL_ENV.define(name, native)
+
+        self._compiler = ClosureCompiler(self)
+
+    @property
+    def global_env(self) -> Environment:
+        return self._GLOBAL_ENV
+
+    def define(self, name: str, value):
+        self._GLOBAL_ENV.define(name, value)
+
+    def interpret(self, statements: list[Stmt]):
+        program = self._compiler.compile_block(statements)
+        try:
+            program(self._GLOBAL_ENV)
+        except LoxRuntimeError as e:
+            self._handler.runtime_error(e)
@@ -0,0 +1,443 @@
+"""Single-pass compiler from the resolved AST to bytecode for `pylox.vm`.
+
+It follows clox's `compiler.c`: locals live in stack slots numbered at compile
+time, variables captured by a closure become upvalues, and `a.b(...)` and
+`super.b(...)` compile to the fused OP_INVOKE and OP_SUPER_INVOKE. The
+Resolver has already reported every static error but clox's hard limits.
+
+As in clox, `a >= b` compiles to `!(a < b)` (and `a <= b` to `!(a > b)`),
+which only differs from the tree-walk interpreter when an operand is NaN.
+"""
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from pylox.token import Token, TokenType
+from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
+                  VarExpr, AssignExpr, LogicalExpr, CallExpr, GetExpr, SetExpr,
+                  ThisExpr, SuperExpr)
+from pylox.stmt import (Stmt, ExpressionStmt, PrintStmt, VarStmt, BlockStmt, IfStmt,
+                  WhileStmt, FunctionStmt, ReturnStmt, ClassStmt)
+from pylox.function import FunctionType
+from pylox.chunk import OpCode
+from pylox.object import ObjFunction
+from pylox.error_handling import ErrorHandler
+
+
+UINT8_COUNT = 256
+UINT16_MAX = 65535
+
+
+@dataclass(slots=True)
+class _Local:
+    name: str
+    depth: int                  # -1 until the variable is initialized
+    is_captured: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class _Upvalue:
+    index: int                  # slot in the enclosing function, or its upvalue
+    is_local: bool
+
+
+class _FunctionState:
+    """Per-function compilation state, clox's `Compiler` struct."""
+
+    def __init__(self, enclosing: Optional["_FunctionState"],
+                 function: ObjFunction, type_: FunctionType) -> None:
+        self.enclosing = enclosing
+        self.function = function
+        self.type = type_
+        # slot zero holds the called closure, or `this` inside methods
+        receiver = "" if type_ in (FunctionType.NONE, FunctionType.FUNCTION) \
+            else "this"
+        self.locals: list[_Local] = [_Local(receiver, depth=0)]
+        self.upvalues: list[_Upvalue] = []
+        self.scope_depth = 0
+        self.identifiers: dict[str, int] = {}     # name -> constant index
+
+
+_BINARY_OPS: dict[TokenType, tuple[OpCode, ...]] = {
+    TokenType.BANG_EQUAL: (OpCode.OP_EQUAL, OpCode.OP_NOT),
+    TokenType.EQUAL_EQUAL: (OpCode.OP_EQUAL,),
+    TokenType.GREATER: (OpCode.OP_GREATER,),
+    TokenType.GREATER_EQUAL: (OpCode.OP_LESS, OpCode.OP_NOT),
+    TokenType.LESS: (OpCode.OP_LESS,),
+    TokenType.LESS_EQUAL: (OpCode.OP_GREATER, OpCode.OP_NOT),
+    TokenType.PLUS: (OpCode.OP_ADD,),
+    TokenType.MINUS: (OpCode.OP_SUBTRACT,),
+    TokenType.STAR: (OpCode.OP_MULTIPLY,),
+    TokenType.SLASH: (OpCode.OP_DIVIDE,),
+}
+
+
+class Compiler:
+
+    def __init__(self, error_handler: ErrorHandler):
+        self._handler = error_handler
+        self._state = _FunctionState(None, ObjFunction(), FunctionType.NONE)
+        self._line = 1
+        self._had_error = False
+
+    def compile(self, statements: list[Stmt]) -> Optional[ObjFunction]:
+        """Compile a whole script, `None` if it broke one of the limits."""
+        self._had_error = False
+        self._state = _FunctionState(None, ObjFunction(), FunctionType.NONE)
+        for stmt in statements:
+            self._compile(stmt)
+        function = self._end_function()
+
+        return None if self._had_error else function
+
+    def _compile(self, node: Expr | Stmt):
+        return getattr(self, f"compile_{type(node).__name__}")(node)
+
+    ### Statements
+    def compile_ExpressionStmt(self, stmt: ExpressionStmt):
+        self._compile(stmt.expr)
+        self._emit(OpCode.OP_POP)
+
+    def compile_PrintStmt(self, stmt: PrintStmt):
+        self._compile(stmt.expr)
+        self._emit(OpCode.OP_PRINT)
+
+    def compile_VarStmt(self, stmt: VarStmt):
+        self._line = stmt.name.line
+        self._declare_variable(stmt.name)
+        if stmt.initializer:
+            self._compile(stmt.initializer)
+        else:
+            self._emit(OpCode.OP_NIL)
+        self._define_variable(stmt.name)
+
+    def compile_BlockStmt(self, stmt: BlockStmt):
+        self._begin_scope()
+        for s in stmt.statements:
+            self._compile(s)
+        self._end_scope()
+
+    def compile_IfStmt(self, stmt: IfStmt):
+        self._compile(stmt.condition)
+        then_jump = self._emit_jump(OpCode.OP_JUMP_IF_FALSE)
+        self._emit(OpCode.OP_POP)
+        self._compile(stmt.then_branch)
+
+        else_jump = self._emit_jump(OpCode.OP_JUMP)
+        self._patch_jump(then_jump)
+        self._emit(OpCode.OP_POP)
+        if stmt.else_branch:
+            self._compile(stmt.else_branch)
+        self._patch_jump(else_jump)
+
+    def compile_WhileStmt(self, stmt: WhileStmt):
+        loop_start = len(self._chunk.code)
+        self._compile(stmt.condition)
+        exit_jump = self._emit_jump(OpCode.OP_JUMP_IF_FALSE)
+        self._emit(OpCode.OP_POP)
+        self._compile(stmt.body)
+        self._emit_loop(loop_start)
+
+        self._patch_jump(exit_jump)
+        self._emit(OpCode.OP_POP)
+
+    def compile_FunctionStmt(self, stmt: FunctionStmt):
+        self._line = stmt.name.line
+        self._declare_variable(stmt.name)
+        self._mark_initialized()    # a function may refer to itself
+        self._function(stmt, FunctionType.FUNCTION)
+        self._define_variable(stmt.name)
+
+    def compile_ReturnStmt(self, stmt: ReturnStmt):
+        self._line = stmt.keyword.line
+        if stmt.value:
+            self._compile(stmt.value)
+            self._emit(OpCode.OP_RETURN)
+        else:
+            self._emit_return()
+
+    def compile_ClassStmt(self, stmt: ClassStmt):
+        self._line = stmt.name.line
+        name_constant = self._identifier_constant(stmt.name)
+        self._declare_variable(stmt.name)
+        self._emit(OpCode.OP_CLASS, name_constant)
+        self._define_variable(stmt.name)
+
+        if stmt.superclass:
+            self.compile_VarExpr(stmt.superclass)
+            self._begin_scope()
+            self._add_local(Token(TokenType.SUPER, "super", None,
+                                  stmt.superclass.name.line, 0))
+            self._mark_initialized()
+
+            self._named_variable(stmt.name)
+            self._line = stmt.superclass.name.line
+            self._emit(OpCode.OP_INHERIT)
+
+        self._named_variable(stmt.name)
+        for method in stmt.methods:
+            self._line = method.name.line
+            type_ = FunctionType.INITIALIZER if method.name.lexeme == "init" \
+                else FunctionType.METHOD
+            self._function(method, type_)
+            self._emit(OpCode.OP_METHOD, self._identifier_constant(method.name))
+        self._emit(OpCode.OP_POP)
+
+        if stmt.superclass:
+            self._end_scope()
+
+    ### Expressions
+    def compile_LiteralExpr(self, expr: LiteralExpr):
+        if expr.value is None:
+            self._emit(OpCode.OP_NIL)
+        elif expr.value is True:
+            self._emit(OpCode.OP_TRUE)
+        elif expr.value is False:
+            self._emit(OpCode.OP_FALSE)
+        else:
+            self._emit(OpCode.OP_CONSTANT,
+                       self._make_constant(expr.value, expr.token))
+
+    def compile_GroupingExpr(self, expr: GroupingExpr):
+        self._compile(expr.inner)
+
+    def compile_VarExpr(self, expr: VarExpr):
+        self._named_variable(expr.name)
+
+    def compile_AssignExpr(self, expr: AssignExpr):
+        self._compile(expr.value)
+        self._named_variable(expr.name, assign=True)
+
+    def compile_ThisExpr(self, expr: ThisExpr):
+        self._named_variable(expr.keyword)
+
+    def compile_UnaryExpr(self, expr: UnaryExpr):
+        self._compile(expr.right)
+        self._line = expr.operator.line
+        if expr.operator.type_ == TokenType.MINUS:
+            self._emit(OpCode.OP_NEGATE)
+        else:
+            self._emit(OpCode.OP_NOT)
+
+    def compile_BinaryExpr(self, expr: BinaryExpr):
+        self._compile(expr.left)
+        self._compile(expr.right)
+        self._line = expr.operator.line
+        self._emit(*_BINARY_OPS[expr.operator.type_])
+
+    def compile_LogicalExpr(self, expr: LogicalExpr):
+        self._compile(expr.left)
+        self._line = expr.operator.line
+        if expr.operator.type_ == TokenType.AND:
+            end_jump = self._emit_jump(OpCode.OP_JUMP_IF_FALSE)
+        else:
+            else_jump = self._emit_jump(OpCode.OP_JUMP_IF_FALSE)
+            end_jump = self._emit_jump(OpCode.OP_JUMP)
+            self._patch_jump(else_jump)
+
+        self._emit(OpCode.OP_POP)
+        self._compile(expr.right)
+        self._patch_jump(end_jump)
+
+    def compile_CallExpr(self, expr: CallExpr):
+        callee = expr.callee
+        if isinstance(callee, GetExpr):
+            self._compile(callee.obj)
+            self._arguments(expr.arguments)
+            self._line = expr.paren.line
+            self._emit(OpCode.OP_INVOKE, self._identifier_constant(callee.name),
+                       len(expr.arguments))
+        elif isinstance(callee, SuperExpr):
+            self._named_variable(Token(TokenType.THIS, "this", None,
+                                       callee.keyword.line, 0))
+            self._arguments(expr.arguments)
+            self._named_variable(callee.keyword)
+            self._line = expr.paren.line
+            self._emit(OpCode.OP_SUPER_INVOKE,
+                       self._identifier_constant(callee.method),
+                       len(expr.arguments))
+        else:
+            self._compile(callee)
+            self._arguments(expr.arguments)
+            self._line = expr.paren.line
+            self._emit(OpCode.OP_CALL, len(expr.arguments))
+
+    def compile_GetExpr(self, expr: GetExpr):
+        self._compile(expr.obj)
+        self._line = expr.name.line
+        self._emit(OpCode.OP_GET_PROPERTY, self._identifier_constant(expr.name))
+
+    def compile_SetExpr(self, expr: SetExpr):
+        self._compile(expr.obj)
+        self._compile(expr.value)
+        self._line = expr.name.line
+        self._emit(OpCode.OP_SET_PROPERTY, self._identifier_constant(expr.name))
+
+    def compile_SuperExpr(self, expr: SuperExpr):
+        self._named_variable(Token(TokenType.THIS, "this", None,
+                                   expr.keyword.line, 0))
+        self._named_variable(expr.keyword)
+        self._line = expr.method.line
+        self._emit(OpCode.OP_GET_SUPER, self._identifier_constant(expr.method))
+
+    ### Functions
+    def _function(self, stmt: FunctionStmt, type_: FunctionType):
+        function = ObjFunction(stmt.name.lexeme, arity=len(stmt.params))
+        self._state = _FunctionState(self._state, function, type_)
+        self._begin_scope()
+        for param in stmt.params:
+            self._declare_variable(param)
+            self._mark_initialized()
+        for s in stmt.body:
+            self._compile(s)
+
+        upvalues = self._state.upvalues
+        self._end_function()        # no need to end the scope: frame is gone
+
+        self._emit(OpCode.OP_CLOSURE, self._make_constant(function, stmt.name))
+        for upvalue in upvalues:
+            self._emit(1 if upvalue.is_local else 0, upvalue.index)
+
+    def _end_function(self) -> ObjFunction:
+        self._emit_return()
+        state = self._state
+        state.function.upvalue_count = len(state.upvalues)
+        if state.enclosing is not None:     # the script's is left in place
+            self._state = state.enclosing
+        return state.function
+
+    def _arguments(self, arguments: tuple[Expr, ...]):
+        for arg in arguments:
+            self._compile(arg)
+
+    ### Variables
+    def _named_variable(self, name: Token, assign: bool = False):
+        self._line = name.line
+        if (arg := self._resolve_local(self._state, name)) != -1:
+            get_op, set_op = OpCode.OP_GET_LOCAL, OpCode.OP_SET_LOCAL
+        elif (arg := self._resolve_upvalue(self._state, name)) != -1:
+            get_op, set_op = OpCode.OP_GET_UPVALUE, OpCode.OP_SET_UPVALUE
+        else:
+            arg = self._identifier_constant(name)
+            get_op, set_op = OpCode.OP_GET_GLOBAL, OpCode.OP_SET_GLOBAL
+
+        self._emit(set_op if assign else get_op, arg)
+
+    def _resolve_local(self, state: _FunctionState, name: Token) -> int:
+        for slot in range(len(state.locals) - 1, -1, -1):
+            if state.locals[slot].name == name.lexeme:
+                return slot
+        return -1
+
+    def _resolve_upvalue(self, state: _FunctionState, name: Token) -> int:
+        if state.enclosing is None:
+            return -1
+
+        if (local := self._resolve_local(state.enclosing, name)) != -1:
+            state.enclosing.locals[local].is_captured = True
+            return self._add_upvalue(state, local, True, name)
+
+        if (upvalue := self._resolve_upvalue(state.enclosing, name)) != -1:
+            return self._add_upvalue(state, upvalue, False, name)
+
+        return -1
+
+    def _add_upvalue(self, state: _FunctionState, index: int,
+                     is_local: bool, name: Token) -> int:
+        upvalue = _Upvalue(index, is_local)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+
+        if len(state.upvalues) == UINT8_COUNT:
+            self._error("Too many closure variables in function.", at=name)
+            return 0
+
+        state.upvalues.append(upvalue)
+        return len(state.upvalues) - 1
+
+    def _declare_variable(self, name: Token):
+        if self._state.scope_depth == 0:
+            return
+        self._add_local(name)
+
+    def _add_local(self, name: Token):
+        if len(self._state.locals) == UINT8_COUNT:
+            self._error("Too many local variables in function.", at=name)
+            return
+        self._state.locals.append(_Local(name.lexeme, depth=-1))
+
+    def _define_variable(self, name: Token):
+        if self._state.scope_depth > 0:
+            self._mark_initialized()
+            return
+        self._emit(OpCode.OP_DEFINE_GLOBAL, self._identifier_constant(name))
+
+    def _mark_initialized(self):
+        if self._state.scope_depth == 0:
+            return
+        self._state.locals[-1].depth = self._state.scope_depth
+
+    def _begin_scope(self):
+        self._state.scope_depth += 1
+
+    def _end_scope(self):
+        state = self._state
+        state.scope_depth -= 1
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            local = state.locals.pop()
+            self._emit(OpCode.OP_CLOSE_UPVALUE if local.is_captured
+                       else OpCode.OP_POP)
+
+    ### Emitting bytecode
+    @property
+    def _chunk(self):
+        return self._state.function.chunk
+
+    def _emit(self, *bytes_: int):
+        for byte in bytes_:
+            self._chunk.write(byte, self._line)
+
+    def _emit_return(self):
+        if self._state.type is FunctionType.INITIALIZER:
+            self._emit(OpCode.OP_GET_LOCAL, 0)
+        else:
+            self._emit(OpCode.OP_NIL)
+        self._emit(OpCode.OP_RETURN)
+
+    def _emit_jump(self, instruction: OpCode) -> int:
+        self._emit(instruction, 0xff, 0xff)
+        return len(self._chunk.code) - 2
+
+    def _patch_jump(self, offset: int):
+        # -2 to adjust for the bytecode for the jump offset itself
+        jump = len(self._chunk.code) - offset - 2
+        if jump > UINT16_MAX:
+            self._error("Too much code to jump over.")
+
+        self._chunk.code[offset] = (jump >> 8) & 0xff
+        self._chunk.code[offset + 1] = jump & 0xff
+
+    def _emit_loop(self, loop_start: int):
+        self._emit(OpCode.OP_LOOP)
+        offset = len(self._chunk.code) - loop_start + 2
+        if offset > UINT16_MAX:
+            self._error("Loop body too large.")
+
+        self._emit((offset >> 8) & 0xff, offset & 0xff)
+
+    def _make_constant(self, value: Any, token: Optional[Token]) -> int:
+        index = self._chunk.add_constant(value)
+        if index >= UINT8_COUNT:
+            self._error("Too many constants in one chunk.", at=token)
+            return 0
+        return index
+
+    def _identifier_constant(self, name: Token) -> int:
+        # Unlike literals, names are reused: each chunk stores each only once
+        identifiers = self._state.identifiers
+        if name.lexeme not in identifiers:
+            identifiers[name.lexeme] = self._make_constant(name.lexeme, name)
+        return identifiers[name.lexeme]
+
+    def _error(self, message: str, at: Optional[Token] = None):
+        self._handler.error(at=at if at else self._line, message=message)
+        self._had_error = True
@@ -0,0 +1,78 @@
+"""Bytecode disassembler, printing the same listing as clox's `debug.c`."""
+from pylox.chunk import Chunk, OpCode
+from pylox.object import ObjFunction
+from pylox.interpreter import stringify
+
+
+_CONSTANT_OPS = {
+    OpCode.OP_CONSTANT, OpCode.OP_GET_GLOBAL, OpCode.OP_DEFINE_GLOBAL,
+    OpCode.OP_SET_GLOBAL, OpCode.OP_GET_PROPERTY, OpCode.OP_SET_PROPERTY,
+    OpCode.OP_GET_SUPER, OpCode.OP_CLASS, OpCode.OP_METHOD,
+}
+_BYTE_OPS = {
+    OpCode.OP_GET_LOCAL, OpCode.OP_SET_LOCAL, OpCode.OP_GET_UPVALUE,
+    OpCode.OP_SET_UPVALUE, OpCode.OP_CALL,
+}
+_JUMP_OPS = {
+    OpCode.OP_JUMP: 1,
+    OpCode.OP_JUMP_IF_FALSE: 1,
+    OpCode.OP_LOOP: -1,
+}
+
+
+def disassemble_function(function: ObjFunction):
+    """Disassemble `function`, then every function defined in it."""
+    disassemble_chunk(function.chunk, function.name or "<script>")
+    for constant in function.chunk.constants:
+        if isinstance(constant, ObjFunction):
+            disassemble_function(constant)
+
+
+def disassemble_chunk(chunk: Chunk, name: str):
+    print(f"== {name} ==")
+    offset = 0
+    while offset < len(chunk.code):
+        offset = disassemble_instruction(chunk, offset)
+
+
+def disassemble_instruction(chunk: Chunk, offset: int) -> int:
+    line = chunk.get_line(offset)
+    if offset > 0 and line == chunk.get_line(offset - 1):
+        prefix = f"{offset:04d}    | "
+    else:
+        prefix = f"{offset:04d} {line:4d} "
+
+    code = chunk.code
+    op = OpCode(code[offset])
+    if op in _CONSTANT_OPS:
+        constant = code[offset + 1]
+        value = stringify(chunk.constants[constant])
+        print(f"{prefix}{op.name:<16} {constant:4d} '{value}'")
+        return offset + 2
+    elif op in _BYTE_OPS:
+        print(f"{prefix}{op.name:<16} {code[offset + 1]:4d}")
+        return offset + 2
+    elif op in _JUMP_OPS:
+        jump = (code[offset + 1] << 8) | code[offset + 2]
+        target = offset + 3 + _JUMP_OPS[op] * jump
+        print(f"{prefix}{op.name:<16} {offset:4d} -> {target}")
+        return offset + 3
+    elif op in (OpCode.OP_INVOKE, OpCode.OP_SUPER_INVOKE):
+        constant, arg_count = code[offset + 1], code[offset + 2]
+        value = stringify(chunk.constants[constant])
+        print(f"{prefix}{op.name:<16} ({arg_count} args) {constant:4d} '{value}'")
+        return offset + 3
+    elif op == OpCode.OP_CLOSURE:
+        constant = code[offset + 1]
+        function = chunk.constants[constant]
+        print(f"{prefix}{op.name:<16} {constant:4d} {function}")
+        offset += 2
+        for _ in range(function.upvalue_count):
+            is_local, index = code[offset], code[offset + 1]
+            kind = "local" if is_local else "upvalue"
+            print(f"{offset:04d}      |                     {kind} {index}")
+            offset += 2
+        return offset
+    else:
+        print(f"{prefix}{op.name}")
+        return offset + 1
@@ -1,3 +1,4 @@
+import copy
 from typing import Optional, Any
 
 from pylox.token import Token
@@ -5,6 +6,8 @@ from pylox.error_handling import LoxRuntimeError
 
 
 class Environment:
+    """Global scope: variables are looked up dynamically, by name."""
+
     def __init__(self, enclosing: Optional["Environment"] = None) -> None:
         self._values: dict[str, Any] = dict()
         self._enclosing = enclosing
@@ -24,11 +27,6 @@ class Environment:
         else:
             raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
-    def get_at(self, distance: int, name: str) -> Any:
-        target_env = self.ancestor(distance)
-        assert name in target_env._values
-        return target_env._values[name]
-
     def assign(self, name: Token, value: Any) -> None:
         if name.lexeme in self._values:
             self._values[name.lexeme] = value
@@ -37,13 +35,73 @@ class Environment:
         else:
             raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
 
-    def assign_at(self, distance: int, name: Token, value: Any) -> None:
-        self.ancestor(distance)._values[name.lexeme] = value
 
-    def ancestor(self, distance: int) -> "Environment":
-        env = self
+class ForkedEnvironment(Environment):
+    """Global scope of a forked interpreter, copy-on-access over the one it
+    was forked from: the first time a variable is read, its value is copied
+    from there, along with the instances, closures, arrays and maps it
+    reaches, so that the fork never changes objects of its parent. AST nodes,
+    classes and natives are shared, as programs cannot change them.
+
+    Copying on read spares a check on every store into an object, at the
+    cost of copying globals the fork only reads. Each is copied once: the
+    fork keeps seeing it as it was then, whatever the parent does later.
+
+    `copies` maps the ids of the parent's objects to their copies, and starts
+    out with those standing for objects of the fork, such as its interpreter.
+    """
+
+    def __init__(self, parent: Environment, copies: dict[int, Any]) -> None:
+        super().__init__(enclosing=parent)
+        self._parent = parent
+        self._copies = copies
+        env: Optional[Environment] = parent
+        while env is not None:
+            # Closures of global functions refer to the fork's globals
+            copies[id(env)] = self
+            env = env.enclosing
+
+    def get(self, name: Token) -> Any:
+        if name.lexeme in self._values:
+            return self._values[name.lexeme]
+        value = copy.deepcopy(self._parent.get(name), self._copies)
+        self._values[name.lexeme] = value
+        return value
+
+    def assign(self, name: Token, value: Any) -> None:
+        if name.lexeme not in self._values:
+            self._parent.get(name)      # undefined variables are errors
+        self._values[name.lexeme] = value
+
+
+class LocalEnvironment:
+    """Block or function scope: variables live in a list, indexed by the slot
+    the Resolver assigned to them.
+
+    Variables of a scope are declared one after another, in the same order
+    the Resolver numbered them, so defining one is simply appending its value.
+    """
+
+    __slots__ = ("values", "enclosing")
+
+    def __init__(self, enclosing: "Environment | LocalEnvironment",
+                 values: Optional[list[Any]] = None) -> None:
+        self.values: list[Any] = [] if values is None else values
+        self.enclosing = enclosing
+
+    def define(self, name: str, value: Any) -> None:
+        self.values.append(value)
+
+    def get_at(self, distance: int, slot: int) -> Any:
+        return self.ancestor(distance).values[slot]
+
+    def assign_at(self, distance: int, slot: int, value: Any) -> None:
+        self.ancestor(distance).values[slot] = value
+
+    def ancestor(self, distance: int) -> "LocalEnvironment":
+        env: Environment | LocalEnvironment = self
         for _ in range(distance):
-            assert env._enclosing
-            env = env._enclosing
+            env = env.enclosing
 
+        assert type(env) is LocalEnvironment    # never the global scope
         return env
@@ -1,4 +1,5 @@
 import sys
+from typing import Optional
 
 from pylox.token import Token, TokenType
 
@@ -8,7 +9,9 @@ class ParserError(RuntimeError):
 
 
 class LoxRuntimeError(RuntimeError):
-    def __init__(self, token: Token, message: str):
+    # Errors raised without a token get the one of the call or instruction
+    # running, before they are reported
+    def __init__(self, token: Optional[Token], message: str):
         super().__init__(message)
         self.token = token
 
@@ -40,5 +43,6 @@ class ErrorHandler:
 
 
     def runtime_error(self, error: LoxRuntimeError):
+        assert error.token is not None
         print(f"{error}\n[line {error.token.line}]", file=sys.stderr)
         self.has_runtime_error = True
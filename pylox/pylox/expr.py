@@ -1,9 +1,14 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Any, Optional
 
-from pylox.token import Token
+from pylox.token import Token, reduce_fields, keep_on_copy
 
 class Expr:
-    pass
+    __reduce__ = reduce_fields
+    __deepcopy__ = keep_on_copy
+
+    # Attached by the adaptive backend to the nodes it runs, outside fields
+    site: Any
 
 
 @dataclass(frozen=True, slots=True)
@@ -21,6 +26,7 @@ class GroupingExpr(Expr):
 @dataclass(frozen=True, slots=True)
 class LiteralExpr(Expr):
     value: float | str | bool | None
+    token: Optional[Token] = None   # none for literals made up by the parser
 
 
 @dataclass(frozen=True, slots=True)
@@ -29,15 +35,26 @@ class UnaryExpr(Expr):
     right: Expr
 
 
+# Where the `Resolver` found a local variable: (depth, slot), `None` for a
+# global. Stored on the node, the only field written after it is made
+Location = Optional[tuple[int, int]]
+
+
+def set_location(expr: Expr, depth: int, slot: int):
+    object.__setattr__(expr, "location", (depth, slot))
+
+
 @dataclass(frozen=True, slots=True)
 class VarExpr(Expr):
     name: Token
+    location: Location = field(default=None, compare=False)
 
 
 @dataclass(frozen=True, slots=True)
 class AssignExpr(Expr):
     name: Token
     value: Expr
+    location: Location = field(default=None, compare=False)
 
 
 @dataclass(frozen=True, slots=True)
@@ -70,9 +87,11 @@ class SetExpr(Expr):
 @dataclass(frozen=True, slots=True)
 class ThisExpr(Expr):
     keyword: Token
+    location: Location = field(default=None, compare=False)
 
 
 @dataclass(frozen=True, slots=True)
 class SuperExpr(Expr):
     keyword: Token
     method: Token
+    location: Location = field(default=None, compare=False)
@@ -1,8 +1,11 @@
 from enum import Enum
 
 from pylox.stmt import FunctionStmt
-from pylox.environment import Environment
+from pylox.environment import Environment, LocalEnvironment
 from pylox.callable import LoxCallable
+from pylox.native import NativeFunction
+from pylox.token import Token
+from pylox.error_handling import LoxRuntimeError
 
 
 class FunctionType(Enum):
@@ -12,15 +15,43 @@ class FunctionType(Enum):
     INITIALIZER = "INITIALIZER"
 
 
-class Return(Exception):
+class Return:
+    """Completion of a `return` statement, handed back up to the call."""
+
+    __slots__ = ("value",)
+
     def __init__(self, value):
-        super().__init__()
         self.value = value
 
 
+class TailCall:
+    """Completion of `return f(...)`: the call is left to the caller of the
+    returning function, which runs it without nesting one more Python frame.
+    """
+
+    __slots__ = ("callee", "arguments", "paren")
+
+    def __init__(self, callee, arguments: list, paren: Token):
+        self.callee = callee
+        self.arguments = arguments
+        self.paren = paren
+
+
+def check_call(callee, n_arguments: int, paren: Token):
+    # Checking against the runtime protocol is slow, the usual callees skip it
+    if type(callee) is not LoxFunction and type(callee) is not NativeFunction \
+            and not isinstance(callee, LoxCallable):
+        raise LoxRuntimeError(paren, "Can only call functions and classes.")
+
+    f_arity = callee.arity()
+    if n_arguments != f_arity:
+        raise LoxRuntimeError(paren, f"Expected {f_arity} arguments but got {n_arguments}.")
+
+
 class LoxFunction(LoxCallable):
 
-    def __init__(self, declaration: FunctionStmt, closure: Environment,
+    def __init__(self, declaration: FunctionStmt,
+                 closure: Environment | LocalEnvironment,
                  is_initializer: bool = False):
         self._declaration = declaration
         self._closure = closure
@@ -31,28 +62,50 @@ class LoxFunction(LoxCallable):
 
     def call(self, intepreter, *arguments):
         assert len(arguments) == self.arity()
+        return self._run(intepreter, self._closure, list(arguments))
+
+    def call_bound(self, intepreter, instance, arguments: list):
+        """Same as `bind(instance).call(intepreter, *arguments)`, without
+        making the bound function"""
+        assert len(arguments) == self.arity()
+        return self._run(intepreter, LocalEnvironment(self._closure, [instance]),
+                         arguments)
 
-        env = Environment(enclosing=self._closure)
-        for name, value in zip(self._declaration.params, arguments):
-            env.define(name.lexeme, value)
+    def _run(self, intepreter, closure: Environment | LocalEnvironment,
+             arguments: list):
+        function = self
+        while True:
+            # parameters take the first slots of the function's scope
+            env = LocalEnvironment(closure, arguments)
+            completion = intepreter.execute_block(function._declaration.body, env)
 
-        try:
-            intepreter.execute_block(self._declaration.body, env)
-        except Return as _return:
-            if self._is_initializer:
-                # `init` method always return `this`
-                return self._closure.get_at(0, "this")
-            return _return.value
+            if function._is_initializer:
+                # `init` method always return `this`, bound in its closure
+                assert type(closure) is LocalEnvironment
+                return closure.get_at(0, 0)
+            if completion is None:
+                return None
+            if type(completion) is Return:
+                return completion.value
 
-        if self._is_initializer:
-            return self._closure.get_at(0, "this")
+            # Trampoline: run the tail call in this very loop when it is to a
+            # plain Lox function, so tail recursion needs no Python stack
+            callee, arguments = completion.callee, completion.arguments
+            check_call(callee, len(arguments), completion.paren)
+            if type(callee) is not LoxFunction:
+                try:
+                    return callee.call(intepreter, *arguments)
+                except LoxRuntimeError as e:
+                    if e.token is None:
+                        e.token = completion.paren
+                    raise
+            function, closure = callee, callee._closure
 
     def __repr__(self) -> str:
         return f"<fn {self._declaration.name.lexeme}>"
 
     def bind(self, instance):
-        env = Environment(enclosing=self._closure)
-        env.define("this", instance)
+        env = LocalEnvironment(self._closure, [instance])
         return LoxFunction(self._declaration,
                            closure=env,
                            is_initializer=self._is_initializer)
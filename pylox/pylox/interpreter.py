@@ -1,5 +1,5 @@
+import copy
 import time
-from contextlib import contextmanager
 
 from pylox.token import Token, TokenType
 from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
@@ -7,10 +7,12 @@ from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
                   ThisExpr, SuperExpr)
 from pylox.stmt import (Stmt, ExpressionStmt, PrintStmt, VarStmt, BlockStmt, IfStmt,
                   WhileStmt, FunctionStmt, ReturnStmt, ClassStmt)
-from pylox.callable import LoxCallable
-from pylox.function import LoxFunction, Return
+from pylox.function import LoxFunction, Return, TailCall, check_call
 from pylox.class_ import LoxClass, LoxInstance
-from pylox.environment import Environment
+from pylox.environment import Environment, ForkedEnvironment, LocalEnvironment
+from pylox.memo import NativeMemoize
+from pylox.native import stringify, get_property, native_method, invoke_native
+from pylox.stdlib import standard_natives
 from pylox.error_handling import LoxRuntimeError, ErrorHandler
 
 
@@ -44,24 +46,73 @@ def is_equal(a, b) -> bool:
 
     return a == b if type(a) is type(b) else False
 
-def stringify(value):
-    if value is None:
-        return "nil"
-    elif isinstance(value, float):
-        s = str(value)
-        if s.endswith(".0"):
-            s = s[:-2]
-        return s
-    elif isinstance(value, bool):
-        return "true" if value else "false"
-    else:
-        return str(value)
+def divide(left: float, right: float) -> float:
+    try:
+        return left / right
+    except ZeroDivisionError:
+        if left > 0:
+            return float("inf")
+        elif left < 0:
+            return float("-inf")
+        else:
+            return float("-nan")
+
+
+def unary(operator: Token, right):
+    match operator.type_:
+        case TokenType.MINUS:
+            check_number_operand(operator, right)
+            return -float(right)
+        case TokenType.BANG:
+            return not is_truthy(right)
+        case _:
+            return None
+
+
+def binary(operator: Token, left, right):
+    match operator.type_:
+        case TokenType.MINUS:
+            check_number_operands(operator, left, right)
+            return left - right
+        case TokenType.SLASH:
+            check_number_operands(operator, left, right)
+            return divide(left, right)
+        case TokenType.STAR:
+            check_number_operands(operator, left, right)
+            return left * right
+        case TokenType.PLUS:
+            if (isinstance(left, float) and isinstance(right, float)) \
+                    or (isinstance(left, str) and isinstance(right, str)):
+                return left + right
+            else:
+                raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
+        case TokenType.GREATER:
+            check_number_operands(operator, left, right)
+            return left > right
+        case TokenType.GREATER_EQUAL:
+            check_number_operands(operator, left, right)
+            return left >= right
+        case TokenType.LESS:
+            check_number_operands(operator, left, right)
+            return left < right
+        case TokenType.LESS_EQUAL:
+            check_number_operands(operator, left, right)
+            return left <= right
+        case TokenType.BANG_EQUAL:
+            return not is_equal(left, right)
+        case TokenType.EQUAL_EQUAL:
+            return is_equal(left, right)
+        case _:
+            return None
 
 
 class _NativeClock:
     def arity(self) -> int:
         return 0
 
+    def __deepcopy__(self, memo):
+        return self
+
     def call(self, intepreter, *arguments):
         return time.perf_counter()
 
@@ -74,26 +125,39 @@ class Interpreter:
     def __init__(self, error_handler: ErrorHandler):
         self._handler = error_handler
         self._GLOBAL_ENV: Environment = Environment()
-        self._env: Environment = self._GLOBAL_ENV
-        self._locals: dict[Expr, int] = {}
+        self._env: Environment | LocalEnvironment = self._GLOBAL_ENV
 
         self._GLOBAL_ENV.define("clock", _NativeClock())
+        self._GLOBAL_ENV.define("memoize", NativeMemoize())
+        for name, native in standard_natives().items():
+            self._GLOBAL_ENV.define(name, native)
 
     @property
     def global_env(self) -> Environment:
         return self._GLOBAL_ENV
 
+    def define(self, name: str, value):
+        """Define, or redefine, the global variable `name`."""
+        self._GLOBAL_ENV.define(name, value)
+
+    def fork(self, error_handler: ErrorHandler) -> "Interpreter":
+        """Interpreter starting from the globals of this one, without copying
+        them upfront: each is copied the first time the fork reads it (see
+        `ForkedEnvironment`), so that nothing the fork does, be it assigning
+        globals or changing instances, arrays and maps, is visible here. It
+        sees the changes made here to a global until it first reads it."""
+        child = copy.copy(self)
+        child._handler = error_handler
+        child._GLOBAL_ENV = child._env = ForkedEnvironment(
+            self._GLOBAL_ENV, {id(self): child})
+        return child
+
     def evaluate(self, expr: Expr):
         return getattr(self, f"visit_{type(expr).__name__}")(expr)
 
     def execute(self, stmt: Stmt):
         return getattr(self, f"visit_{type(stmt).__name__}")(stmt)
 
-    def resolve(self, expr: Expr, depth: int):
-        if expr in self._locals:
-            print(f"WARNING: locals override: {expr}: from {self._locals[expr]} to {depth}")
-        self._locals[expr] = depth
-
     def interpret(self, statements: list[Stmt]):
         try:
             for s in statements:
@@ -117,25 +181,48 @@ class Interpreter:
         self._env.define(stmt.name.lexeme, value)
 
     def visit_BlockStmt(self, stmt: BlockStmt):
-        self.execute_block(stmt.statements, Environment(enclosing=self._env))
+        if not stmt.inline:
+            return self.execute_block(stmt.statements,
+                                      LocalEnvironment(self._env))
+
+        assert type(self._env) is LocalEnvironment
+        values = self._env.values
+        mark = len(values)
+        try:
+            for s in stmt.statements:
+                completion = self.execute(s)
+                if completion is not None:
+                    return completion
+            return None
+        finally:
+            del values[mark:]     # the block's variables
 
     def visit_IfStmt(self, stmt: IfStmt):
         if is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.then_branch)
+            return self.execute(stmt.then_branch)
         elif stmt.else_branch:
-            self.execute(stmt.else_branch)
+            return self.execute(stmt.else_branch)
 
     def visit_WhileStmt(self, stmt: WhileStmt):
-        while self.evaluate(stmt.condition):
-            self.execute(stmt.body)
+        while is_truthy(self.evaluate(stmt.condition)):
+            completion = self.execute(stmt.body)
+            if completion is not None:
+                return completion
 
     def visit_FunctionStmt(self, stmt: FunctionStmt):
         function = LoxFunction(declaration=stmt, closure=self._env)
         self._env.define(stmt.name.lexeme, function)
 
     def visit_ReturnStmt(self, stmt: ReturnStmt):
+        if isinstance(stmt.value, CallExpr):
+            # A call in tail position is made by the returning function's
+            # caller, once this function's frame is gone
+            callee = self.evaluate(stmt.value.callee)
+            arguments = [self.evaluate(arg) for arg in stmt.value.arguments]
+            return TailCall(callee, arguments, stmt.value.paren)
+
         value = self.evaluate(stmt.value) if stmt.value else None
-        raise Return(value)
+        return Return(value)
 
     def visit_ClassStmt(self, stmt: ClassStmt):
         if stmt.superclass:
@@ -146,10 +233,8 @@ class Interpreter:
         else:
             superclass = None
 
-        self._env.define(stmt.name.lexeme, None)
         if stmt.superclass:
-            self._env = Environment(enclosing=self._env)
-            self._env.define("super", superclass)
+            self._env = LocalEnvironment(self._env, [superclass])
 
         methods: dict[str, LoxFunction] = {
             method.name.lexeme : LoxFunction(
@@ -164,7 +249,9 @@ class Interpreter:
         if stmt.superclass:
             self._env = self._env.enclosing
 
-        self._env.assign(stmt.name, _class)
+        # Methods only get to see the class once they are called, so the name
+        # can be defined after the class is built, in its declaration slot
+        self._env.define(stmt.name.lexeme, _class)
 
     def visit_VarExpr(self, expr: VarExpr):
         return self._lookup_variable(expr.name, expr)
@@ -172,9 +259,10 @@ class Interpreter:
     def visit_AssignExpr(self, expr: AssignExpr):
         value = self.evaluate(expr.value)
 
-        distance = self._locals.get(expr)
-        if distance is not None:
-            self._env.assign_at(distance, expr.name, value)
+        location = expr.location
+        if location is not None:
+            assert type(self._env) is LocalEnvironment
+            self._env.assign_at(*location, value)
         else:
             self.global_env.assign(expr.name, value)
 
@@ -191,62 +279,12 @@ class Interpreter:
 
     def visit_UnaryExpr(self, expr: UnaryExpr):
         right = self.evaluate(expr.right)
-
-        match expr.operator.type_:
-            case TokenType.MINUS:
-                check_number_operand(expr.operator, right)
-                return -float(right)
-            case TokenType.BANG:
-                return not is_truthy(right)
-            case _:
-                return None
+        return unary(expr.operator, right)
 
     def visit_BinaryExpr(self, expr: BinaryExpr):
         left = self.evaluate(expr.left)
         right = self.evaluate(expr.right)
-
-        match expr.operator.type_:
-            case TokenType.MINUS:
-                check_number_operands(expr.operator, left, right)
-                return left - right
-            case TokenType.SLASH:
-                check_number_operands(expr.operator, left, right)
-                try:
-                    return left / right
-                except ZeroDivisionError:
-                    if left > 0:
-                        return float("inf")
-                    elif left < 0:
-                        return float("-inf")
-                    else:
-                        return float("-nan")
-            case TokenType.STAR:
-                check_number_operands(expr.operator, left, right)
-                return left * right
-            case TokenType.PLUS:
-                if (isinstance(left, float) and isinstance(right, float)) \
-                        or (isinstance(left, str) and isinstance(right, str)):
-                    return left + right
-                else:
-                    raise LoxRuntimeError(expr.operator, "Operands must be two numbers or two strings.")
-            case TokenType.GREATER:
-                check_number_operands(expr.operator, left, right)
-                return left > right
-            case TokenType.GREATER_EQUAL:
-                check_number_operands(expr.operator, left, right)
-                return left >= right
-            case TokenType.LESS:
-                check_number_operands(expr.operator, left, right)
-                return left < right
-            case TokenType.LESS_EQUAL:
-                check_number_operands(expr.operator, left, right)
-                return left <= right
-            case TokenType.BANG_EQUAL:
-                return not is_equal(left, right)
-            case TokenType.EQUAL_EQUAL:
-                return is_equal(left, right)
-            case _:
-                return None
+        return binary(expr.operator, left, right)
 
     def visit_LogicalExpr(self, expr: LogicalExpr):
         left = self.evaluate(expr.left)
@@ -264,27 +302,67 @@ class Interpreter:
         return self.evaluate(expr.right)
 
     def visit_CallExpr(self, expr: CallExpr):
+        if type(expr.callee) is GetExpr:
+            return self._invoke(expr, expr.callee)
+
         callee = self.evaluate(expr.callee)
 
         # Important: order of evaluating arguments is kept
         arguments = [self.evaluate(arg) for arg in expr.arguments]
 
-        if not isinstance(callee, LoxCallable):
-            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        check_call(callee, len(arguments), expr.paren)
+        try:
+            return callee.call(self, *arguments)
+        except LoxRuntimeError as e:
+            # natives raise errors without a token: blame the call
+            if e.token is None:
+                e.token = expr.paren
+            raise
+
+    def _invoke(self, expr: CallExpr, get: GetExpr):
+        """`obj.name(...)`: call the method on `obj` directly, rather than
+        binding it to `obj` first, only to call and discard the result"""
+        obj = self.evaluate(get.obj)
+        name = get.name.lexeme
+        if not isinstance(obj, LoxInstance):
+            native = native_method(obj, name, get.name)
+            arguments = [self.evaluate(arg) for arg in expr.arguments]
+            return invoke_native(obj, native, arguments, expr.paren)
+        elif name in obj._fields:
+            callee = obj._fields[name]
+        else:
+            method = self._find_method(obj, get)
+            arguments = [self.evaluate(arg) for arg in expr.arguments]
+            return self._call_method(method, obj, arguments, expr.paren)
+
+        arguments = [self.evaluate(arg) for arg in expr.arguments]
+        check_call(callee, len(arguments), expr.paren)
+        try:
+            return callee.call(self, *arguments)
+        except LoxRuntimeError as e:
+            if e.token is None:
+                e.token = expr.paren
+            raise
+
+    def _find_method(self, obj: LoxInstance, get: GetExpr) -> LoxFunction:
+        if not (method := obj._class.find_method(get.name.lexeme)):
+            raise LoxRuntimeError(get.name, f"Undefined property '{get.name.lexeme}'.")
+        return method
 
+    def _call_method(self, method: LoxFunction, obj: LoxInstance,
+                     arguments: list, paren: Token):
         n_arguments = len(arguments)
-        f_arity = callee.arity()
+        f_arity = method.arity()
         if n_arguments != f_arity:
-            raise LoxRuntimeError(expr.paren, f"Expected {f_arity} arguments but got {n_arguments}.")
-
-        return callee.call(self, *arguments)
+            raise LoxRuntimeError(paren, f"Expected {f_arity} arguments but got {n_arguments}.")
+        return method.call_bound(self, obj, arguments)
 
     def visit_GetExpr(self, expr: GetExpr):
         obj = self.evaluate(expr.obj)
         if isinstance(obj, LoxInstance):
             return obj.get(expr.name)
 
-        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+        return get_property(obj, expr.name.lexeme, expr.name)
 
     def visit_SetExpr(self, expr: SetExpr):
         obj = self.evaluate(expr.obj)
@@ -297,32 +375,34 @@ class Interpreter:
         return value
 
     def visit_SuperExpr(self, expr: SuperExpr):
-        distance = self._locals.get(expr)
-        assert distance
-        superclass = self._env.get_at(distance, "super")
-        obj = self._env.get_at(distance - 1, "this")    # the env where `this` is bound is always right inside the env where `super` are stored
+        assert expr.location is not None    # `super` is always a local
+        distance, _ = expr.location
+        assert distance and type(self._env) is LocalEnvironment
+        superclass = self._env.get_at(distance, 0)
+        obj = self._env.get_at(distance - 1, 0)    # the env where `this` is bound is always right inside the env where `super` are stored
         assert obj
         if not (method := superclass.find_method(expr.method.lexeme)):
             raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
         return method.bind(obj)
 
-    def execute_block(self, statements: list[Stmt], env: Environment):
-        with self._new_env(env):
-            for stmt in statements:
-                self.execute(stmt)
-
-    @contextmanager
-    def _new_env(self, env: Environment):
+    def execute_block(self, statements: list[Stmt], env: LocalEnvironment):
+        """Execute `statements` in `env`, stopping at the first that completes
+        with a `Return` or `TailCall`, which is then returned"""
         prev_env = self._env
         self._env = env
         try:
-            yield
+            for stmt in statements:
+                completion = self.execute(stmt)
+                if completion is not None:
+                    return completion
+            return None
         finally:
             self._env = prev_env
 
-    def _lookup_variable(self, name: Token, expr: Expr):
-        distance = self._locals.get(expr)
-        if distance is not None:
-            return self._env.get_at(distance, name.lexeme)
+    def _lookup_variable(self, name: Token, expr: VarExpr | ThisExpr):
+        location = expr.location
+        if location is not None:
+            assert type(self._env) is LocalEnvironment
+            return self._env.get_at(*location)
         else:
             return self.global_env.get(name)
@@ -1,34 +1,256 @@
 import sys
+import copy
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional, Sequence
 
 from pylox.scanner import Scanner
 from pylox.parser import Parser
+from pylox.expr import Expr
+from pylox.stmt import (Stmt, BlockStmt, IfStmt, WhileStmt, FunctionStmt,
+                        ClassStmt)
 from pylox.resolver import Resolver
+from pylox.optimizer import Optimizer
 from pylox.interpreter import Interpreter
+from pylox.adaptive import AdaptiveInterpreter
+from pylox.closure_compiler import ClosureInterpreter
+from pylox.vm import VM
+from pylox.transpiler import (Transpiler, PythonProgram, UnsupportedProgram,
+                              load_cached, store_cached)
+from pylox.native import NativeFunction
+from pylox.ast_cache import CacheStats, load_program, store_program
+from pylox.snapshot import check_backend, save_snapshot, load_snapshot
 from pylox.error_handling import ErrorHandler
 
 
+BACKENDS: dict[str, type[Interpreter | ClosureInterpreter | VM]] = {
+    "tree": Interpreter,
+    "adaptive": AdaptiveInterpreter,
+    "closure": ClosureInterpreter,
+    "vm": VM,
+}
+
+
+@dataclass
+class MemoryStats:
+    programs: int = 0       # programs run some function of which is alive
+    functions: int = 0      # function and method declarations alive
+    ast_nodes: int = 0      # syntax tree nodes alive
+    resolved: int = 0       # local variable references among them
+    sites: int = 0          # specialization sites (adaptive backend)
+
+
+def _functions(statements: Sequence[Stmt]) -> Iterator[FunctionStmt]:
+    """Declarations of the functions and methods in `statements`, nested
+    ones included."""
+    for stmt in statements:
+        match stmt:
+            case FunctionStmt():
+                yield stmt
+                yield from _functions(stmt.body)
+            case ClassStmt():
+                yield from _functions(stmt.methods)
+            case BlockStmt():
+                yield from _functions(stmt.statements)
+            case IfStmt():
+                yield from _functions([stmt.then_branch])
+                if stmt.else_branch is not None:
+                    yield from _functions([stmt.else_branch])
+            case WhileStmt():
+                yield from _functions([stmt.body])
+
+
+def _forget(declarations: dict[int, Any], key: int) -> Callable[[Any], None]:
+    def forget(_):
+        declarations.pop(key, None)
+    return forget
+
+
+def _count_nodes(root: Stmt, stats: MemoryStats, seen: set[int]):
+    """Add the nodes of the tree under `root` not `seen` yet to `stats`."""
+    stack: list[Any] = [root]
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stats.ast_nodes += 1
+        if getattr(node, "location", None) is not None:
+            stats.resolved += 1
+        if "site" in vars(node):
+            stats.sites += 1
+        for name in node.__slots__:
+            child = getattr(node, name)
+            for item in child if isinstance(child, (list, tuple)) else (child,):
+                if isinstance(item, (Expr, Stmt)):
+                    stack.append(item)
+
+
 class PyLox:
-    def __init__(self):
+    def __init__(self, backend: str = "tree", optimize: bool = False):
         self.error_handler = ErrorHandler()
-        self.interpreter = Interpreter(error_handler=self.error_handler)
-        self.resolver = Resolver(self.interpreter,
-                                 error_handler=self.error_handler)
+        self.optimizer = Optimizer() if optimize else None
+        self.interpreter = BACKENDS[backend](error_handler=self.error_handler)
+        self.resolver = Resolver(error_handler=self.error_handler)
+        self.natives: dict[str, NativeFunction] = {}
+        self.cache_stats = CacheStats()
+        self._track_programs()
+
+    def _track_programs(self) -> None:
+        # Function declarations of the programs run, which live as long as
+        # their functions do: id -> weak reference, number of the program
+        self._declarations: dict[int, tuple[weakref.ref, int]] = {}
+        self._programs = 0
+
+    def _track(self, statements: list[Stmt]):
+        self._programs += 1
+        declarations = self._declarations
+        for function in _functions(statements):
+            key = id(function)
+            ref = weakref.ref(function, _forget(declarations, key))
+            declarations[key] = (ref, self._programs)
+
+    def register_native(self, name: str, fn: Callable[..., Any],
+                        arity: Optional[int] = None) -> NativeFunction:
+        """Expose `fn` to Lox programs as the global function `name`. Its
+        arity defaults to the number of parameters of `fn`."""
+        native = NativeFunction(name, fn, arity)
+        self.natives[name] = native
+        self.interpreter.define(name, native)
+        return native
+
+    def native(self, name: Optional[str] = None, arity: Optional[int] = None):
+        """Decorator form of `register_native`, named after the function by
+        default."""
+        def register(fn):
+            self.register_native(name or fn.__name__, fn, arity)
+            return fn
+        return register
+
+    def run(self, src: str, use_cache: bool = False):
+        """Run `src`. With `use_cache`, a program found in the `.loxc` cache
+        is run without scanning, parsing nor resolving it; any other is
+        cached once resolved."""
+        optimize = self.optimizer is not None
+        if use_cache:
+            if (statements := load_program(src, optimize)) is not None:
+                self.cache_stats["hits"] += 1
+                self._track(statements)
+                self.interpreter.interpret(statements)
+                return
+            self.cache_stats["misses"] += 1
 
-    def run(self, src: str):
         tokens = Scanner(src, self.error_handler).scan_tokens()
         statements = Parser(tokens, self.error_handler).parse()
 
         if self.error_handler.has_error:
             return
 
+        if self.optimizer:
+            # Static errors are reported on the program as written, dead code
+            # included, before the optimized one gets resolved for execution
+            Resolver(error_handler=self.error_handler,
+                     annotate=False).resolve(statements)
+            if self.error_handler.has_error:
+                return
+            statements = self.optimizer.optimize(statements)
+
         self.resolver.resolve(statements)
         if self.error_handler.has_error:
             return
+        if use_cache:
+            store_program(src, optimize, statements)
 
+        self._track(statements)
         self.interpreter.interpret(statements)
 
-    def run_file(self, fname):
-        self.run(open(fname).read())
+    def run_file(self, fname, use_cache: bool = True):
+        self.run(open(fname).read(), use_cache=use_cache)
+        self._exit_on_error()
+
+    def stats(self) -> MemoryStats:
+        """What is left of the programs this session ran. A program's syntax
+        tree, and the resolutions and sites attached to it, are kept only as
+        long as the functions and classes it defined are reachable: only the
+        declarations of those, and the nodes below them, are counted."""
+        stats = MemoryStats()
+        programs = set()
+        seen: set[int] = set()
+        for ref, program in list(self._declarations.values()):
+            if (function := ref()) is not None:
+                programs.add(program)
+                stats.functions += 1
+                _count_nodes(function, stats, seen)
+        stats.programs = len(programs)
+        return stats
+
+    def fork(self) -> "PyLox":
+        """Fresh session starting from the globals of this one, without
+        running anything again nor changing anything here: see
+        `Interpreter.fork`. Tree and adaptive backends only."""
+        if not isinstance(self.interpreter, Interpreter):
+            raise TypeError(f"{type(self.interpreter).__name__} cannot fork")
+        child = copy.copy(self)
+        child.error_handler = ErrorHandler()
+        child.interpreter = self.interpreter.fork(child.error_handler)
+        child.resolver = Resolver(error_handler=child.error_handler)
+        child.natives = dict(self.natives)
+        child.cache_stats = CacheStats()
+        child._track_programs()
+        return child
+
+    def snapshot_file(self, fname, out: str):
+        """Run the prelude `fname`, then save the globals it defined to the
+        snapshot `out`. Raise `SnapshotError` if they cannot be saved."""
+        interpreter = check_backend(self.interpreter)
+        natives = dict(interpreter.global_env._values)
+        source = open(fname).read()
+        self.run(source, use_cache=True)
+        self._exit_on_error()
+        save_snapshot(out, interpreter, natives, fname, source)
+
+    def restore(self, snapshot: str):
+        """Define the globals saved to `snapshot`, as if its prelude ran.
+        Raise `SnapshotError` if it is invalid or out of date."""
+        load_snapshot(snapshot, check_backend(self.interpreter))
+
+    def transpile(self, src: str) -> Optional[PythonProgram]:
+        """Translate `src` to Python, `None` if it has a compile error. Raise
+        `UnsupportedProgram` if CPython rejects the translation."""
+        tokens = Scanner(src, self.error_handler).scan_tokens()
+        statements = Parser(tokens, self.error_handler).parse()
+        if self.error_handler.has_error:
+            return None
+
+        transpiler = Transpiler()
+        Resolver(error_handler=self.error_handler).resolve(statements)
+        if self.error_handler.has_error:
+            return None
+
+        return transpiler.transpile(statements)
+
+    def run_compiled(self, src: str, use_cache: bool = True):
+        """Run `src` transpiled to Python. Cached programs skip every step
+        before execution: scanning, parsing, resolving and code generation"""
+        program = load_cached(src) if use_cache else None
+        if program is None:
+            try:
+                program = self.transpile(src)
+            except UnsupportedProgram:
+                self.run(src)   # interpreted instead
+                return
+            if program is None:
+                return
+            if use_cache:
+                store_cached(src, program)
+
+        program.run(self.error_handler, self.natives)
+
+    def compile_file(self, fname, use_cache: bool = True):
+        self.run_compiled(open(fname).read(), use_cache=use_cache)
+        self._exit_on_error()
+
+    def _exit_on_error(self):
         if self.error_handler.has_error:
             sys.exit(65)
         if self.error_handler.has_runtime_error:
@@ -0,0 +1,76 @@
+"""The built-in `Map` type.
+
+    var ages = Map();
+    ages.set("ada", 36);
+    print ages.get("ada");      // 36
+    print ages.get("bob");      // nil
+    print ages.keys();          // [ada]
+
+Numbers, strings, booleans and nil are keys by value, instances and any
+other object by identity. `keys()` and `values()` return arrays, snapshots
+which later changes to the map leave untouched.
+"""
+from typing import Any
+
+from pylox.native import (NativeObject, NativeError, lox_method, hash_key,
+                          stringify)
+from pylox.arrays import Array
+
+
+class Map(NativeObject):
+
+    __slots__ = ("_entries",)
+
+    def __init__(self) -> None:
+        # hash key -> (key, value)
+        self._entries: dict[Any, tuple[Any, Any]] = {}
+
+    def __getstate__(self):
+        # Keys by identity are hashed by id, which unpickling changes
+        return list(self._entries.values())
+
+    def __setstate__(self, entries):
+        self._entries = {hash_key(key): (key, value) for key, value in entries}
+
+    @lox_method()
+    def get(self, key):
+        """Value for `key`, nil if there is none."""
+        entry = self._entries.get(hash_key(key))
+        return entry[1] if entry is not None else None
+
+    @lox_method()
+    def set(self, key, value):
+        self._entries[hash_key(key)] = (key, value)
+        return value
+
+    @lox_method()
+    def has(self, key):
+        return hash_key(key) in self._entries
+
+    @lox_method()
+    def delete(self, key):
+        """Remove `key`, true if it was there."""
+        return self._entries.pop(hash_key(key), None) is not None
+
+    @lox_method()
+    def size(self):
+        return float(len(self._entries))
+
+    @lox_method()
+    def keys(self):
+        return Array.of([key for key, _ in self._entries.values()])
+
+    @lox_method()
+    def values(self):
+        return Array.of([value for _, value in self._entries.values()])
+
+    @lox_method()
+    def merge(self, other):
+        """Set every key of `other` to its value there."""
+        if type(other) is not Map:
+            raise NativeError("Can only merge maps.")
+        self._entries.update(other._entries)
+
+    def __repr__(self) -> str:
+        return "{" + ", ".join(f"{stringify(key)}: {stringify(value)}"
+                               for key, value in self._entries.values()) + "}"
@@ -0,0 +1,104 @@
+"""Opt-in memoization of pure Lox functions.
+
+`memoize(fn, size)` is a native function returning a `MemoizedFunction`, a
+callable remembering the results of its last `size` distinct calls. Numbers,
+strings, booleans and nil arguments are compared by value, anything else by
+identity. The least recently used result is evicted first, so a cache never
+holds more than `size` results however long the program runs.
+
+    fun fib(n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); }
+    fib = memoize(fib, 1000);   // recursive calls go through the cache too
+
+Only functions without side effects should be memoized: a cached call runs
+nothing at all.
+"""
+from collections import OrderedDict
+from functools import partial
+from typing import Any, Callable, Optional
+
+from pylox.callable import LoxCallable
+from pylox.class_ import LoxClass
+from pylox.native import NativeError, hash_key
+
+
+class MemoizedFunction:
+    """Lox function whose results are cached by argument values, evicting
+    the least recently used beyond `max_size`."""
+
+    __slots__ = ("function", "max_size", "_arity", "_call", "_cache")
+
+    def __init__(self, function, arity: int, call: Callable[..., Any],
+                 max_size: int) -> None:
+        self.function = function
+        self.max_size = max_size
+        self._arity = arity
+        self._call = call
+        # key -> (arguments, result); keeping the arguments alive ensures the
+        # id of an instance is not reused while it is part of a key
+        self._cache: OrderedDict[tuple, tuple[tuple, Any]] = OrderedDict()
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_cache"] = list(self._cache.values())
+        return state
+
+    def __setstate__(self, state):
+        # Hashed again, as unpickled arguments have new ids
+        self._cache = OrderedDict()
+        for arguments, result in state.pop("_cache"):
+            self._cache[tuple(map(hash_key, arguments))] = (arguments, result)
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def arity(self) -> int:
+        return self._arity
+
+    def call(self, intepreter, *arguments):
+        key = tuple(map(hash_key, arguments))
+        cache = self._cache
+        if (entry := cache.get(key)) is not None:
+            cache.move_to_end(key)
+            return entry[1]
+
+        result = self._call(*arguments)
+        cache[key] = (arguments, result)
+        if len(cache) > self.max_size:
+            cache.popitem(last=False)
+        return result
+
+    def __repr__(self) -> str:
+        return repr(self.function)
+
+
+class NativeMemoize:
+    """The `memoize(fn, size)` native function."""
+
+    def arity(self) -> int:
+        return 2
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def call(self, intepreter, *arguments):
+        function, max_size = arguments
+        if type(max_size) is not float or not max_size.is_integer() \
+                or max_size < 1:
+            raise NativeError("Cache size must be a positive integer.")
+        if (adapted := self._adapt(intepreter, function)) is None:
+            raise NativeError("Can only memoize functions.")
+
+        arity, call = adapted
+        return MemoizedFunction(function, arity, call, int(max_size))
+
+    def _adapt(self, interpreter, function) \
+            -> Optional[tuple[int, Callable[..., Any]]]:
+        """Arity of `function` and how to call it, `None` if it cannot be
+        memoized. Backends whose functions are not `LoxCallable` override
+        this."""
+        if isinstance(function, LoxCallable) \
+                and not isinstance(function, LoxClass):
+            return function.arity(), partial(function.call, interpreter)
+        return None
+
+    def __repr__(self):
+        return "<native fn>"
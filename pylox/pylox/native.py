@@ -0,0 +1,188 @@
+"""Python functions exposed to Lox programs as native functions.
+
+    lox = PyLox()
+
+    @lox.native()
+    def hypot(x, y):
+        if type(x) is not float or type(y) is not float:
+            raise NativeError("Operands must be numbers.")
+        return math.hypot(x, y)
+
+Natives take and return Lox values: `float`, `str`, `bool`, `None`, or any
+object the program got from elsewhere. Python ints they return are turned
+into floats. A `NativeError` they raise is reported as a runtime error on the
+line of the call, and so is any other exception, prefixed with the native's
+name.
+
+Built-in types such as `Array` are `NativeObject`s: Lox programs call their
+`lox_method`s as they would call the methods of an instance.
+"""
+import copy
+import inspect
+from types import MethodType
+from typing import Any, Callable, Optional, Sequence
+
+from pylox.token import Token
+from pylox.error_handling import LoxRuntimeError
+
+
+class NativeError(LoxRuntimeError):
+    """Runtime error raised by a native function, on the line it was called."""
+
+    def __init__(self, message: str):
+        # The token is filled in by the call site
+        super().__init__(None, message)
+
+
+def _wrap(name: str, e: Exception, token: Optional[Token] = None) \
+        -> NativeError:
+    """`e`, raised by the native `name`, as a Lox runtime error."""
+    error = NativeError(f"{name}: {e}")
+    error.token = token
+    return error
+
+
+class NativeFunction:
+    """A Python callable, called straight from Lox with its arguments."""
+
+    __slots__ = ("name", "fn", "_arity")
+
+    def __init__(self, name: str, fn: Callable[..., Any],
+                 arity: Optional[int] = None) -> None:
+        if arity is None:
+            arity = _arity(name, fn)
+        self.name = name
+        self.fn = fn
+        self._arity = arity
+
+    def arity(self) -> int:
+        return self._arity
+
+    def call(self, interpreter, *arguments):
+        try:
+            result = self.fn(*arguments)
+        except LoxRuntimeError:
+            raise
+        except Exception as e:
+            raise _wrap(self.name, e) from e
+        return float(result) if type(result) is int else result
+
+    def __deepcopy__(self, memo):
+        # Natives are shared, but a method read off a native object stays
+        # bound to the copy of that object
+        if type(self.fn) is MethodType \
+                and isinstance(self.fn.__self__, NativeObject):
+            obj = copy.deepcopy(self.fn.__self__, memo)
+            return NativeFunction(self.name, MethodType(self.fn.__func__, obj),
+                                  self._arity)
+        return self
+
+    def __repr__(self) -> str:
+        return "<native fn>"
+
+
+def _arity(name: str, fn: Callable[..., Any]) -> int:
+    try:
+        parameters = inspect.signature(fn).parameters.values()
+    except (ValueError, TypeError):     # many builtins have no signature
+        raise ValueError(f"the arity of native {name!r} must be given") \
+            from None
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        raise ValueError(f"the arity of native {name!r} must be given")
+    return len(parameters)
+
+
+def stringify(value):
+    """`value` as `print` shows it."""
+    if value is None:
+        return "nil"
+    elif isinstance(value, float):
+        s = str(value)
+        if s.endswith(".0"):
+            s = s[:-2]
+        return s
+    elif isinstance(value, bool):
+        return "true" if value else "false"
+    else:
+        return str(value)
+
+
+def hash_key(value) -> Any:
+    """Dictionary key standing for the Lox value `value`.
+
+    Numbers, strings, booleans and nil are keys by value, anything else by
+    identity: whoever holds the key must keep `value` alive, lest its id be
+    reused. Booleans are kept apart from the numbers Python deems equal.
+    """
+    type_ = type(value)
+    if type_ is float or type_ is str or value is None:
+        return value
+    if type_ is bool:
+        return (bool, value)
+    return (type_, id(value))
+
+
+def lox_method(arity: Optional[int] = None):
+    """Decorator making a method of a `NativeObject` subclass callable from
+    Lox, under the same name."""
+    def mark(fn):
+        # `self` is no parameter from Lox's point of view
+        fn.lox_arity = arity if arity is not None \
+            else len(inspect.signature(fn).parameters) - 1
+        return fn
+    return mark
+
+
+# A method of a native type, unbound, and its arity
+NativeMethod = tuple[Callable, int]
+
+
+class NativeObject:
+    """Base of the built-in types. Their instances have methods but no
+    fields: Lox programs can neither set nor add properties."""
+
+    __slots__ = ()
+    _methods: dict[str, NativeMethod] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._methods = cls._methods | {
+            name: (fn, fn.lox_arity) for name, fn in vars(cls).items()
+            if hasattr(fn, "lox_arity")}
+
+
+def native_method(obj, name: str, token: Optional[Token] = None) \
+        -> NativeMethod:
+    """Method `name` of `obj`, which is not a Lox instance: only native
+    objects have some."""
+    if not isinstance(obj, NativeObject):
+        raise LoxRuntimeError(token, "Only instances have properties.")
+    if (method := obj._methods.get(name)) is None:
+        raise LoxRuntimeError(token, f"Undefined property '{name}'.")
+    return method
+
+
+def get_property(obj, name: str, token: Optional[Token] = None):
+    """Property `name` of `obj`, which is not a Lox instance: its method
+    `name`, bound to it."""
+    fn, arity = native_method(obj, name, token)
+    return NativeFunction(name, MethodType(fn, obj), arity)
+
+
+def invoke_native(obj, method: NativeMethod, arguments: Sequence,
+                  paren: Optional[Token] = None):
+    """`obj.name(*arguments)`, `method` being the one `native_method` found,
+    without binding it to `obj` first."""
+    fn, arity = method
+    if len(arguments) != arity:
+        raise LoxRuntimeError(
+            paren, f"Expected {arity} arguments but got {len(arguments)}.")
+    try:
+        result = fn(obj, *arguments)
+    except LoxRuntimeError as e:
+        if e.token is None:
+            e.token = paren
+        raise
+    except Exception as e:
+        raise _wrap(fn.__name__, e, paren) from e
+    return float(result) if type(result) is int else result
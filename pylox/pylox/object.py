@@ -0,0 +1,89 @@
+"""Heap objects of the bytecode VM, counterparts of clox's `object.h`.
+
+Numbers, strings, booleans and nil are plain Python values, as in the
+tree-walk interpreter. Native functions are the interpreter's `LoxCallable`s.
+"""
+from typing import Any, Optional
+
+from pylox.chunk import Chunk
+
+
+class ObjFunction:
+    __slots__ = ("arity", "upvalue_count", "chunk", "name")
+
+    def __init__(self, name: Optional[str] = None, arity: int = 0) -> None:
+        self.arity = arity
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+        self.name = name        # None for the top-level script
+
+    def __repr__(self) -> str:
+        if self.name is None:
+            return "<script>"
+        return f"<fn {self.name}>"
+
+
+class ObjUpvalue:
+    """A variable captured by a closure.
+
+    While open, the variable still lives on the VM stack: `cells` is the stack
+    itself and `index` the variable's slot. Closing it moves the value into a
+    list of its own, so reads and writes stay `cells[index]` either way.
+    """
+
+    __slots__ = ("cells", "index", "next")
+
+    def __init__(self, cells: list[Any], index: int,
+                 next_: Optional["ObjUpvalue"] = None) -> None:
+        self.cells = cells
+        self.index = index
+        self.next = next_       # open upvalues are kept sorted, deepest first
+
+    def close(self) -> None:
+        self.cells = [self.cells[self.index]]
+        self.index = 0
+
+
+class ObjClosure:
+    __slots__ = ("function", "upvalues")
+
+    def __init__(self, function: ObjFunction,
+                 upvalues: list[ObjUpvalue]) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def __repr__(self) -> str:
+        return repr(self.function)
+
+
+class ObjClass:
+    __slots__ = ("name", "methods")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.methods: dict[str, ObjClosure] = {}
+
+    def __repr__(self) -> str:
+        return self.name
+
+
+class ObjInstance:
+    __slots__ = ("klass", "fields")
+
+    def __init__(self, klass: ObjClass) -> None:
+        self.klass = klass
+        self.fields: dict[str, Any] = {}
+
+    def __repr__(self) -> str:
+        return f"{self.klass.name} instance"
+
+
+class ObjBoundMethod:
+    __slots__ = ("receiver", "method")
+
+    def __init__(self, receiver: ObjInstance, method: ObjClosure) -> None:
+        self.receiver = receiver
+        self.method = method
+
+    def __repr__(self) -> str:
+        return repr(self.method)
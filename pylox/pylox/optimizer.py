@@ -0,0 +1,190 @@
+"""Static optimizer rewriting the AST before it is resolved and executed.
+
+- literal arithmetic, string concatenation, comparisons, equality and
+  negation are folded into a single `LiteralExpr`, located at the operator
+- `GroupingExpr` wrappers are dropped
+- `and`/`or` with a literal left operand are reduced to one of their operands
+- `if` and `while` statements with a literal condition lose the branches that
+  can never run
+
+Folding is skipped whenever evaluating the operation raises a runtime error
+(`-"a"`, `1 + nil`, ...), so the error still happens at run time, on its line.
+Nodes are rebuilt only when one of their children changed.
+"""
+from dataclasses import replace
+from typing import Optional
+
+from pylox.token import TokenType
+from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
+                  VarExpr, AssignExpr, LogicalExpr, CallExpr, GetExpr, SetExpr,
+                  ThisExpr, SuperExpr)
+from pylox.stmt import (Stmt, ExpressionStmt, PrintStmt, VarStmt, BlockStmt, IfStmt,
+                  WhileStmt, FunctionStmt, ReturnStmt, ClassStmt)
+from pylox.interpreter import binary, unary, is_truthy
+from pylox.error_handling import LoxRuntimeError
+
+
+class Optimizer:
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        optimized = []
+        for stmt in statements:
+            if (stmt := self._optimize(stmt)) is not None:
+                optimized.append(stmt)
+        return optimized
+
+    def _optimize(self, node: Expr | Stmt):
+        """Optimized node; `None` for statements that can never do anything"""
+        return getattr(self, f"visit_{type(node).__name__}")(node)
+
+    def _optimize_branch(self, stmt: Stmt) -> Stmt:
+        # where a statement is required, e.g. loop bodies, keep a no-op one,
+        # of its own: the resolver annotates every block it visits
+        optimized = self._optimize(stmt)
+        return optimized if optimized is not None else BlockStmt([])
+
+    ### Statements
+    def visit_ExpressionStmt(self, stmt: ExpressionStmt) -> Stmt:
+        expr = self._optimize(stmt.expr)
+        return stmt if expr is stmt.expr else ExpressionStmt(expr)
+
+    def visit_PrintStmt(self, stmt: PrintStmt) -> Stmt:
+        expr = self._optimize(stmt.expr)
+        return stmt if expr is stmt.expr else PrintStmt(expr)
+
+    def visit_VarStmt(self, stmt: VarStmt) -> Stmt:
+        if stmt.initializer is None:
+            return stmt
+        initializer = self._optimize(stmt.initializer)
+        return stmt if initializer is stmt.initializer \
+            else replace(stmt, initializer=initializer)
+
+    def visit_BlockStmt(self, stmt: BlockStmt) -> Stmt:
+        statements = self.optimize(stmt.statements)
+        return stmt if _same(statements, stmt.statements) \
+            else BlockStmt(statements)
+
+    def visit_IfStmt(self, stmt: IfStmt) -> Optional[Stmt]:
+        condition = self._optimize(stmt.condition)
+        if isinstance(condition, LiteralExpr):
+            # a branch is a statement, not a declaration: it declares nothing
+            # in the enclosing scope, so it can replace the whole `if`
+            if is_truthy(condition.value):
+                return self._optimize(stmt.then_branch)
+            elif stmt.else_branch:
+                return self._optimize(stmt.else_branch)
+            else:
+                return None
+
+        then_branch = self._optimize_branch(stmt.then_branch)
+        else_branch = self._optimize(stmt.else_branch) \
+            if stmt.else_branch else None
+        if condition is stmt.condition and then_branch is stmt.then_branch \
+                and else_branch is stmt.else_branch:
+            return stmt
+        return IfStmt(condition, then_branch, else_branch)
+
+    def visit_WhileStmt(self, stmt: WhileStmt) -> Optional[Stmt]:
+        condition = self._optimize(stmt.condition)
+        if isinstance(condition, LiteralExpr) and not is_truthy(condition.value):
+            return None
+
+        body = self._optimize_branch(stmt.body)
+        if condition is stmt.condition and body is stmt.body:
+            return stmt
+        return WhileStmt(condition, body)
+
+    def visit_FunctionStmt(self, stmt: FunctionStmt) -> FunctionStmt:
+        body = self.optimize(stmt.body)
+        return stmt if _same(body, stmt.body) else replace(stmt, body=body)
+
+    def visit_ReturnStmt(self, stmt: ReturnStmt) -> Stmt:
+        if stmt.value is None:
+            return stmt
+        value = self._optimize(stmt.value)
+        return stmt if value is stmt.value else replace(stmt, value=value)
+
+    def visit_ClassStmt(self, stmt: ClassStmt) -> Stmt:
+        methods = [self.visit_FunctionStmt(method) for method in stmt.methods]
+        return stmt if _same(methods, stmt.methods) \
+            else replace(stmt, methods=methods)
+
+    ### Expressions
+    def visit_LiteralExpr(self, expr: LiteralExpr) -> Expr:
+        return expr
+
+    def visit_GroupingExpr(self, expr: GroupingExpr) -> Expr:
+        return self._optimize(expr.inner)
+
+    def visit_UnaryExpr(self, expr: UnaryExpr) -> Expr:
+        right = self._optimize(expr.right)
+        if isinstance(right, LiteralExpr):
+            try:
+                return LiteralExpr(unary(expr.operator, right.value),
+                                   expr.operator)
+            except LoxRuntimeError:
+                pass
+        return expr if right is expr.right else replace(expr, right=right)
+
+    def visit_BinaryExpr(self, expr: BinaryExpr) -> Expr:
+        left = self._optimize(expr.left)
+        right = self._optimize(expr.right)
+        if isinstance(left, LiteralExpr) and isinstance(right, LiteralExpr):
+            try:
+                return LiteralExpr(binary(expr.operator, left.value, right.value),
+                                   expr.operator)
+            except LoxRuntimeError:
+                pass
+        if left is expr.left and right is expr.right:
+            return expr
+        return replace(expr, left=left, right=right)
+
+    def visit_LogicalExpr(self, expr: LogicalExpr) -> Expr:
+        left = self._optimize(expr.left)
+        right = self._optimize(expr.right)
+        if isinstance(left, LiteralExpr):
+            # short-circuits on the left operand's value, or yields the right
+            short_circuits = is_truthy(left.value) \
+                if expr.operator.type_ == TokenType.OR \
+                else not is_truthy(left.value)
+            return left if short_circuits else right
+
+        if left is expr.left and right is expr.right:
+            return expr
+        return replace(expr, left=left, right=right)
+
+    def visit_VarExpr(self, expr: VarExpr) -> Expr:
+        return expr
+
+    def visit_AssignExpr(self, expr: AssignExpr) -> Expr:
+        value = self._optimize(expr.value)
+        return expr if value is expr.value else replace(expr, value=value)
+
+    def visit_CallExpr(self, expr: CallExpr) -> Expr:
+        callee = self._optimize(expr.callee)
+        arguments = tuple(self._optimize(arg) for arg in expr.arguments)
+        if callee is expr.callee and _same(arguments, expr.arguments):
+            return expr
+        return replace(expr, callee=callee, arguments=arguments)
+
+    def visit_GetExpr(self, expr: GetExpr) -> Expr:
+        obj = self._optimize(expr.obj)
+        return expr if obj is expr.obj else replace(expr, obj=obj)
+
+    def visit_SetExpr(self, expr: SetExpr) -> Expr:
+        obj = self._optimize(expr.obj)
+        value = self._optimize(expr.value)
+        if obj is expr.obj and value is expr.value:
+            return expr
+        return replace(expr, obj=obj, value=value)
+
+    def visit_ThisExpr(self, expr: ThisExpr) -> Expr:
+        return expr
+
+    def visit_SuperExpr(self, expr: SuperExpr) -> Expr:
+        return expr
+
+
+def _same(nodes, originals) -> bool:
+    return len(nodes) == len(originals) \
+        and all(node is original for node, original in zip(nodes, originals))
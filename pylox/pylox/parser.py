@@ -302,13 +302,13 @@ class Parser:
 
     def _primary(self) -> Expr:
         if self._match(TokenType.FALSE):
-            return LiteralExpr(False)
+            return LiteralExpr(False, self._prev())
         elif self._match(TokenType.TRUE):
-            return LiteralExpr(True)
+            return LiteralExpr(True, self._prev())
         elif self._match(TokenType.NIL):
-            return LiteralExpr(None)
+            return LiteralExpr(None, self._prev())
         elif self._match(TokenType.NUMBER, TokenType.STRING):
-            return LiteralExpr(self._prev().literal)
+            return LiteralExpr(self._prev().literal, self._prev())
         elif self._match(TokenType.SUPER):
             keyword = self._prev()
             self._consume(TokenType.DOT, "Expect '.' after 'super'.")
@@ -1,8 +1,9 @@
 from typing import Iterator
+from dataclasses import dataclass
 from contextlib import contextmanager, nullcontext, ExitStack
 
 from pylox.token import Token
-from pylox.expr import (Expr, VarExpr, AssignExpr, BinaryExpr, CallExpr, GroupingExpr,
+from pylox.expr import (Expr, set_location, VarExpr, AssignExpr, BinaryExpr, CallExpr, GroupingExpr,
                   LiteralExpr, LogicalExpr, UnaryExpr, GetExpr, SetExpr,
                   ThisExpr, SuperExpr)
 from pylox.stmt import (Stmt, BlockStmt, VarStmt, FunctionStmt, ExpressionStmt, IfStmt,
@@ -12,12 +13,54 @@ from pylox.class_ import ClassType
 from pylox.error_handling import LoxRuntimeError, ErrorHandler
 
 
+@dataclass(slots=True)
+class _Variable:
+    slot: int               # index into the scope's LocalEnvironment
+    defined: bool = False
+
+
+class _Scope(dict[str, _Variable]):
+    """Variables of a scope, by name. An inline scope has no environment of
+    its own: its variables take the next slots of the enclosing one."""
+
+    def __init__(self, inline: bool = False, base: int = 0) -> None:
+        super().__init__()
+        self.inline = inline
+        self.base = base
+
+    def next_slot(self) -> int:
+        return self.base + len(self)
+
+
+def _captures(statements: list[Stmt]) -> bool:
+    """Whether a function or class declared among `statements`, however
+    nested, could capture the scope they are in."""
+    for stmt in statements:
+        match stmt:
+            case FunctionStmt() | ClassStmt():
+                return True
+            case BlockStmt():
+                if _captures(stmt.statements):
+                    return True
+            case IfStmt():
+                if _captures([stmt.then_branch]) or \
+                        stmt.else_branch and _captures([stmt.else_branch]):
+                    return True
+            case WhileStmt():
+                if _captures([stmt.body]):
+                    return True
+    return False
+
+
 class Resolver:
+    """Report static errors, and with `annotate`, store on each local variable
+    reference where it resolves to, and on each block whether it is inline,
+    for backends to run. Otherwise, leave the nodes untouched."""
 
-    def __init__(self, interpreter, error_handler: ErrorHandler):
-        self.interpreter = interpreter
+    def __init__(self, error_handler: ErrorHandler, annotate: bool = True):
+        self.annotate = annotate
         self._handler = error_handler
-        self._scopes: list[dict[str, bool]] = []
+        self._scopes: list[_Scope] = []
         self._curr_func = FunctionType.NONE
         self._curr_class = ClassType.NONE
 
@@ -29,7 +72,12 @@ class Resolver:
             self._resolve(s)
 
     def visit_BlockStmt(self, stmt: BlockStmt):
-        with self._new_scope():
+        # Blocks at the top level have globals around them, not a scope
+        inline = self.annotate and bool(self._scopes) \
+            and not _captures(stmt.statements)
+        if self.annotate:
+            object.__setattr__(stmt, "inline", inline)
+        with self._new_scope(inline):
             self.resolve(stmt.statements)
 
     def visit_VarStmt(self, stmt: VarStmt):
@@ -84,10 +132,10 @@ class Resolver:
                 stack.enter_context(self._new_class(ClassType.SUBCLASS))
                 self._resolve(stmt.superclass)
                 superclass_scope = stack.enter_context(self._new_scope())
-                superclass_scope["super"] = True
+                superclass_scope["super"] = _Variable(slot=0, defined=True)
 
             class_scope = stack.enter_context(self._new_scope())
-            class_scope["this"] = True
+            class_scope["this"] = _Variable(slot=0, defined=True)
             for method in stmt.methods:
                 method_name = method.name.lexeme
                 declaration = FunctionType.INITIALIZER if method_name == "init" \
@@ -96,7 +144,7 @@ class Resolver:
 
     def visit_VarExpr(self, expr: VarExpr):
         if self._scopes and (expr.name.lexeme in self._scopes[-1]) \
-                and (not self._scopes[-1][expr.name.lexeme]):
+                and (not self._scopes[-1][expr.name.lexeme].defined):
             self._handler.error(
                 at=expr.name,
                 message="Can't read local variable in its own initializer."
@@ -158,10 +206,15 @@ class Resolver:
         self._resolve(expr.right)
 
     def _resolve_local(self, expr: Expr, name: Token):
-        for depth, scope in enumerate(reversed(self._scopes)):
+        if not self.annotate:
+            return
+        depth = 0       # environments, rather than scopes, between here and there
+        for scope in reversed(self._scopes):
             if name.lexeme in scope:
-                self.interpreter.resolve(expr, depth=depth)
+                set_location(expr, depth, scope[name.lexeme].slot)
                 return
+            if not scope.inline:
+                depth += 1
 
     def _resolve_function(self, function: FunctionStmt, func_type: FunctionType):
         with self._new_function(func_type):
@@ -181,16 +234,17 @@ class Resolver:
                 message="Already a variable with this name in this scope."
             )
 
-        scope[name.lexeme] = False
+        scope[name.lexeme] = _Variable(slot=scope.next_slot())
 
     def _define(self, name: Token):
         if not self._scopes:
             return
-        self._scopes[-1][name.lexeme] = True
+        self._scopes[-1][name.lexeme].defined = True
 
     @contextmanager
-    def _new_scope(self) -> Iterator[dict[str, bool]]:
-        new_scope: dict[str, bool] = {}
+    def _new_scope(self, inline: bool = False) -> Iterator[_Scope]:
+        new_scope = _Scope(inline, self._scopes[-1].next_slot()) if inline \
+            else _Scope()
         self._scopes.append(new_scope)
         try:
             yield new_scope
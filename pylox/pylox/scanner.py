@@ -1,3 +1,4 @@
+import sys
 from typing import Iterator, Optional
 from collections.abc import Mapping
 
@@ -121,8 +122,10 @@ class Scanner:
         self._line += 1
         self._col = 1
 
-    def _create_token(self, token_type: TokenType, literal=None):
-        lexeme = self._src[self._start:self._current]
+    def _create_token(self, token_type: TokenType, literal=None,
+                      lexeme: Optional[str] = None):
+        if lexeme is None:
+            lexeme = self._src[self._start:self._current]
         return Token(type_=token_type,
                      lexeme=lexeme,
                      literal=literal,
@@ -158,8 +161,8 @@ class Scanner:
 
         self._advance()             # The closing \"
 
-        # Extract string literal (without the quotes)
-        literal = self._src[self._start + 1 : self._current - 1]
+        # Extract string literal (without the quotes), interned like names
+        literal = sys.intern(self._src[self._start + 1 : self._current - 1])
         return self._create_token(TokenType.STRING, literal=literal)
 
     def _scan_number_literal(self) -> Token:
@@ -183,9 +186,12 @@ class Scanner:
         while self._peek().isalnum() or self._peek() == "_":
             self._advance()
 
-        lexeme = self._src[self._start : self._current]
+        # Every occurrence of a name shares one interned string: environments,
+        # method tables and instance fields, all keyed by names, then find
+        # their keys by identity, with the hash already computed
+        lexeme = sys.intern(self._src[self._start : self._current])
         token_type = _KEYWORDS.get(lexeme, TokenType.IDENTIFIER)
-        return self._create_token(token_type)
+        return self._create_token(token_type, lexeme=lexeme)
 
 
 if __name__ == "__main__":
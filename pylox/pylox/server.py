@@ -0,0 +1,148 @@
+"""`lox serve`: run scripts in a warm process.
+
+    ./lox serve --workers=4 &
+    PYLOX_SERVER=$XDG_RUNTIME_DIR/pylox-$UID.sock ./lox script.lox
+
+The server listens on a Unix domain socket. Each of its workers, forked once
+pylox is imported, serves one client at a time: it forks again for every
+request, so the script runs in a fresh process with its own `PyLox`, yet pays
+neither Python's startup nor pylox's import. That process takes over the
+client's standard streams and working directory, and its exit status is sent
+back to the client, 65 and 70 included. A client hanging up kills its script.
+"""
+import io
+import os
+import sys
+import select
+import signal
+import socket
+import traceback
+from typing import Callable
+
+from pylox.client import send_message, recv_message
+
+
+def serve(path: str, workers: int, main: Callable[..., None]):
+    """Serve requests on `path` with `workers` processes, each running
+    `main(argv, source=None)` for its requests."""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    _claim(path)
+    listener.bind(path)
+    listener.listen()
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    pids = {_spawn(listener, main) for _ in range(workers)}
+    print(f"lox: serving on {path} with {workers} workers", file=sys.stderr)
+    try:
+        while True:
+            pid, _ = os.wait()
+            if pid in pids:     # a worker died: replace it
+                pids.remove(pid)
+                pids.add(_spawn(listener, main))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        os.unlink(path)
+
+
+def _claim(path: str):
+    """Remove the socket a dead server left at `path`, fail if one is alive."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with probe:
+        try:
+            probe.connect(path)
+        except FileNotFoundError:
+            return
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    sys.exit(f"lox: a server is already listening on {path}")
+
+
+def _spawn(listener: socket.socket, main: Callable[..., None]) -> int:
+    if pid := os.fork():
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # Ctrl-C in the server's terminal is for the server to handle
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        while True:
+            conn, _ = listener.accept()
+            with conn:
+                try:
+                    _handle(conn, listener, main)
+                except (OSError, ValueError) as e:
+                    print(f"WARNING: dropped request: {e}", file=sys.stderr)
+    finally:
+        os._exit(1)
+
+
+def _handle(conn: socket.socket, listener: socket.socket,
+            main: Callable[..., None]):
+    request, fds = recv_message(conn, max_fds=3)
+    if len(fds) != 3:
+        for fd in fds:
+            os.close(fd)
+        raise ValueError("expected the client's stdin, stdout and stderr")
+
+    # Closed when the script's process exits, however it does
+    done_r, done_w = os.pipe()
+    if (pid := os.fork()) == 0:
+        os.close(done_r)
+        listener.close()
+        conn.close()
+        _run(request, fds, main)
+    os.close(done_w)
+    for fd in fds:
+        os.close(fd)
+
+    try:
+        while True:
+            readable, _, _ = select.select([conn.fileno(), done_r], [], [])
+            if done_r in readable:
+                break
+            if not conn.recv(1, socket.MSG_PEEK):     # the client hung up
+                os.kill(pid, signal.SIGKILL)
+                break
+    finally:
+        os.close(done_r)
+    _, status = os.waitpid(pid, 0)
+    status = os.waitstatus_to_exitcode(status)
+    if status < 0:      # killed by a signal, as a shell would report it
+        status = 128 - status
+    send_message(conn, {"status": status})
+
+
+def _run(request: dict, fds: list[int], main: Callable[..., None]):
+    """Run `request` in this process, on the client's streams, and exit."""
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    status = 1
+    try:
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        if isinstance(sys.stdout, io.TextIOWrapper):
+            sys.stdout.reconfigure(line_buffering=sys.stdout.isatty())
+        os.chdir(request["cwd"])
+        main(["lox", *request["args"]], source=request.get("source"))
+        status = 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            status = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
@@ -0,0 +1,151 @@
+"""Snapshots of the global state a prelude leaves behind.
+
+    ./lox snapshot prelude.lox -o prelude.snap
+    ./lox --snapshot prelude.snap main.lox
+
+A snapshot holds the globals the prelude defined, along with everything they
+reach: functions and their closures, classes and their method tables,
+instances, and the resolved AST of the prelude's functions. Restoring it
+into a tree-walk interpreter is all it takes to run `main.lox` as if the
+prelude had run first.
+
+Natives are not stored, but referred to by name: a restored program gets the
+natives of the interpreter it is restored into, registered ones included.
+Snapshots are rejected by any other build of pylox, since the objects they
+hold are pickled by class, and unless the prelude they were taken of is still
+there, unchanged.
+"""
+import os
+import io
+import pickle
+import hashlib
+from typing import Any
+
+from pylox.cache import code_digest
+from pylox.interpreter import Interpreter
+
+# Bump whenever what is stored changes
+_FORMAT_VERSION = 3
+_MAGIC = b"LOXS"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Pickler(pickle.Pickler):
+
+    def __init__(self, file, interpreter: Interpreter,
+                 natives: dict[str, Any]) -> None:
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._interpreter = interpreter
+        self._natives = {id(value): name for name, value in natives.items()}
+
+    def persistent_id(self, obj):
+        if obj is self._interpreter:
+            return ("interpreter",)
+        if obj is self._interpreter.global_env:
+            return ("globals",)
+        if (name := self._natives.get(id(obj))) is not None:
+            return ("native", name)
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+
+    def __init__(self, file, interpreter: Interpreter,
+                 natives: dict[str, Any]) -> None:
+        super().__init__(file)
+        self._interpreter = interpreter
+        self._natives = natives
+
+    def persistent_load(self, pid):
+        match pid:
+            case ("interpreter",):
+                return self._interpreter
+            case ("globals",):
+                return self._interpreter.global_env
+            case ("native", name) if name in self._natives:
+                return self._natives[name]
+            case ("native", name):
+                raise SnapshotError(f"native {name!r} is not defined")
+        raise pickle.UnpicklingError(f"unknown persistent id {pid!r}")
+
+
+def check_backend(interpreter) -> Interpreter:
+    if not isinstance(interpreter, Interpreter):
+        raise SnapshotError("snapshots require the tree or adaptive backend")
+    return interpreter
+
+
+def _digest(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def save_snapshot(path: str, interpreter: Interpreter, natives: dict[str, Any],
+                  prelude: str, source: str):
+    """Write the globals of `interpreter` to `path`, after it ran `source`,
+    read from `prelude`. `natives` are the globals it had beforehand."""
+    check_backend(interpreter)
+    header = {
+        "code": code_digest(),
+        "format": _FORMAT_VERSION,
+        "prelude": os.path.abspath(prelude),
+        "digest": _digest(source),
+    }
+    values = {name: value
+              for name, value in interpreter.global_env._values.items()
+              if natives.get(name) is not value}
+
+    state = io.BytesIO()
+    try:
+        _Pickler(state, interpreter, natives).dump(values)
+    except (pickle.PicklingError, TypeError, AttributeError,
+            RecursionError) as e:
+        raise SnapshotError(f"cannot snapshot this state: {e}") from e
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.write(state.getvalue())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        raise SnapshotError(f"cannot write {path}: {e}") from e
+
+
+def load_snapshot(path: str, interpreter: Interpreter):
+    """Define in `interpreter` the globals saved to `path`."""
+    check_backend(interpreter)
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise SnapshotError(f"{path} is not a snapshot")
+            header = pickle.load(f)
+            _check_header(header)
+            natives = dict(interpreter.global_env._values)
+            values = _Unpickler(f, interpreter, natives).load()
+    except OSError as e:
+        raise SnapshotError(f"cannot read {path}: {e}") from e
+    except (pickle.UnpicklingError, ValueError, EOFError, TypeError,
+            AttributeError, ImportError, RecursionError) as e:
+        raise SnapshotError(f"{path} is corrupt: {e}") from e
+
+    for name, value in values.items():
+        interpreter.define(name, value)
+
+
+def _check_header(header: dict):
+    if header.get("code") != code_digest() \
+            or header.get("format") != _FORMAT_VERSION:
+        raise SnapshotError("snapshot taken by another build of pylox")
+    prelude = header["prelude"]
+    try:
+        with open(prelude) as f:
+            changed = _digest(f.read()) != header["digest"]
+    except OSError as e:
+        raise SnapshotError(f"cannot check the prelude {prelude}: "
+                            f"{e.strerror}") from e
+    if changed:
+        raise SnapshotError(f"{prelude} changed since the snapshot was taken")
@@ -0,0 +1,23 @@
+"""Native functions and types defined in every backend, besides `clock` and
+`memoize` which each backend defines itself."""
+from pylox.native import NativeFunction
+from pylox.arrays import Array
+from pylox.maps import Map
+from pylox.strings import StringBuilder
+
+try:
+    from pylox.vectors import Vector
+    HAS_VECTOR = True
+except ImportError:     # NumPy is an optional dependency
+    HAS_VECTOR = False
+
+
+def standard_natives() -> dict[str, NativeFunction]:
+    natives = {
+        "Array": NativeFunction("Array", Array.new, 1),
+        "Map": NativeFunction("Map", Map, 0),
+        "StringBuilder": NativeFunction("StringBuilder", StringBuilder, 0),
+    }
+    if HAS_VECTOR:
+        natives["Vector"] = NativeFunction("Vector", Vector.new, 1)
+    return natives
@@ -1,12 +1,13 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
-from pylox.token import Token
+from pylox.token import Token, reduce_fields, keep_on_copy
 from pylox.expr import Expr, VarExpr
 
 
 class Stmt:
-    pass
+    __reduce__ = reduce_fields
+    __deepcopy__ = keep_on_copy
 
 
 @dataclass(frozen=True, slots=True)
@@ -28,6 +29,10 @@ class VarStmt(Stmt):
 @dataclass(frozen=True, slots=True)
 class BlockStmt(Stmt):
     statements: list[Stmt]
+    # Set by the `Resolver` when no function can capture the block's scope:
+    # its variables then live in the enclosing environment, for as long as
+    # the block runs, and the block gets no environment of its own
+    inline: bool = field(default=False, compare=False)
 
 
 @dataclass(frozen=True, slots=True)
@@ -0,0 +1,42 @@
+"""The built-in `StringBuilder` type.
+
+Lox strings are immutable Python strings, so `s = s + piece` copies all of
+`s` every time, and building a string that way takes quadratic time. A
+builder collects the pieces and joins them once:
+
+    var out = StringBuilder();
+    out.append("total: ").append(42);
+    print out.toString();       // total: 42
+"""
+from pylox.native import NativeObject, lox_method, stringify
+
+
+class StringBuilder(NativeObject):
+
+    __slots__ = ("_parts", "_length")
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._length = 0
+
+    @lox_method()
+    def append(self, value):
+        """Append `value`, as `print` would show it. Returns the builder."""
+        if type(value) is not str:
+            value = stringify(value)
+        self._parts.append(value)
+        self._length += len(value)
+        return self
+
+    @lox_method()
+    def length(self):
+        return float(self._length)
+
+    @lox_method()
+    def toString(self):
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def __repr__(self) -> str:
+        return self.toString()
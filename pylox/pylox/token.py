@@ -53,6 +53,19 @@ class TokenType(Enum):
     EOF = 'EOF'
 
 
+def reduce_fields(node):
+    """`__reduce__` of tokens and AST nodes: unpickling them calls their
+    constructor, much faster than the field by field restore frozen slotted
+    dataclasses default to."""
+    return type(node), tuple(getattr(node, name) for name in node.__slots__)
+
+
+def keep_on_copy(node, memo):
+    """`__deepcopy__` of tokens and AST nodes, which are never modified once
+    resolved: copied functions keep referring to the same syntax tree."""
+    return node
+
+
 @dataclass(frozen=True, slots=True)
 class Token:
     type_: TokenType
@@ -61,5 +74,8 @@ class Token:
     line: int
     col: int
 
+    __reduce__ = reduce_fields
+    __deepcopy__ = keep_on_copy
+
     def __repr__(self):
         return f"{self.type_.name} {self.lexeme} {self.literal}"
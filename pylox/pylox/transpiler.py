@@ -0,0 +1,662 @@
+import os
+import sys
+import math
+import types
+import marshal
+import hashlib
+import importlib.util
+from contextlib import contextmanager, ExitStack
+from dataclasses import fields, is_dataclass
+from typing import Any, Iterator, Optional
+
+from pylox.token import Token, TokenType
+from pylox.expr import (Expr, BinaryExpr, GroupingExpr, LiteralExpr, UnaryExpr,
+                  VarExpr, AssignExpr, LogicalExpr, CallExpr, GetExpr, SetExpr,
+                  ThisExpr, SuperExpr)
+from pylox.stmt import (Stmt, ExpressionStmt, PrintStmt, VarStmt, BlockStmt, IfStmt,
+                  WhileStmt, FunctionStmt, ReturnStmt, ClassStmt)
+from pylox.cache import cache_dir, code_digest
+from pylox.error_handling import LoxRuntimeError, ErrorHandler
+from pylox.transpiler_runtime import (GLOBAL_PREFIX, PROPERTY_PREFIX,
+                                      LoxPyInstance, new_namespace)
+
+
+PROGRAM_FILENAME = "<lox>"
+
+# Marks, inside generated code, where a Lox line starts. Generated statements
+# are split there, so that Python line numbers map back to Lox lines.
+_LINE_MARK = "\0"
+
+_COMPARISONS = {
+    TokenType.GREATER: ">",
+    TokenType.GREATER_EQUAL: ">=",
+    TokenType.LESS: "<",
+    TokenType.LESS_EQUAL: "<=",
+}
+_ARITHMETICS = {
+    TokenType.MINUS: "-",
+    TokenType.STAR: "*",
+}
+
+
+def _mangle(name: str) -> str:
+    # Python normalizes non-ASCII identifiers, which could merge Lox names
+    return name if name.isascii() else "x" + name.encode().hex()
+
+
+def _strip_grouping(expr: Expr) -> Expr:
+    while isinstance(expr, GroupingExpr):
+        expr = expr.inner
+    return expr
+
+
+def _is_pure(expr: Expr) -> bool:
+    """Evaluating `expr` can't change any variable."""
+    return isinstance(_strip_grouping(expr), (LiteralExpr, VarExpr, ThisExpr))
+
+
+def _is_boolean(expr: Expr) -> bool:
+    """`expr` always evaluates to a Python bool."""
+    match _strip_grouping(expr):
+        case BinaryExpr(operator=operator):
+            return operator.type_ in _COMPARISONS or operator.type_ in (
+                TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+        case UnaryExpr(operator=operator):
+            return operator.type_ == TokenType.BANG
+        case LiteralExpr(value=value):
+            return isinstance(value, bool)
+        case _:
+            return False
+
+
+class UnsupportedProgram(Exception):
+    """A valid Lox program whose translation CPython rejects."""
+
+
+class _Function:
+    """A Lox function, or the top-level program, being transpiled."""
+
+    def __init__(self, parent: Optional["_Function"]):
+        self.parent = parent
+        # locals of enclosing functions that this function, or one nested in
+        # it, closes over; passed down as keyword-only defaults
+        self.free: dict[_Local, None] = {}
+
+
+class _Local:
+    """A Lox local variable and the Python name it is transpiled to."""
+
+    def __init__(self, py_name: str, function: Optional[_Function]):
+        self.py_name = py_name
+        self.function = function    # `None` for `this` and `super`
+        # Closed-over variables live in a one-item list, so that each closure
+        # keeps the very variable it was created with
+        self.captured = False
+
+
+class PythonProgram:
+    """A transpiled Lox program, ready to be executed."""
+
+    def __init__(self, code: types.CodeType, lines: list[int],
+                 source: str = ""):
+        self.code = code
+        self.lines = lines          # Python line - 1 -> Lox line
+        self.source = source
+
+    def run(self, error_handler: ErrorHandler,
+            natives: Optional[dict[str, Any]] = None):
+        namespace = new_namespace()
+        for name, native in (natives or {}).items():
+            namespace[GLOBAL_PREFIX + _mangle(name)] = native
+        try:
+            exec(self.code, namespace)
+        except LoxRuntimeError as e:
+            error_handler.runtime_error(e)
+        except (NameError, AttributeError) as e:
+            if (error := self._undefined(e)) is None:
+                raise
+            error_handler.runtime_error(error)
+
+    def _undefined(self, e: NameError | AttributeError) \
+            -> Optional[LoxRuntimeError]:
+        """The Lox error of an undefined global or property, `None` unless
+        `e` was raised by reading one of those in generated code."""
+        traceback = e.__traceback__
+        while traceback and traceback.tb_next:
+            traceback = traceback.tb_next
+        if traceback is None \
+                or traceback.tb_frame.f_code.co_filename != PROGRAM_FILENAME:
+            return None
+
+        # Generated code reads globals and properties directly, so those two
+        # are how an undefined variable or property shows up
+        if isinstance(e, NameError) and e.name \
+                and e.name.startswith(GLOBAL_PREFIX):
+            message = f"Undefined variable '{e.name[len(GLOBAL_PREFIX):]}'."
+        elif isinstance(e, AttributeError) and isinstance(e.obj, LoxPyInstance) \
+                and e.name and e.name.startswith(PROPERTY_PREFIX):
+            message = f"Undefined property '{e.name[len(PROPERTY_PREFIX):]}'."
+        else:
+            return None
+        line = self.lines[traceback.tb_lineno - 1]
+        return LoxRuntimeError(Token(TokenType.EOF, "", None, line, 0), message)
+
+    def dumps(self) -> bytes:
+        return marshal.dumps((self.code, self.lines))
+
+    @classmethod
+    def loads(cls, data: bytes) -> "PythonProgram":
+        code, lines = marshal.loads(data)
+        return cls(code, lines)
+
+
+class Transpiler:
+    """Translate a resolved Lox program into Python source.
+
+    A first pass finds which locals are closed over, a second one emits code.
+    Lox operators are emitted inline, guarded by the same type checks the
+    `Interpreter` does, so CPython's own bytecode does the dispatching.
+    """
+
+    def __init__(self):
+        # filled by the analysis pass, keyed by node identity
+        self._declarations: dict[int, _Local] = {}
+        self._references: dict[int, _Local] = {}
+        self._superclasses: dict[int, _Local] = {}
+        self._functions: dict[int, _Function] = {}
+        self._scopes: list[list[_Local]] = []
+        self._function = _Function(parent=None)
+        self._n_names = 0
+
+        # emission state
+        self._lines: list[tuple[str, int]] = []
+        self._indent = 0
+        self._line = 1
+        self._in_initializer = False
+
+    def transpile(self, statements: list[Stmt]) -> PythonProgram:
+        for stmt in statements:
+            self._analyze(stmt)
+        for stmt in statements:
+            self._emit(stmt)
+
+        source, lines = self._assemble()
+        try:
+            code = compile(source, PROGRAM_FILENAME, "exec")
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            # e.g. more than 20 nested loops, or deeply nested expressions
+            raise UnsupportedProgram(f"CPython cannot compile it: {e}") from e
+        return PythonProgram(code, lines, source)
+
+    def _new_name(self, prefix: str, name: str = "") -> str:
+        self._n_names += 1
+        return f"{prefix}{self._n_names}" + (f"_{_mangle(name)}" if name else "")
+
+    ### Analysis
+    def _analyze(self, node: Expr | Stmt):
+        match node:
+            case BlockStmt() if node.inline:
+                # Resolved as part of the enclosing scope, for as long as the
+                # block lasts
+                scope = self._scopes[-1]
+                mark = len(scope)
+                for stmt in node.statements:
+                    self._analyze(stmt)
+                del scope[mark:]
+            case BlockStmt():
+                with self._scope():
+                    for stmt in node.statements:
+                        self._analyze(stmt)
+            case VarStmt():
+                if node.initializer:
+                    self._analyze(node.initializer)
+                self._declare(node, node.name)
+            case FunctionStmt():
+                self._declare(node, node.name)
+                self._analyze_function(node)
+            case ClassStmt():
+                self._declare(node, node.name)
+                with ExitStack() as stack:
+                    if node.superclass:
+                        self._analyze(node.superclass)
+                        superclass = _Local(self._new_name("_s"), None)
+                        stack.enter_context(self._scope()).append(superclass)
+                        self._superclasses[id(node)] = superclass
+                    stack.enter_context(self._scope()).append(_Local("_this", None))
+                    for method in node.methods:
+                        self._analyze_function(method)
+            case AssignExpr():
+                self._analyze(node.value)
+                self._reference(node)
+            case VarExpr() | ThisExpr() | SuperExpr():
+                self._reference(node)
+            case _:
+                assert is_dataclass(node)
+                for field in fields(node):
+                    child = getattr(node, field.name)
+                    for item in child if isinstance(child, (list, tuple)) else (child,):
+                        if isinstance(item, (Expr, Stmt)):
+                            self._analyze(item)
+
+    def _analyze_function(self, function: FunctionStmt):
+        self._function = _Function(parent=self._function)
+        self._functions[id(function)] = self._function
+        try:
+            with self._scope():
+                for param in function.params:
+                    self._declare(param, param)
+                for stmt in function.body:
+                    self._analyze(stmt)
+        finally:
+            self._function = self._function.parent
+
+    def _declare(self, key: Stmt | Token, name: Token):
+        if not self._scopes:
+            return      # a global, looked up by name
+        local = _Local(self._new_name("v", name.lexeme), self._function)
+        self._scopes[-1].append(local)
+        self._declarations[id(key)] = local
+
+    def _reference(self, expr: VarExpr | AssignExpr | ThisExpr | SuperExpr):
+        location = expr.location
+        if location is None:
+            return      # a global
+        depth, slot = location
+        local = self._scopes[-1 - depth][slot]
+        self._references[id(expr)] = local
+
+        if local.function is not None and local.function is not self._function:
+            local.captured = True
+            function = self._function
+            while function is not local.function:
+                function.free[local] = None
+                function = function.parent
+
+    @contextmanager
+    def _scope(self) -> Iterator[list[_Local]]:
+        scope: list[_Local] = []
+        self._scopes.append(scope)
+        try:
+            yield scope
+        finally:
+            self._scopes.pop()
+
+    ### Emission
+    def _assemble(self) -> tuple[str, list[int]]:
+        physical_lines: list[str] = []
+        lox_lines: list[int] = []
+        for text, line in self._lines:
+            parts = text.split(_LINE_MARK)
+            physical_lines.append(parts[0])
+            lox_lines.append(line)
+            # parts alternate: code, line number, code, ...
+            for number, code in zip(parts[1::2], parts[2::2]):
+                if int(number) > line:
+                    line = int(number)
+                    physical_lines.append(code)
+                    lox_lines.append(line)
+                else:
+                    physical_lines[-1] += code
+
+        return "\n".join(physical_lines) + "\n", lox_lines
+
+    def _write(self, text: str):
+        self._lines.append(("    " * self._indent + text, self._line))
+
+    @contextmanager
+    def _indented(self):
+        self._indent += 1
+        n_lines = len(self._lines)
+        try:
+            yield
+        finally:
+            if len(self._lines) == n_lines:
+                self._write("pass")
+            self._indent -= 1
+
+    def _mark(self, token: Token) -> str:
+        return f"{_LINE_MARK}{token.line}{_LINE_MARK}"
+
+    def _emit(self, stmt: Stmt):
+        getattr(self, f"_emit_{type(stmt).__name__}")(stmt)
+
+    def _emit_ExpressionStmt(self, stmt: ExpressionStmt):
+        match stmt.expr:
+            case AssignExpr() if (local := self._references.get(id(stmt.expr))):
+                self._line = stmt.expr.name.line
+                target = f"{local.py_name}[0]" if local.captured else local.py_name
+                self._write(f"{target} = ({self._expr(stmt.expr.value)})")
+            case SetExpr(obj=obj, name=name, value=value):
+                self._line = name.line
+                instance = self._new_name("_t")
+                self._write(f"if not isinstance(({instance} := ({self._expr(obj)})), _Instance): "
+                            f"_fail({name.line}, 'Only instances have fields.')")
+                self._write(f"{instance}.{PROPERTY_PREFIX}{_mangle(name.lexeme)} = ({self._expr(value)})")
+            case _:
+                self._write(f"({self._expr(stmt.expr)})")
+
+    def _emit_PrintStmt(self, stmt: PrintStmt):
+        self._write(f"print(_str({self._expr(stmt.expr)}))")
+
+    def _emit_VarStmt(self, stmt: VarStmt):
+        self._line = stmt.name.line
+        value = self._expr(stmt.initializer) if stmt.initializer else "None"
+        self._define(stmt, stmt.name, f"({value})")
+
+    def _emit_BlockStmt(self, stmt: BlockStmt):
+        # Variables were renamed apart, Python needs no scope for them
+        for s in stmt.statements:
+            self._emit(s)
+
+    def _emit_IfStmt(self, stmt: IfStmt):
+        self._write(f"if ({self._test(stmt.condition)}):")
+        with self._indented():
+            self._emit(stmt.then_branch)
+        if stmt.else_branch:
+            self._write("else:")
+            with self._indented():
+                self._emit(stmt.else_branch)
+
+    def _emit_WhileStmt(self, stmt: WhileStmt):
+        self._write(f"while ({self._test(stmt.condition)}):")
+        with self._indented():
+            self._emit(stmt.body)
+
+    def _emit_FunctionStmt(self, stmt: FunctionStmt):
+        self._line = stmt.name.line
+        local = self._declarations.get(id(stmt))
+        if local and local.captured:
+            # The function may refer to itself: the cell must exist already
+            self._write(f"{local.py_name} = [None]")
+
+        impl = self._new_name("_f")
+        self._emit_function(impl, stmt)
+        function = f"_Fn({impl}, {stmt.name.lexeme!r}, {len(stmt.params)})"
+        if local and local.captured:
+            self._write(f"{local.py_name}[0] = {function}")
+        else:
+            self._define(stmt, stmt.name, function)
+
+    def _emit_ReturnStmt(self, stmt: ReturnStmt):
+        self._line = stmt.keyword.line
+        if self._in_initializer:
+            self._write("return _this")
+        elif stmt.value:
+            self._write(f"return ({self._expr(stmt.value)})")
+        else:
+            self._write("return None")
+
+    def _emit_ClassStmt(self, stmt: ClassStmt):
+        self._line = stmt.name.line
+        local = self._declarations.get(id(stmt))
+        if local and local.captured:
+            self._write(f"{local.py_name} = [None]")
+
+        superclass = "None"
+        if stmt.superclass:
+            superclass = self._superclasses[id(stmt)].py_name
+            self._write(f"{superclass} = ({self._expr(stmt.superclass)})")
+            self._write(f"if not isinstance({superclass}, _Class): "
+                        f"_fail({stmt.superclass.name.line}, 'Superclass must be a class.')")
+
+        methods = []
+        for method in stmt.methods:
+            impl = self._new_name("_m")
+            self._emit_function(impl, method, is_method=True,
+                                superclass=superclass if stmt.superclass else None)
+            methods.append(f"{PROPERTY_PREFIX + _mangle(method.name.lexeme)!r}: "
+                           f"_Method({impl}, {method.name.lexeme!r}, {len(method.params)})")
+
+        self._line = stmt.name.line
+        _class = f"_make_class({stmt.name.lexeme!r}, {superclass}, {{{', '.join(methods)}}})"
+        if local and local.captured:
+            self._write(f"{local.py_name}[0] = {_class}")
+        else:
+            self._define(stmt, stmt.name, _class)
+
+    def _emit_function(self, impl: str, stmt: FunctionStmt,
+                       is_method: bool = False, superclass: Optional[str] = None):
+        function = self._functions[id(stmt)]
+        params = [self._declarations[id(param)] for param in stmt.params]
+
+        positional = (["_this"] if is_method else []) \
+                + [param.py_name for param in params]
+        keywords = [f"{local.py_name}={local.py_name}" for local in function.free]
+        if superclass:
+            keywords.append(f"{superclass}={superclass}")
+        signature = ", ".join(positional + (["*"] + keywords if keywords else []))
+
+        self._line = stmt.name.line
+        self._write(f"def {impl}({signature}):")
+        enclosing_initializer = self._in_initializer
+        self._in_initializer = is_method and stmt.name.lexeme == "init"
+        with self._indented():
+            for param in params:
+                if param.captured:
+                    self._write(f"{param.py_name} = [{param.py_name}]")
+            for s in stmt.body:
+                self._emit(s)
+            if self._in_initializer:
+                self._write("return _this")
+        self._in_initializer = enclosing_initializer
+
+    def _define(self, declaration: Stmt, name: Token, value: str):
+        local = self._declarations.get(id(declaration))
+        if local is None:
+            self._write(f"{GLOBAL_PREFIX}{_mangle(name.lexeme)} = {value}")
+        elif local.captured:
+            self._write(f"{local.py_name} = [{value}]")
+        else:
+            self._write(f"{local.py_name} = {value}")
+
+    ### Expressions
+    def _expr(self, expr: Expr) -> str:
+        return getattr(self, f"_expr_{type(expr).__name__}")(expr)
+
+    def _test(self, expr: Expr) -> str:
+        """Lox truthiness of `expr`, as a Python bool."""
+        if _is_boolean(expr):
+            return self._expr(expr)
+        value = self._new_name("_t")
+        return f"({value} := {self._expr(expr)}) is not None and {value} is not False"
+
+    def _expr_LiteralExpr(self, expr: LiteralExpr) -> str:
+        if isinstance(expr.value, float) and not math.isfinite(expr.value):
+            return f"float('{expr.value}')"
+        return repr(expr.value)
+
+    def _expr_GroupingExpr(self, expr: GroupingExpr) -> str:
+        return f"({self._expr(expr.inner)})"
+
+    def _expr_VarExpr(self, expr: VarExpr) -> str:
+        local = self._references.get(id(expr))
+        if local is None:
+            return f"{self._mark(expr.name)}{GLOBAL_PREFIX}{_mangle(expr.name.lexeme)}"
+        return f"{local.py_name}[0]" if local.captured else local.py_name
+
+    def _expr_ThisExpr(self, expr: ThisExpr) -> str:
+        return "_this"
+
+    def _expr_SuperExpr(self, expr: SuperExpr) -> str:
+        superclass = self._references[id(expr)].py_name
+        return f"_super({superclass}, {expr.method.lexeme!r}, _this, {expr.method.line})"
+
+    def _expr_AssignExpr(self, expr: AssignExpr) -> str:
+        value = self._expr(expr.value)
+        local = self._references.get(id(expr))
+        if local is None:
+            return f"_assign_global({GLOBAL_PREFIX + _mangle(expr.name.lexeme)!r}, {value}, {expr.name.line})"
+        elif local.captured:
+            return f"_set_cell({local.py_name}, {value})"
+        else:
+            return f"({local.py_name} := {value})"
+
+    def _expr_UnaryExpr(self, expr: UnaryExpr) -> str:
+        right = self._expr(expr.right)
+        value = self._new_name("_t")
+        match expr.operator.type_:
+            case TokenType.MINUS:
+                return f"(-{value} if type({value} := {right}) is float " \
+                       f"else _fail({expr.operator.line}, 'Operand must be a number.'))"
+            case TokenType.BANG:
+                return f"(({value} := {right}) is None or {value} is False)"
+            case _:
+                return f"({right}, None)[1]"
+
+    def _expr_BinaryExpr(self, expr: BinaryExpr) -> str:
+        operator = expr.operator
+        match operator.type_:
+            case TokenType.SLASH:
+                return f"_div({self._expr(expr.left)}, {self._expr(expr.right)}, {operator.line})"
+            case TokenType.EQUAL_EQUAL:
+                return self._equality(expr)
+            case TokenType.BANG_EQUAL:
+                return f"(not {self._equality(expr)})"
+            case TokenType.PLUS:
+                return self._addition(expr)
+            case op if op in _ARITHMETICS or op in _COMPARISONS:
+                symbol = _ARITHMETICS.get(op) or _COMPARISONS[op]
+                (left, left_eval), (right, right_eval) = self._operands(expr)
+                checks = [f"(type({evaluation}) is float)"
+                          for evaluation in (left_eval, right_eval)
+                          if evaluation is not None]
+                result = f"{left} {symbol} {right}"
+                if not checks:
+                    return f"({result})"
+                return f"({result} if {' & '.join(checks)} " \
+                       f"else _fail({operator.line}, 'Operands must be numbers.'))"
+            case _:
+                return f"({self._expr(expr.left)}, {self._expr(expr.right)}, None)[2]"
+
+    def _operands(self, expr: BinaryExpr) -> list[tuple[str, Optional[str]]]:
+        """Evaluate both operands once, in order.
+
+        Return, for each operand, the text to use its value and the text to
+        evaluate and type-check it (`None` when the operand is a number
+        literal, which needs no check)
+        """
+        pure = _is_pure(expr.left) and _is_pure(expr.right)
+        operands: list[tuple[str, Optional[str]]] = []
+        for operand in (expr.left, expr.right):
+            text = self._expr(operand)
+            inner = _strip_grouping(operand)
+            if isinstance(inner, LiteralExpr) and type(inner.value) is float:
+                operands.append((text, None))
+            elif pure:
+                operands.append((text, text))
+            else:
+                value = self._new_name("_t")
+                operands.append((value, f"({value} := {text})"))
+        return operands
+
+    def _addition(self, expr: BinaryExpr) -> str:
+        (left, left_eval), (right, right_eval) = self._operands(expr)
+        fail = f"_fail({expr.operator.line}, 'Operands must be two numbers or two strings.')"
+        if left_eval is None and right_eval is None:
+            return f"({left} + {right})"
+        elif left_eval is None or right_eval is None:
+            # one side is a number literal
+            return f"({left} + {right} if type({left_eval or right_eval}) is float else {fail})"
+
+        kind = self._new_name("_t")
+        return f"({left} + {right} if ({kind} := type({left_eval})) is type({right_eval}) " \
+               f"and ({kind} is float or {kind} is str) else {fail})"
+
+    def _equality(self, expr: BinaryExpr) -> str:
+        left = self._expr(expr.left)
+        right_expr = _strip_grouping(expr.right)
+        if isinstance(right_expr, LiteralExpr) and right_expr.value is None:
+            return f"({left} is None)"
+
+        right = self._expr(expr.right)
+        a, b = self._new_name("_t"), self._new_name("_t")
+        return f"(({a} := {left}) == ({b} := {right}) and type({a}) is type({b}))"
+
+    def _expr_LogicalExpr(self, expr: LogicalExpr) -> str:
+        left = self._expr(expr.left)
+        right = self._expr(expr.right)
+        value = self._new_name("_t")
+        # Short-circuit: result is the operand itself, not a boolean
+        if expr.operator.type_ == TokenType.OR:
+            return f"({value} if (({value} := {left}) is not None and {value} is not False) else {right})"
+        else:
+            return f"({value} if (({value} := {left}) is None or {value} is False) else {right})"
+
+    def _expr_CallExpr(self, expr: CallExpr) -> str:
+        callee = self._new_name("_t")
+        native = None
+        if type(expr.callee) is GetExpr:
+            # Methods of native objects are invoked, not bound then called
+            get = expr.callee
+            obj, native = self._new_name("_t"), self._new_name("_t")
+            name = PROPERTY_PREFIX + _mangle(get.name.lexeme)
+            callee_code = f"({self._mark(get.name)}{obj}.{name} " \
+                          f"if ({native} := None if isinstance(({obj} := {self._expr(get.obj)}), _Instance) " \
+                          f"else _native_method({obj}, {get.name.lexeme!r}, {get.name.line})) is None " \
+                          f"else None)"
+        else:
+            callee_code = self._expr(expr.callee)
+        evaluations = [f"(type({callee} := {callee_code}) is _Fn)"]
+        arguments = []
+        for argument in expr.arguments:
+            value = self._new_name("_t")
+            evaluations.append(f"(({value} := {self._expr(argument)}) is {value})")
+            arguments.append(value)
+
+        # `&` rather than `and`: every argument is evaluated before checking
+        args = ", ".join(arguments)
+        slow_args = ", ".join([callee, str(expr.paren.line)] + arguments)
+        slow_path = f"_call({slow_args})"
+        if native is not None:
+            invoke_args = ", ".join([obj, native, str(expr.paren.line)] + arguments)
+            slow_path = f"(_invoke({invoke_args}) if {native} is not None else {slow_path})"
+        return f"({callee}.fn({args}) if {' & '.join(evaluations)} " \
+               f"and {callee}.arity == {len(arguments)} else {slow_path})"
+
+    def _expr_GetExpr(self, expr: GetExpr) -> str:
+        obj = self._new_name("_t")
+        name = PROPERTY_PREFIX + _mangle(expr.name.lexeme)
+        return f"({self._mark(expr.name)}{obj}.{name} " \
+               f"if isinstance(({obj} := {self._expr(expr.obj)}), _Instance) " \
+               f"else _get_native({obj}, {expr.name.lexeme!r}, {expr.name.line}))"
+
+    def _expr_SetExpr(self, expr: SetExpr) -> str:
+        obj = self._new_name("_t")
+        name = PROPERTY_PREFIX + _mangle(expr.name.lexeme)
+        return f"(_set_field({obj}, {name!r}, {self._expr(expr.value)}) " \
+               f"if isinstance(({obj} := {self._expr(expr.obj)}), _Instance) " \
+               f"else _fail({expr.name.line}, 'Only instances have fields.'))"
+
+
+def _cache_path(src: str) -> str:
+    # Any change to the transpiler or its runtime invalidates generated code
+    key = f"{code_digest()}\0{src}".encode()
+    return os.path.join(cache_dir(), hashlib.sha256(key).hexdigest() + ".pyc")
+
+
+def load_cached(src: str) -> Optional[PythonProgram]:
+    try:
+        with open(_cache_path(src), "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    magic = importlib.util.MAGIC_NUMBER
+    if not data.startswith(magic):
+        return None     # written by another version of Python
+    try:
+        return PythonProgram.loads(data[len(magic):])
+    except (ValueError, EOFError, TypeError):
+        return None
+
+
+def store_cached(src: str, program: PythonProgram):
+    path = _cache_path(src)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(importlib.util.MAGIC_NUMBER + program.dumps())
+        os.replace(tmp_path, path)      # readers never see a partial file
+    except OSError as e:
+        print(f"WARNING: cannot cache compiled program: {e}", file=sys.stderr)
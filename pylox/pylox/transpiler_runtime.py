@@ -0,0 +1,208 @@
+"""Objects and helpers that code generated by `pylox.transpiler` runs against.
+
+Lox values map onto Python ones: numbers, strings, booleans and nil are
+`float`, `str`, `bool` and `None`; functions are `LoxPyFunction` wrappers of
+plain Python functions; classes are Python classes built by `LoxPyClass`,
+whose instances keep their fields in the instance `__dict__`.
+
+Helpers are bound to names starting with an underscore. Lox identifiers may
+too, but they never appear bare in generated code: they get a prefix,
+`g_<name>` for globals, `v<n>_<name>` for locals and `p_<name>` for
+properties, which keeps them apart from the helpers and from Python's keywords
+and dunders.
+"""
+from types import MethodType
+from typing import Any, NoReturn
+
+from pylox.token import Token, TokenType
+from pylox.callable import LoxCallable
+from pylox.error_handling import LoxRuntimeError
+from pylox.interpreter import is_equal, stringify, divide, _NativeClock
+from pylox.memo import NativeMemoize
+from pylox.native import NativeFunction, get_property, native_method, invoke_native
+from pylox.stdlib import standard_natives
+
+
+GLOBAL_PREFIX = "g_"
+PROPERTY_PREFIX = "p_"
+
+
+class LoxPyFunction:
+    """A Lox function (or bound method) around a generated Python function."""
+
+    __slots__ = ("fn", "name", "arity")
+
+    def __init__(self, fn, name: str, arity: int):
+        self.fn = fn
+        self.name = name
+        self.arity = arity
+
+    def __repr__(self) -> str:
+        return f"<fn {self.name}>"
+
+
+class LoxPyMethod:
+    """Descriptor binding a method to the instance it is looked up on."""
+
+    __slots__ = ("impl", "name", "arity")
+
+    def __init__(self, impl, name: str, arity: int):
+        self.impl = impl
+        self.name = name
+        self.arity = arity
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return LoxPyFunction(MethodType(self.impl, instance), self.name,
+                             self.arity)
+
+
+class LoxPyClass(type):
+    """Metaclass of every generated Lox class."""
+
+    def __repr__(cls) -> str:
+        return cls.__name__
+
+
+class LoxPyInstance:
+    """Base of every generated Lox class."""
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__} instance"
+
+
+class _NativeMemoize(NativeMemoize):
+
+    def _adapt(self, interpreter, function):
+        if type(function) is LoxPyFunction:
+            return function.arity, function.fn
+        return super()._adapt(interpreter, function)
+
+
+def _at(line: int) -> Token:
+    # Generated code only knows where an error happened, not which token
+    return Token(TokenType.EOF, "", None, line, 0)
+
+
+def fail(line: int, message: str) -> NoReturn:
+    raise LoxRuntimeError(_at(line), message)
+
+
+def make_class(name: str, superclass, methods: dict[str, LoxPyMethod]):
+    base = superclass if superclass is not None else LoxPyInstance
+    return LoxPyClass(name, (base,), methods)
+
+
+def call(callee, line: int, *arguments):
+    """Slow path of a call: anything but a Lox function of the right arity."""
+    n_arguments = len(arguments)
+
+    if type(callee) is LoxPyFunction:
+        arity = callee.arity
+    elif isinstance(callee, LoxPyClass):
+        initializer = getattr(callee, PROPERTY_PREFIX + "init", None)
+        arity = initializer.arity if initializer else 0
+    elif type(callee) is NativeFunction or isinstance(callee, LoxCallable):
+        arity = callee.arity()
+    else:
+        fail(line, "Can only call functions and classes.")
+
+    if n_arguments != arity:
+        fail(line, f"Expected {arity} arguments but got {n_arguments}.")
+
+    if type(callee) is LoxPyFunction:
+        return callee.fn(*arguments)
+    elif isinstance(callee, LoxPyClass):
+        instance = callee()
+        if initializer:
+            initializer.impl(instance, *arguments)
+        return instance
+    else:
+        try:
+            return callee.call(None, *arguments)
+        except LoxRuntimeError as e:
+            if e.token is None:
+                e.token = _at(line)
+            raise
+
+
+def checked_divide(left, right, line: int) -> float:
+    if type(left) is not float or type(right) is not float:
+        fail(line, "Operands must be numbers.")
+    return divide(left, right)
+
+
+def get_super(superclass, name: str, this, line: int):
+    method = getattr(superclass, PROPERTY_PREFIX + name, None)
+    if method is None:
+        fail(line, f"Undefined property '{name}'.")
+    return method.__get__(this)
+
+
+def get_native(obj, name: str, line: int):
+    return get_property(obj, name, _at(line))
+
+
+def get_native_method(obj, name: str, line: int):
+    try:
+        return native_method(obj, name)
+    except LoxRuntimeError as e:
+        e.token = _at(line)
+        raise
+
+
+def invoke(obj, method, line: int, *arguments):
+    """Call of a native method, which is never bound to its object."""
+    try:
+        return invoke_native(obj, method, arguments)
+    except LoxRuntimeError as e:
+        if e.token is None:
+            e.token = _at(line)
+        raise
+
+
+def set_field(instance, name: str, value):
+    setattr(instance, name, value)
+    return value
+
+
+def set_cell(cell: list, value):
+    cell[0] = value
+    return value
+
+
+def new_namespace() -> dict[str, Any]:
+    """Fresh module namespace for one run of a generated program."""
+    namespace: dict[str, Any] = {}
+
+    def assign_global(name: str, value, line: int):
+        if name not in namespace:
+            fail(line, f"Undefined variable '{name[len(GLOBAL_PREFIX):]}'.")
+        namespace[name] = value
+        return value
+
+    namespace.update({
+        "_Fn": LoxPyFunction,
+        "_Method": LoxPyMethod,
+        "_Class": LoxPyClass,
+        "_Instance": LoxPyInstance,
+        "_fail": fail,
+        "_make_class": make_class,
+        "_call": call,
+        "_div": checked_divide,
+        "_eq": is_equal,
+        "_str": stringify,
+        "_super": get_super,
+        "_get_native": get_native,
+        "_native_method": get_native_method,
+        "_invoke": invoke,
+        "_set_field": set_field,
+        "_set_cell": set_cell,
+        "_assign_global": assign_global,
+        GLOBAL_PREFIX + "clock": _NativeClock(),
+        GLOBAL_PREFIX + "memoize": _NativeMemoize(),
+    })
+    for name, native in standard_natives().items():
+        namespace[GLOBAL_PREFIX + name] = native
+    return namespace
@@ -0,0 +1,127 @@
+"""The built-in `Vector` type, only defined when NumPy is installed.
+
+A vector is a fixed-size sequence of numbers in an `ndarray`. Whole-vector
+arithmetic and reductions run in NumPy, leaving the interpreter nothing but
+one call to evaluate:
+
+    var a = Array(0);
+    a.append(1); a.append(2); a.append(3);
+    var v = Vector(a);
+    print v.mul(v).sum();       // 14
+    print v.add(1);             // [2, 3, 4]
+    print v.dot(v.div(2));      // 7
+
+`add`, `sub`, `mul` and `div` take a vector of the same length or a number.
+Arithmetic follows Lox numbers: division by zero, overflows and `inf - inf`
+silently yield infinities or NaN, with no error nor NumPy warning.
+"""
+from array import array
+from functools import wraps
+
+import numpy as np
+
+from pylox.native import NativeObject, NativeError, lox_method
+from pylox.arrays import Array
+
+
+def _ieee(method):
+    """Run `method` with NumPy's floating-point errors ignored."""
+    @wraps(method)
+    def run(*args):
+        with np.errstate(all="ignore"):
+            return method(*args)
+    return run
+
+
+class Vector(NativeObject):
+
+    __slots__ = ("_values",)
+
+    def __init__(self, values: np.ndarray) -> None:
+        self._values = values
+
+    @staticmethod
+    def new(source) -> "Vector":
+        """The `Vector(array)` native, copying an array of numbers."""
+        if type(source) is not Array:
+            raise NativeError("Vector source must be an array.")
+        return Vector(np.array(
+            source.numbers("Vector elements must be numbers."),
+            dtype=np.float64))
+
+    def _operand(self, other):
+        if type(other) is float:
+            return other
+        if type(other) is not Vector:
+            raise NativeError("Operand must be a vector or a number.")
+        if len(other._values) != len(self._values):
+            raise NativeError("Vectors must have the same length.")
+        return other._values
+
+    @lox_method()
+    @_ieee
+    def add(self, other):
+        return Vector(self._values + self._operand(other))
+
+    @lox_method()
+    @_ieee
+    def sub(self, other):
+        return Vector(self._values - self._operand(other))
+
+    @lox_method()
+    @_ieee
+    def mul(self, other):
+        return Vector(self._values * self._operand(other))
+
+    @lox_method()
+    @_ieee
+    def div(self, other):
+        return Vector(self._values / self._operand(other))
+
+    @lox_method()
+    @_ieee
+    def dot(self, other):
+        if type(other) is not Vector:
+            raise NativeError("Operand must be a vector.")
+        return float(np.dot(self._values, self._operand(other)))
+
+    @lox_method()
+    @_ieee
+    def sum(self):
+        return float(self._values.sum())
+
+    @lox_method()
+    def min(self):
+        return float(self._nonempty().min())
+
+    @lox_method()
+    def max(self):
+        return float(self._nonempty().max())
+
+    @lox_method()
+    @_ieee
+    def mean(self):
+        return float(self._nonempty().mean())
+
+    def _nonempty(self) -> np.ndarray:
+        if not len(self._values):
+            raise NativeError("Vector is empty.")
+        return self._values
+
+    @lox_method()
+    def get(self, index):
+        if type(index) is not float or not index.is_integer() \
+                or not 0 <= index < len(self._values):
+            raise NativeError("Vector index must be an integer in range.")
+        return float(self._values[int(index)])
+
+    @lox_method()
+    def length(self):
+        return float(len(self._values))
+
+    @lox_method()
+    def toArray(self):
+        return Array(array("d", self._values.tobytes()))
+
+    def __repr__(self) -> str:
+        return repr(self.toArray())
@@ -0,0 +1,428 @@
+"""Stack-based virtual machine running bytecode from `pylox.compiler`.
+
+A port of clox's `vm.c`. Error messages are those of the tree-walk
+interpreter, since both are checked against the same test suite.
+"""
+from typing import Any, Optional
+
+from pylox.token import Token, TokenType
+from pylox.stmt import Stmt
+from pylox.callable import LoxCallable
+from pylox.chunk import OpCode
+from pylox.object import (ObjUpvalue, ObjClosure, ObjClass, ObjInstance,
+                          ObjBoundMethod)
+from pylox.compiler import Compiler
+from pylox.debug import disassemble_function
+from pylox.error_handling import LoxRuntimeError, ErrorHandler
+from pylox.interpreter import stringify, divide, _NativeClock
+from pylox.memo import NativeMemoize
+from pylox.native import (NativeFunction, get_property, native_method,
+                          invoke_native)
+from pylox.stdlib import standard_natives
+
+
+# Frames live on the VM's own stack, not Python's: unlike the tree-walk
+# interpreters, recursion depth is bounded by this budget alone
+FRAMES_MAX = 1 << 16
+
+# Plain ints, cheaper than enum members to compare against in the dispatch loop
+(OP_CONSTANT, OP_NIL, OP_TRUE, OP_FALSE, OP_POP, OP_GET_LOCAL, OP_SET_LOCAL,
+ OP_GET_GLOBAL, OP_DEFINE_GLOBAL, OP_SET_GLOBAL, OP_GET_UPVALUE, OP_SET_UPVALUE,
+ OP_CLOSE_UPVALUE, OP_GET_PROPERTY, OP_SET_PROPERTY, OP_GET_SUPER, OP_EQUAL,
+ OP_GREATER, OP_LESS, OP_ADD, OP_SUBTRACT, OP_MULTIPLY, OP_DIVIDE, OP_NOT,
+ OP_NEGATE, OP_PRINT, OP_JUMP, OP_JUMP_IF_FALSE, OP_LOOP, OP_CALL, OP_INVOKE,
+ OP_SUPER_INVOKE, OP_CLOSURE, OP_RETURN, OP_CLASS, OP_INHERIT,
+ OP_METHOD) = map(int, OpCode)
+
+
+class _CallFrame:
+    __slots__ = ("closure", "ip", "slots")
+
+    def __init__(self, closure: ObjClosure, slots: int) -> None:
+        self.closure = closure
+        self.ip = 0
+        self.slots = slots      # stack index of the frame's slot zero
+
+
+class _NativeMemoize(NativeMemoize):
+
+    def _adapt(self, interpreter, function):
+        if type(function) is ObjClosure:
+            arity = function.function.arity
+        elif type(function) is ObjBoundMethod:
+            arity = function.method.function.arity
+        else:
+            return super()._adapt(interpreter, function)
+        return arity, lambda *arguments: \
+            interpreter.call_function(function, arguments)
+
+
+def _error(message: str) -> LoxRuntimeError:
+    # The token, for the line number, is filled in by `VM.run`
+    return LoxRuntimeError(None, message)
+
+
+class VM:
+    """Execution backend compiling programs to bytecode, then running them.
+
+    Exposes the same interface as `Interpreter` towards `PyLox`.
+    """
+
+    def __init__(self, error_handler: ErrorHandler):
+        self._handler = error_handler
+        self._compiler = Compiler(error_handler)
+        self.print_code = False     # disassemble programs before running them
+        self.max_frames = FRAMES_MAX
+
+        self._stack: list[Any] = []
+        self._frames: list[_CallFrame] = []
+        self._open_upvalues: Optional[ObjUpvalue] = None
+        self._globals: dict[str, Any] = {"clock": _NativeClock(),
+                                         "memoize": _NativeMemoize(),
+                                         **standard_natives()}
+
+    def define(self, name: str, value):
+        self._globals[name] = value
+
+    def interpret(self, statements: list[Stmt]):
+        function = self._compiler.compile(statements)
+        if function is None:
+            return
+        if self.print_code:
+            disassemble_function(function)
+
+        closure = ObjClosure(function, [])
+        self._stack.append(closure)
+        self._call(closure, 0)
+        try:
+            self.run()
+        except LoxRuntimeError as e:
+            self._handler.runtime_error(e)
+            self._reset_stack()
+
+    def _reset_stack(self):
+        self._stack.clear()
+        self._frames.clear()
+        self._open_upvalues = None
+
+    def call_function(self, callee, arguments):
+        """Call `callee` from Python, e.g. from a native function, and run it
+        to completion on top of the frames already running."""
+        self._stack.append(callee)
+        self._stack.extend(arguments)
+        if self._call_value(callee, len(arguments)):
+            return self.run(len(self._frames) - 1)
+        return self._stack.pop()
+
+    def run(self, base: int = 0):
+        """Run until the frames above the first `base` ones return, then
+        return what the last of them returned."""
+        stack = self._stack
+        frames = self._frames
+        globals_ = self._globals
+        push = stack.append
+        pop = stack.pop
+
+        while True:
+            # (Re)load the state of the frame on top, after a call or return
+            frame = frames[-1]
+            closure = frame.closure
+            chunk = closure.function.chunk
+            code = chunk.code
+            constants = chunk.constants
+            upvalues = closure.upvalues
+            slots = frame.slots
+            ip = frame.ip
+
+            try:
+                while True:
+                    op = code[ip]
+                    ip += 1
+
+                    if op == OP_GET_LOCAL:
+                        push(stack[slots + code[ip]])
+                        ip += 1
+                    elif op == OP_CONSTANT:
+                        push(constants[code[ip]])
+                        ip += 1
+                    elif op == OP_GET_GLOBAL:
+                        name = constants[code[ip]]
+                        ip += 1
+                        try:
+                            push(globals_[name])
+                        except KeyError:
+                            raise _error(f"Undefined variable '{name}'.") from None
+                    elif op == OP_POP:
+                        pop()
+                    elif op == OP_LESS:
+                        b = pop()
+                        a = stack[-1]
+                        if type(a) is not float or type(b) is not float:
+                            raise _error("Operands must be numbers.")
+                        stack[-1] = a < b
+                    elif op == OP_ADD:
+                        b = pop()
+                        a = stack[-1]
+                        type_ = type(a)
+                        if type_ is not type(b) or (type_ is not float
+                                                    and type_ is not str):
+                            raise _error("Operands must be two numbers or two strings.")
+                        stack[-1] = a + b
+                    elif op == OP_EQUAL:
+                        b = pop()
+                        a = stack[-1]
+                        stack[-1] = a == b and type(a) is type(b)
+                    elif op == OP_SUBTRACT:
+                        b = pop()
+                        a = stack[-1]
+                        if type(a) is not float or type(b) is not float:
+                            raise _error("Operands must be numbers.")
+                        stack[-1] = a - b
+                    elif op == OP_JUMP_IF_FALSE:
+                        value = stack[-1]
+                        if value is None or value is False:
+                            ip += (code[ip] << 8 | code[ip + 1]) + 2
+                        else:
+                            ip += 2
+                    elif op == OP_JUMP:
+                        ip += (code[ip] << 8 | code[ip + 1]) + 2
+                    elif op == OP_LOOP:
+                        ip -= (code[ip] << 8 | code[ip + 1]) - 2
+                    elif op == OP_SET_LOCAL:
+                        stack[slots + code[ip]] = stack[-1]
+                        ip += 1
+                    elif op == OP_CALL:
+                        arg_count = code[ip]
+                        frame.ip = ip + 1
+                        if self._call_value(stack[-1 - arg_count], arg_count):
+                            break
+                        ip += 1
+                    elif op == OP_INVOKE:
+                        name = constants[code[ip]]
+                        arg_count = code[ip + 1]
+                        frame.ip = ip + 2
+                        if self._invoke(name, arg_count):
+                            break
+                        ip += 2
+                    elif op == OP_RETURN:
+                        result = pop()
+                        if self._open_upvalues is not None:
+                            self._close_upvalues(slots)
+                        frames.pop()
+                        del stack[slots:]
+                        if len(frames) == base:
+                            return result
+                        push(result)
+                        break
+                    elif op == OP_GET_PROPERTY:
+                        instance = stack[-1]
+                        name = constants[code[ip]]
+                        ip += 1
+                        if type(instance) is not ObjInstance:
+                            stack[-1] = get_property(instance, name)
+                        elif name in instance.fields:
+                            stack[-1] = instance.fields[name]
+                        else:
+                            stack[-1] = self._bind_method(instance.klass, name,
+                                                          instance)
+                    elif op == OP_SET_PROPERTY:
+                        value = pop()
+                        instance = stack[-1]
+                        if type(instance) is not ObjInstance:
+                            raise _error("Only instances have fields.")
+                        instance.fields[constants[code[ip]]] = value
+                        ip += 1
+                        stack[-1] = value
+                    elif op == OP_GREATER:
+                        b = pop()
+                        a = stack[-1]
+                        if type(a) is not float or type(b) is not float:
+                            raise _error("Operands must be numbers.")
+                        stack[-1] = a > b
+                    elif op == OP_MULTIPLY:
+                        b = pop()
+                        a = stack[-1]
+                        if type(a) is not float or type(b) is not float:
+                            raise _error("Operands must be numbers.")
+                        stack[-1] = a * b
+                    elif op == OP_DIVIDE:
+                        b = pop()
+                        a = stack[-1]
+                        if type(a) is not float or type(b) is not float:
+                            raise _error("Operands must be numbers.")
+                        stack[-1] = divide(a, b)
+                    elif op == OP_NOT:
+                        value = stack[-1]
+                        stack[-1] = value is None or value is False
+                    elif op == OP_NEGATE:
+                        value = stack[-1]
+                        if type(value) is not float:
+                            raise _error("Operand must be a number.")
+                        stack[-1] = -value
+                    elif op == OP_GET_UPVALUE:
+                        upvalue = upvalues[code[ip]]
+                        ip += 1
+                        push(upvalue.cells[upvalue.index])
+                    elif op == OP_SET_UPVALUE:
+                        upvalue = upvalues[code[ip]]
+                        ip += 1
+                        upvalue.cells[upvalue.index] = stack[-1]
+                    elif op == OP_SET_GLOBAL:
+                        name = constants[code[ip]]
+                        ip += 1
+                        if name not in globals_:
+                            raise _error(f"Undefined variable '{name}'.")
+                        globals_[name] = stack[-1]
+                    elif op == OP_DEFINE_GLOBAL:
+                        globals_[constants[code[ip]]] = pop()
+                        ip += 1
+                    elif op == OP_NIL:
+                        push(None)
+                    elif op == OP_TRUE:
+                        push(True)
+                    elif op == OP_FALSE:
+                        push(False)
+                    elif op == OP_PRINT:
+                        print(stringify(pop()))
+                    elif op == OP_CLOSURE:
+                        function = constants[code[ip]]
+                        ip += 1
+                        captured = []
+                        for _ in range(function.upvalue_count):
+                            if code[ip]:
+                                captured.append(
+                                    self._capture_upvalue(slots + code[ip + 1]))
+                            else:
+                                captured.append(upvalues[code[ip + 1]])
+                            ip += 2
+                        push(ObjClosure(function, captured))
+                    elif op == OP_CLOSE_UPVALUE:
+                        self._close_upvalues(len(stack) - 1)
+                        pop()
+                    elif op == OP_GET_SUPER:
+                        name = constants[code[ip]]
+                        ip += 1
+                        superclass = pop()
+                        stack[-1] = self._bind_method(superclass, name,
+                                                      stack[-1])
+                    elif op == OP_SUPER_INVOKE:
+                        name = constants[code[ip]]
+                        arg_count = code[ip + 1]
+                        frame.ip = ip + 2
+                        superclass = pop()
+                        self._invoke_from_class(superclass, name, arg_count)
+                        break
+                    elif op == OP_CLASS:
+                        push(ObjClass(constants[code[ip]]))
+                        ip += 1
+                    elif op == OP_INHERIT:
+                        superclass = stack[-2]
+                        if type(superclass) is not ObjClass:
+                            raise _error("Superclass must be a class.")
+                        pop().methods.update(superclass.methods)
+                    elif op == OP_METHOD:
+                        method = pop()
+                        stack[-1].methods[constants[code[ip]]] = method
+                        ip += 1
+            except LoxRuntimeError as e:
+                if e.token is None:
+                    line = chunk.get_line(ip - 1)
+                    e.token = Token(TokenType.EOF, "", None, line, 0)
+                raise
+
+    def _call(self, closure: ObjClosure, arg_count: int):
+        arity = closure.function.arity
+        if arg_count != arity:
+            raise _error(f"Expected {arity} arguments but got {arg_count}.")
+        if len(self._frames) >= self.max_frames:
+            raise _error("Stack overflow.")
+
+        self._frames.append(
+            _CallFrame(closure, len(self._stack) - arg_count - 1))
+
+    def _call_value(self, callee: Any, arg_count: int) -> bool:
+        """Call `callee`, True if that pushed a new frame to run."""
+        type_ = type(callee)
+        if type_ is ObjClosure:
+            self._call(callee, arg_count)
+            return True
+        elif type_ is ObjBoundMethod:
+            self._stack[-1 - arg_count] = callee.receiver
+            self._call(callee.method, arg_count)
+            return True
+        elif type_ is ObjClass:
+            self._stack[-1 - arg_count] = ObjInstance(callee)
+            initializer = callee.methods.get("init")
+            if initializer is not None:
+                self._call(initializer, arg_count)
+                return True
+            elif arg_count != 0:
+                raise _error(f"Expected 0 arguments but got {arg_count}.")
+            return False
+        elif type_ is NativeFunction or isinstance(callee, LoxCallable):
+            arity = callee.arity()
+            if arg_count != arity:
+                raise _error(f"Expected {arity} arguments but got {arg_count}.")
+            arguments = self._stack[len(self._stack) - arg_count:]
+            result = callee.call(self, *arguments)
+            del self._stack[-1 - arg_count:]
+            self._stack.append(result)
+            return False
+
+        raise _error("Can only call functions and classes.")
+
+    def _invoke(self, name: str, arg_count: int) -> bool:
+        receiver = self._stack[-1 - arg_count]
+        if type(receiver) is not ObjInstance:
+            native = native_method(receiver, name)
+            arguments = self._stack[len(self._stack) - arg_count:]
+            result = invoke_native(receiver, native, arguments)
+            del self._stack[-1 - arg_count:]
+            self._stack.append(result)
+            return False
+
+        if name in receiver.fields:
+            value = receiver.fields[name]
+            self._stack[-1 - arg_count] = value
+            return self._call_value(value, arg_count)
+
+        self._invoke_from_class(receiver.klass, name, arg_count)
+        return True
+
+    def _invoke_from_class(self, klass: ObjClass, name: str, arg_count: int):
+        method = klass.methods.get(name)
+        if method is None:
+            raise _error(f"Undefined property '{name}'.")
+        self._call(method, arg_count)
+
+    def _bind_method(self, klass: ObjClass, name: str,
+                     receiver: ObjInstance) -> ObjBoundMethod:
+        method = klass.methods.get(name)
+        if method is None:
+            raise _error(f"Undefined property '{name}'.")
+        return ObjBoundMethod(receiver, method)
+
+    def _capture_upvalue(self, local: int) -> ObjUpvalue:
+        prev_upvalue = None
+        upvalue = self._open_upvalues
+        while upvalue is not None and upvalue.index > local:
+            prev_upvalue = upvalue
+            upvalue = upvalue.next
+        if upvalue is not None and upvalue.index == local:
+            return upvalue
+
+        created = ObjUpvalue(self._stack, local, upvalue)
+        if prev_upvalue is None:
+            self._open_upvalues = created
+        else:
+            prev_upvalue.next = created
+        return created
+
+    def _close_upvalues(self, last: int):
+        """Close every open upvalue pointing at stack slot `last` or above."""
+        while self._open_upvalues is not None \
+                and self._open_upvalues.index >= last:
+            upvalue = self._open_upvalues
+            upvalue.close()
+            self._open_upvalues = upvalue.next
+
@@ -0,0 +1,15 @@
+import io
+from contextlib import redirect_stdout, redirect_stderr
+
+
+def run(lox, source: str, compiled: bool = False,
+        use_cache: bool = False) -> tuple[str, str]:
+    """What `lox` prints running `source`, to stdout and to stderr;
+    transpiled to Python if `compiled`, through the cache if `use_cache`."""
+    out, err = io.StringIO(), io.StringIO()
+    with redirect_stdout(out), redirect_stderr(err):
+        if compiled:
+            lox.run_compiled(source, use_cache=use_cache)
+        else:
+            lox.run(source, use_cache=use_cache)
+    return out.getvalue(), err.getvalue()
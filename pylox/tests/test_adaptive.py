@@ -0,0 +1,63 @@
+import unittest
+
+from pylox.lox import PyLox
+
+from support import run
+
+POLYMORPHIC = """
+class Shape { area() { return 0; } describe() { return 10 * this.area(); } }
+class A < Shape { area() { return 1; } }
+class B < Shape { area() { return 2; } }
+class C < Shape {}
+var shapes = Array(0);
+shapes.append(A()); shapes.append(B()); shapes.append(C());
+var total = 0;
+for (var i = 0; i < 100; i = i + 1)
+  for (var j = 0; j < 3; j = j + 1) total = total + shapes.get(j).describe();
+print total;
+"""
+
+
+class InlineCacheTest(unittest.TestCase):
+
+    def test_method_calls_hit(self):
+        lox = PyLox(backend="adaptive")
+        self.assertEqual(run(lox, POLYMORPHIC), ("3000\n", ""))
+        stats = lox.interpreter.stats
+        # `describe()` and `this.area()` miss once per class
+        self.assertEqual(stats.cache_misses["invoke"], 6)
+        self.assertEqual(stats.cache_hits["invoke"], 2 * 300 - 6)
+
+    def test_fields_shadow_cached_methods(self):
+        lox = PyLox(backend="adaptive")
+        out, err = run(lox, """
+            class A { f() { return "method"; } }
+            fun field() { return "field"; }
+            var a = A();
+            for (var i = 0; i < 3; i = i + 1) {
+              if (i == 1) a.f = field;
+              if (i == 2) a = A();
+              print a.f();
+            }
+        """)
+        self.assertEqual((out, err), ("method\nfield\nmethod\n", ""))
+
+    def test_megamorphic_call_site(self):
+        classes = "".join(f"class K{i} {{ k() {{ return {i}; }} }}"
+                          for i in range(8))
+        lox = PyLox(backend="adaptive")
+        out, _ = run(lox, classes + """
+            var total = 0;
+            for (var round = 0; round < 2; round = round + 1) {
+        """ + "".join(f"total = total + K{i}().k();" for i in range(8))
+                     + "} print total;")
+        self.assertEqual(out, "56\n")
+
+    def test_undefined_method(self):
+        lox = PyLox(backend="adaptive")
+        _, err = run(lox, "class A { f() {} }\nvar a = A(); a.f();\na.g();")
+        self.assertEqual(err, "Undefined property 'g'.\n[line 3]\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
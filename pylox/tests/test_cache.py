@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pylox.lox import PyLox
+from pylox.ast_cache import SUFFIX, store_program
+
+from support import run
+
+PROGRAM = """
+fun fib(n) { if (n < 2) return n; return fib(n - 2) + fib(n - 1); }
+class Greeter { init(name) { this.name = name; } hi() { return "hi " + this.name; } }
+{ var a = 1; { var b = a + 1; print fib(10) + b; } }
+print Greeter("cache").hi();
+"""
+OUTPUT = ("57\nhi cache\n", "")
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patch = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": directory.name})
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.cache = os.path.join(directory.name, "pylox")
+
+    def files(self) -> list[str]:
+        return sorted(f for f in os.listdir(self.cache) if f.endswith(SUFFIX))
+
+    def test_miss_then_hit(self):
+        for backend in ("tree", "adaptive", "closure", "vm"):
+            with self.subTest(backend=backend):
+                lox = PyLox(backend=backend)
+                self.assertEqual(run(lox, PROGRAM, use_cache=True), OUTPUT)
+                self.assertEqual(run(lox, PROGRAM, use_cache=True), OUTPUT)
+                self.assertEqual(run(PyLox(backend=backend), PROGRAM,
+                                     use_cache=True), OUTPUT)
+                self.assertEqual(len(self.files()), 1)
+
+        lox = PyLox()
+        run(lox, PROGRAM, use_cache=True)
+        self.assertEqual(lox.cache_stats, {"hits": 1})
+
+    def test_optimized_programs_are_cached_apart(self):
+        lox = PyLox()
+        run(lox, PROGRAM, use_cache=True)
+        optimized = PyLox(optimize=True)
+        self.assertEqual(run(optimized, PROGRAM, use_cache=True), OUTPUT)
+        self.assertEqual(optimized.cache_stats, {"misses": 1})
+        self.assertEqual(len(self.files()), 2)
+        self.assertEqual(run(optimized, PROGRAM, use_cache=True), OUTPUT)
+        self.assertEqual(optimized.cache_stats, {"hits": 1, "misses": 1})
+
+    def test_programs_with_errors_are_not_cached(self):
+        lox = PyLox()
+        _, err = run(lox, "print a +;", use_cache=True)
+        self.assertIn("Expect expression.", err)
+        _, err = run(PyLox(), "{ var a = a; }", use_cache=True)
+        self.assertIn("Can't read local variable in its own initializer.", err)
+        self.assertFalse(os.path.exists(self.cache) and self.files())
+
+    def test_corrupt_file_is_a_miss(self):
+        run(PyLox(), PROGRAM, use_cache=True)
+        [name] = self.files()
+        with open(os.path.join(self.cache, name), "wb") as f:
+            f.write(b"LOXC garbage")
+        lox = PyLox()
+        self.assertEqual(run(lox, PROGRAM, use_cache=True), OUTPUT)
+        self.assertEqual(lox.cache_stats, {"misses": 1})
+        self.assertEqual(run(lox, PROGRAM, use_cache=True), OUTPUT)
+        self.assertEqual(lox.cache_stats, {"hits": 1, "misses": 1})
+
+    def test_least_recently_used_are_evicted(self):
+        lox = PyLox()
+        for i in range(3):
+            run(lox, f"print {i};", use_cache=True)
+        paths = [os.path.join(self.cache, name) for name in self.files()]
+        for age, path in enumerate(sorted(paths)):
+            os.utime(path, (1000 + age, 1000 + age))
+        size = os.path.getsize(paths[0])
+
+        store_program("print 3;", False, [], max_bytes=3 * size)
+        self.assertFalse(os.path.exists(paths[0]))
+        self.assertTrue(all(map(os.path.exists, paths[1:])))
+        self.assertEqual(len(self.files()), 3)
+
+    def test_programs_are_keyed_on_pylox_source(self):
+        for digest, stats in (("before", {"misses": 1}), ("before", {"hits": 1}),
+                              ("after", {"misses": 1})):
+            with mock.patch("pylox.ast_cache.code_digest", lambda: digest):
+                lox = PyLox()
+                self.assertEqual(run(lox, PROGRAM, use_cache=True), OUTPUT)
+                self.assertEqual(lox.cache_stats, stats)
+        self.assertEqual(len(self.files()), 2)
+
+    def test_compiled_code_is_keyed_on_pylox_source(self):
+        for digest in ("before", "before", "after"):
+            with mock.patch("pylox.transpiler.code_digest", lambda: digest):
+                self.assertEqual(run(PyLox(), PROGRAM, compiled=True,
+                                     use_cache=True), OUTPUT)
+        compiled = [f for f in os.listdir(self.cache) if f.endswith(".pyc")]
+        self.assertEqual(len(compiled), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
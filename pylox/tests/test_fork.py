@@ -0,0 +1,121 @@
+import unittest
+
+from pylox.lox import PyLox
+
+from support import run
+
+LIBRARY = """
+class Counter {
+  init() { this.n = 0; }
+  inc() { this.n = this.n + 1; return this.n; }
+}
+var counter = Counter();
+var items = Array(0);
+var names = Map();
+names.set(counter, "counter");
+fun makeNext() { var k = 0; fun next() { k = k + 1; return k; } return next; }
+var next = makeNext();
+var calls = 0;
+fun call() { calls = calls + 1; return calls; }
+"""
+
+
+class ForkTest(unittest.TestCase):
+
+    def library(self, backend: str) -> PyLox:
+        lox = PyLox(backend=backend)
+        self.assertEqual(run(lox, LIBRARY), ("", ""))
+        return lox
+
+    def test_forks_are_isolated(self):
+        for backend in ("tree", "adaptive"):
+            with self.subTest(backend=backend):
+                lox = self.library(backend)
+                for _ in range(2):
+                    out, err = run(lox.fork(), """
+                        print counter.inc();
+                        items.append(counter);
+                        print items.length();
+                        print names.get(counter);
+                        names.set("fork", true);
+                        print next();
+                        print call();
+                        var mine = 1;
+                    """)
+                    self.assertEqual((out, err), ("1\n1\ncounter\n1\n1\n", ""))
+
+                out, err = run(lox, """
+                    print counter.n;
+                    print items.length();
+                    print names.size();
+                    print next();
+                    print calls;
+                    print mine;
+                """)
+                self.assertEqual(out, "0\n0\n1\n1\n0\n")
+                self.assertEqual(err, "Undefined variable 'mine'.\n[line 7]\n")
+
+    def test_fork_shares_classes(self):
+        lox = self.library("adaptive")
+        fork = lox.fork()
+        self.assertEqual(run(fork, "var c = Counter(); c.inc(); print c.n;"),
+                         ("1\n", ""))
+        self.assertEqual(run(fork, "print counter.inc();"), ("1\n", ""))
+        fork_env = fork.interpreter.global_env
+        self.assertIs(fork_env._values["counter"]._class,
+                      lox.interpreter.global_env._values["Counter"])
+
+    def test_fork_sees_globals_it_has_not_read(self):
+        lox = self.library("tree")
+        fork = lox.fork()
+        run(lox, "calls = 10; counter.inc();")
+        self.assertEqual(run(fork, "print calls; print counter.n;"),
+                         ("10\n1\n", ""))
+        run(lox, "calls = 20; counter.inc();")
+        self.assertEqual(run(fork, "print calls; print counter.n;"),
+                         ("10\n1\n", ""))
+
+    def test_globals_are_copied_once_when_read(self):
+        lox = self.library("tree")
+        fork = lox.fork()
+        forked = fork.interpreter.global_env._values
+        library = lox.interpreter.global_env._values
+
+        run(fork, "calls = 5; items = nil;")
+        self.assertEqual(set(forked), {"calls", "items"})   # assigned only
+
+        run(fork, "print counter.n; print names.size();")
+        self.assertEqual(set(forked), {"calls", "items", "counter", "names"})
+        counter = forked["counter"]
+        self.assertIsNot(counter, library["counter"])
+        # the key `names` holds for `counter` is the fork's copy of it
+        self.assertEqual(run(fork, "print names.get(counter);"),
+                         ("counter\n", ""))
+        run(fork, "counter.inc(); counter.inc();")
+        self.assertIs(forked["counter"], counter)
+        self.assertEqual(library["counter"]._fields["n"], 0.0)
+
+    def test_fork_sees_globals_as_first_read(self):
+        lox = self.library("tree")
+        fork = lox.fork()
+        self.assertEqual(run(fork, "print counter.n;"), ("0\n", ""))
+        run(lox, "counter.inc(); calls = 3;")
+        # `counter` was read before the change, `calls` after
+        self.assertEqual(run(fork, "print counter.n; print calls;"),
+                         ("0\n3\n", ""))
+
+    def test_errors_of_a_fork(self):
+        lox = self.library("tree")
+        fork = lox.fork()
+        _, err = run(fork, "undefined = 1;")
+        self.assertEqual(err, "Undefined variable 'undefined'.\n[line 1]\n")
+        self.assertTrue(fork.error_handler.has_runtime_error)
+        self.assertFalse(lox.error_handler.has_runtime_error)
+
+    def test_other_backends_cannot_fork(self):
+        with self.assertRaises(TypeError):
+            PyLox(backend="vm").fork()
+
+
+if __name__ == "__main__":
+    unittest.main()
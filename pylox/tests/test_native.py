@@ -0,0 +1,87 @@
+import os
+import math
+import tempfile
+import unittest
+from unittest import mock
+
+from pylox.lox import PyLox, BACKENDS
+from pylox.native import NativeError
+
+from support import run
+
+
+class RegisterNativeTest(unittest.TestCase):
+
+    def test_arity_from_signature(self):
+        lox = PyLox()
+        lox.register_native("floor", math.floor)
+        self.assertEqual(run(lox, "print floor(2.5);"), ("2\n", ""))
+        _, err = run(lox, "floor(1, 2);")
+        self.assertEqual(err, "Expected 1 arguments but got 2.\n[line 1]\n")
+
+    def test_arity_required_without_signature(self):
+        lox = PyLox()
+        with self.assertRaises(ValueError):
+            lox.register_native("max", max)
+        with self.assertRaises(ValueError):
+            lox.register_native("hypot", math.hypot)
+        lox.register_native("max", max, 2)
+        self.assertEqual(run(lox, "print max(1, 3);"), ("3\n", ""))
+
+    def test_decorator(self):
+        lox = PyLox()
+
+        @lox.native()
+        def twice(x):
+            return 2 * x
+
+        @lox.native("concat", arity=2)
+        def _(a, b):
+            return a + b
+
+        self.assertEqual(run(lox, 'print twice(21); print concat("a", "b");'),
+                         ("42\nab\n", ""))
+
+    def test_native_error_on_call_line(self):
+        lox = PyLox()
+
+        @lox.native()
+        def positive(x):
+            if x <= 0:
+                raise NativeError("Must be positive.")
+            return x
+
+        self.assertEqual(run(lox, "print positive(1);\nprint positive(-1);"),
+                         ("1\n", "Must be positive.\n[line 2]\n"))
+        self.assertTrue(lox.error_handler.has_runtime_error)
+
+    def test_python_exception_on_call_line(self):
+        for backend in BACKENDS:
+            with self.subTest(backend=backend):
+                lox = PyLox(backend=backend)
+                lox.register_native("inverse", lambda x: 1 / x)
+                out, err = run(lox, "print inverse(4);\n\nprint inverse(0);")
+                self.assertEqual(out, "0.25\n")
+                self.assertEqual(err, "inverse: float division by zero\n"
+                                      "[line 3]\n")
+
+    def test_compiled(self):
+        lox = PyLox()
+        lox.register_native("floor", math.floor)
+        self.assertEqual(run(lox, "print floor(7.9);", compiled=True),
+                         ("7\n", ""))
+
+    def test_compiled_from_cache(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.dict(os.environ, {"XDG_CACHE_HOME": directory}):
+            for _ in range(2):      # compiled, then loaded from the cache
+                lox = PyLox()
+                lox.register_native("floor", math.floor)
+                self.assertEqual(run(lox, "print floor(7.9);", compiled=True,
+                                     use_cache=True), ("7\n", ""))
+            self.assertEqual(len(os.listdir(os.path.join(directory, "pylox"))),
+                             1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import sys
+import unittest
+
+from pylox.scanner import Scanner
+from pylox.token import TokenType
+from pylox.error_handling import ErrorHandler
+
+
+def scan(source: str) -> list:
+    return list(Scanner(source, ErrorHandler()).scan_tokens())
+
+
+class InterningTest(unittest.TestCase):
+
+    def test_identifiers(self):
+        tokens = scan("var total = total + other; print total;")
+        names = [t.lexeme for t in tokens if t.type_ == TokenType.IDENTIFIER]
+        self.assertEqual(names, ["total", "total", "other", "total"])
+        self.assertIs(names[0], names[1])
+        self.assertIs(names[0], names[3])
+        self.assertIs(names[0], sys.intern("".join(["to", "tal"])))
+
+    def test_string_literals(self):
+        tokens = scan('print "some text" + "some text";')
+        literals = [t.literal for t in tokens if t.type_ == TokenType.STRING]
+        self.assertEqual(literals, ["some text", "some text"])
+        self.assertIs(literals[0], literals[1])
+
+    def test_across_scans(self):
+        [first, *_] = scan("counter")
+        [second, *_] = scan("counter = 1;")
+        self.assertIs(first.lexeme, second.lexeme)
+
+
+if __name__ == "__main__":
+    unittest.main()
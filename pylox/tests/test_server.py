@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import signal
+import tempfile
+import unittest
+import subprocess
+from pathlib import Path
+
+from pylox.client import SERVER_ENV
+
+LOX = str(Path(__file__).resolve().parent.parent / "lox")
+
+
+class ServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.socket = os.path.join(cls.directory.name, "pylox.sock")
+        cls.server = subprocess.Popen(
+            [sys.executable, LOX, "serve", f"--socket={cls.socket}",
+             "--workers=2"], stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while not os.path.exists(cls.socket):
+            if time.monotonic() > deadline or cls.server.poll() is not None:
+                cls.tearDownClass()
+                raise RuntimeError("lox serve did not start")
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait(timeout=30)
+        cls.directory.cleanup()
+
+    def lox(self, source: str, server: str | None = None, **kwargs):
+        """Run `source` as a script through `./lox`, in a directory of its
+        own, with `server` (ours by default) as `PYLOX_SERVER`."""
+        with tempfile.TemporaryDirectory() as cwd:
+            Path(cwd, "script.lox").write_text(source)
+            env = dict(os.environ, **{SERVER_ENV: server or self.socket})
+            return subprocess.run([sys.executable, LOX, "--no-cache",
+                                   "script.lox"], cwd=cwd, env=env,
+                                  capture_output=True, text=True, **kwargs)
+
+    def test_runs_scripts(self):
+        result = self.lox('var a = "served"; print a; print 1 + 2;')
+        self.assertEqual((result.stdout, result.stderr, result.returncode),
+                         ("served\n3\n", "", 0))
+
+    def test_exit_status(self):
+        result = self.lox("print 1;\nprint nil + 1;")
+        self.assertEqual(result.stdout, "1\n")
+        self.assertEqual(result.stderr, "Operands must be two numbers or two "
+                                        "strings.\n[line 2]\n")
+        self.assertEqual(result.returncode, 70)
+
+        result = self.lox("print (;")
+        self.assertEqual(result.stderr,
+                         "[line 1] Error at ';': Expect expression.\n")
+        self.assertEqual(result.returncode, 65)
+
+    def test_interrupted_client_kills_its_script(self):
+        with tempfile.TemporaryDirectory() as cwd:
+            Path(cwd, "script.lox").write_text('print "start"; while (true) {}')
+            env = dict(os.environ, **{SERVER_ENV: self.socket})
+            client = subprocess.Popen([sys.executable, LOX, "script.lox"],
+                                      cwd=cwd, env=env, stdout=subprocess.PIPE,
+                                      text=True)
+            self.assertEqual(client.stdout.readline(), "start\n")
+            client.send_signal(signal.SIGINT)
+            self.assertEqual(client.wait(timeout=30), 130)
+            client.stdout.close()
+
+        # Both workers are free again
+        for _ in range(2):
+            self.assertEqual(self.lox("print 1;", timeout=30).stdout, "1\n")
+
+    def test_runs_locally_without_server(self):
+        missing = os.path.join(self.directory.name, "missing.sock")
+        result = self.lox("print 2 * 21;", server=missing)
+        self.assertEqual((result.stdout, result.returncode), ("42\n", 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import io
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+
+from pylox.lox import PyLox
+from pylox.snapshot import SnapshotError
+
+from support import run
+
+PRELUDE = """
+class Shape {
+  init(name) { this.name = name; }
+  describe() { return this.name + " of " + this.sides() + " sides"; }
+}
+class Square < Shape {
+  init(side) { super.init("square"); this.side = side; }
+  area() { return this.side * this.side; }
+  sides() { return "four"; }
+}
+fun makeCounter() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }
+var counter = makeCounter();
+counter();
+var shapes = Array(0);
+shapes.append(Square(3));
+var registry = Map();
+registry.set("first", shapes.get(0));
+var started = clock;
+print "prelude ran";
+"""
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patch = mock.patch.dict(os.environ, {"XDG_CACHE_HOME": directory.name})
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.prelude = os.path.join(directory.name, "prelude.lox")
+        self.snapshot = os.path.join(directory.name, "prelude.snap")
+        with open(self.prelude, "w") as f:
+            f.write(PRELUDE)
+
+    def take(self, backend: str = "tree"):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            PyLox(backend=backend).snapshot_file(self.prelude, self.snapshot)
+        self.assertEqual(out.getvalue(), "prelude ran\n")
+
+    def test_round_trip(self):
+        for backend in ("tree", "adaptive"):
+            with self.subTest(backend=backend):
+                self.take(backend)
+                lox = PyLox(backend=backend)
+                lox.restore(self.snapshot)
+                out, err = run(lox, """
+                    print counter();
+                    print shapes.get(0).describe();
+                    print registry.get("first") == shapes.get(0);
+                    print Square(2).area();
+                    print started == clock;
+                    class Line < Shape { sides() { return "no"; } }
+                    print Line("line").describe();
+                """)
+                self.assertEqual(err, "")
+                self.assertEqual(out, "2\nsquare of four sides\ntrue\n4\ntrue\n"
+                                      "line of no sides\n")
+
+    def test_natives_of_the_restoring_session(self):
+        self.take()
+        lox = PyLox()
+        lox.register_native("clock", lambda: 42.0, 0)
+        lox.restore(self.snapshot)
+        self.assertEqual(run(lox, "print started();"), ("42\n", ""))
+
+    def test_rejects_changed_prelude(self):
+        self.take()
+        with open(self.prelude, "a") as f:
+            f.write("var more = 1;\n")
+        with self.assertRaisesRegex(SnapshotError, "changed"):
+            PyLox().restore(self.snapshot)
+
+    def test_rejects_missing_prelude(self):
+        self.take()
+        os.remove(self.prelude)
+        with self.assertRaisesRegex(SnapshotError, "cannot check the prelude"):
+            PyLox().restore(self.snapshot)
+
+    def test_rejects_other_files(self):
+        with open(self.snapshot, "wb") as f:
+            f.write(b"not a snapshot")
+        with self.assertRaisesRegex(SnapshotError, "is not a snapshot"):
+            PyLox().restore(self.snapshot)
+        self.take()
+        with open(self.snapshot, "r+b") as f:
+            f.truncate(os.path.getsize(self.snapshot) // 2)
+        with self.assertRaises(SnapshotError):
+            PyLox().restore(self.snapshot)
+
+    def test_other_backends_are_rejected(self):
+        for backend in ("closure", "vm"):
+            with self.subTest(backend=backend):
+                with self.assertRaises(SnapshotError):
+                    PyLox(backend=backend).snapshot_file(self.prelude,
+                                                         self.snapshot)
+                self.take()
+                with self.assertRaises(SnapshotError):
+                    PyLox(backend=backend).restore(self.snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import gc
+import unittest
+
+from pylox.lox import PyLox, MemoryStats
+
+from support import run
+
+PROGRAM = """
+class Point {
+  init(x) { this.x = x; }
+  plus(other) { return Point(this.x + other.x); }
+}
+fun sum(n) {
+  var p = Point(0);
+  for (var i = 0; i < n; i = i + 1) p = p.plus(Point(i));
+  return p.x;
+}
+print sum(100);
+"""
+
+
+class StatsTest(unittest.TestCase):
+
+    def test_program_freed_with_its_functions(self):
+        for backend in ("tree", "adaptive", "closure"):
+            with self.subTest(backend=backend):
+                lox = PyLox(backend=backend)
+                self.assertEqual(run(lox, PROGRAM), ("4950\n", ""))
+                stats = lox.stats()
+                self.assertEqual((stats.programs, stats.functions), (1, 3))
+                self.assertGreater(stats.ast_nodes, 0)
+                self.assertGreater(stats.resolved, 0)
+
+                # Inline caches in `sum` keep `Point` alive
+                run(lox, "sum = nil;")
+                self.assertEqual(lox.stats().functions, 2)
+                run(lox, "Point = nil;")
+                gc.collect()    # and those of its methods refer back to it
+                self.assertEqual(lox.stats(), MemoryStats())
+
+    def test_adaptive_sites(self):
+        lox = PyLox(backend="adaptive")
+        run(lox, PROGRAM)
+        self.assertGreater(lox.stats().sites, 0)
+
+    def test_statements_only_are_not_retained(self):
+        lox = PyLox()
+        run(lox, "var a = 1; { var b = a + 1; print b; }")
+        self.assertEqual(lox.stats(), MemoryStats())
+
+    def test_long_session_stays_bounded(self):
+        lox = PyLox(backend="adaptive")
+        for i in range(200):
+            run(lox, f"fun f(x) {{ return x + {i}; }} var g = f(1);")
+        gc.collect()
+        stats = lox.stats()
+        self.assertEqual((stats.programs, stats.functions), (1, 1))
+        self.assertEqual(len(lox._declarations), 1)
+
+    def test_optimized_calls(self):
+        folded, literal = PyLox(optimize=True), PyLox(optimize=True)
+        run(folded, "fun f(x) { return g(1 + 2, x); }")
+        run(literal, "fun f(x) { return g(3, x); }")
+        self.assertEqual(folded.stats(), literal.stats())
+        # function, return, call, `g`, `3` and `x`, of which `x` is resolved
+        self.assertEqual(literal.stats().ast_nodes, 6)
+        self.assertEqual(literal.stats().resolved, 1)
+
+    def test_fork_counts_its_own_programs(self):
+        lox = PyLox()
+        run(lox, PROGRAM)
+        fork = lox.fork()
+        self.assertEqual(fork.stats(), MemoryStats())
+        run(fork, "fun twice(x) { return 2 * x; }")
+        self.assertEqual(fork.stats().functions, 1)
+        self.assertEqual(lox.stats().functions, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from pylox.lox import PyLox
+
+from support import run
+
+# Far deeper than Python's recursion limit
+DEPTH = 20_000
+
+PROGRAM = f"""
+fun count(n, acc) {{ if (n == 0) return acc; return count(n - 1, acc + 1); }}
+print count({DEPTH}, 0);
+class Countdown {{
+  init(n) {{ this.n = n; }}
+  run() {{ if (this.n == 0) return "done"; this.n = this.n - 1; return this.run(); }}
+}}
+print Countdown({DEPTH}).run();
+"""
+
+
+class TailCallTest(unittest.TestCase):
+
+    def test_constant_stack(self):
+        for backend in ("tree", "adaptive", "closure"):
+            with self.subTest(backend=backend):
+                self.assertEqual(run(PyLox(backend=backend), PROGRAM),
+                                 (f"{DEPTH}\ndone\n", ""))
+
+    def test_tail_call_errors(self):
+        for backend in ("tree", "adaptive", "closure"):
+            with self.subTest(backend=backend):
+                lox = PyLox(backend=backend)
+                _, err = run(lox, "fun f() { return g(1,\n2); }\n"
+                                  "fun g(a) {}\nf();")
+                self.assertEqual(err, "Expected 1 arguments but got 2.\n"
+                                      "[line 2]\n")
+                _, err = run(lox, 'fun h() { return "h"(); }\nh();')
+                self.assertEqual(err, "Can only call functions and classes.\n"
+                                      "[line 1]\n")
+                out, _ = run(lox, "class A { init(x) { this.x = x; } }\n"
+                                  "fun make() { return A(3); }\n"
+                                  "fun clock2() { return clock(); }\n"
+                                  "print make().x; print clock2() > 0;")
+                self.assertEqual(out, "3\ntrue\n")
+
+    def test_vm_frames_are_bounded(self):
+        lox = PyLox(backend="vm")
+        lox.interpreter.max_frames = DEPTH // 2
+        _, err = run(lox, PROGRAM)
+        self.assertEqual(err, "Stack overflow.\n[line 2]\n")
+
+    def test_compiled_python_frames_are_bounded(self):
+        with self.assertRaises(RecursionError):
+            run(PyLox(), PROGRAM, compiled=True)
+
+
+if __name__ == "__main__":
+    unittest.main()